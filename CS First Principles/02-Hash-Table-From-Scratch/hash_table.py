@@ -5,8 +5,12 @@ This module implements hash tables with different collision resolution strategie
 Work through GUIDE.md to understand each implementation deeply.
 """
 
-from typing import Any, Optional, List, Tuple
+from typing import Any, Optional, List, Tuple, Iterator, Callable
+from array import array
 from enum import Enum
+import math
+import os
+import re
 
 
 class CollisionStrategy(Enum):
@@ -14,6 +18,13 @@ class CollisionStrategy(Enum):
     CHAINING = "chaining"
     LINEAR_PROBING = "linear_probing"
     DOUBLE_HASHING = "double_hashing"
+    ROBIN_HOOD = "robin_hood"
+    SWISS_TABLE = "swiss_table"
+    COMPACT_DICT = "compact_dict"
+
+
+# Resize once the load factor (α = n/m) would exceed this
+MAX_LOAD_FACTOR = 0.75
 
 
 # =============================================================================
@@ -24,10 +35,9 @@ def simple_hash(key: str, table_size: int) -> int:
     """
     Simple (bad) hash function: sum of ASCII values.
 
-    Challenge: Implement this to see why it's bad!
+    Anagrams collide, and short keys only reach the low slots.
     """
-    # TODO: Implement
-    pass
+    return sum(ord(char) for char in key) % table_size
 
 
 def polynomial_hash(key: str, table_size: int, prime: int = 31) -> int:
@@ -41,12 +51,11 @@ def polynomial_hash(key: str, table_size: int, prime: int = 31) -> int:
 
     Returns:
         Hash value in range [0, table_size)
-
-    Challenge: Implement the polynomial hash from GUIDE.md
     """
-    # TODO: Implement
-    # Remember: hash = (hash * prime + ord(char)) % table_size
-    pass
+    hash_value = 0
+    for char in key:
+        hash_value = (hash_value * prime + ord(char)) % table_size
+    return hash_value
 
 
 def secondary_hash(key: str, prime: int = 7) -> int:
@@ -58,12 +67,109 @@ def secondary_hash(key: str, prime: int = 7) -> int:
         prime: A prime number (should be less than table size)
 
     Returns:
-        Hash value (never 0!)
+        Hash value in range [1, prime] (never 0!)
+    """
+    return prime - polynomial_hash(key, prime)
+
+
+# Full-width hash functions map a key to an int in [0, 2**64). Each table
+# takes one as its hash_function, stores every entry's full hash, and
+# reduces it to a slot itself. A key is hashed once: growing a table reuses
+# the stored hashes, and probes compare them before comparing keys.
+HashFunction = Callable[[str], int]
+
+MASK64 = (1 << 64) - 1
+POLYNOMIAL_MODULUS = (1 << 61) - 1  # A Mersenne prime
+SIPHASH_KEY = os.urandom(16)  # Secret per process, like Python's hash seed
+
+
+def full_polynomial_hash(key: str) -> int:
+    """polynomial_hash modulo a 61-bit prime instead of the table size."""
+    return polynomial_hash(key, POLYNOMIAL_MODULUS)
+
+
+def fnv1a_hash(key: str) -> int:
+    """64-bit FNV-1a of the key's UTF-8 bytes: xor in each byte, then multiply."""
+    hash_value = 0xcbf29ce484222325
+    for byte in key.encode():
+        hash_value = ((hash_value ^ byte) * 0x100000001b3) & MASK64
+    return hash_value
 
-    Challenge: Ensure this never returns 0
+
+def _sip_round(v0: int, v1: int, v2: int, v3: int) -> Tuple[int, int, int, int]:
+    """One SipRound: add, rotate, xor on four 64-bit words."""
+    v0 = (v0 + v1) & MASK64
+    v1 = ((v1 << 13 | v1 >> 51) & MASK64) ^ v0
+    v0 = (v0 << 32 | v0 >> 32) & MASK64
+    v2 = (v2 + v3) & MASK64
+    v3 = ((v3 << 16 | v3 >> 48) & MASK64) ^ v2
+    v0 = (v0 + v3) & MASK64
+    v3 = ((v3 << 21 | v3 >> 43) & MASK64) ^ v0
+    v2 = (v2 + v1) & MASK64
+    v1 = ((v1 << 17 | v1 >> 47) & MASK64) ^ v2
+    v2 = (v2 << 32 | v2 >> 32) & MASK64
+    return v0, v1, v2, v3
+
+
+def siphash24(data: bytes, secret: bytes = SIPHASH_KEY) -> int:
     """
-    # TODO: Implement
-    pass
+    SipHash-2-4 of data under a 16-byte secret.
+
+    Without the secret nobody can choose keys that collide, so an attacker
+    cannot flood a table with them (see benchmark_hash_functions).
+    """
+    k0 = int.from_bytes(secret[:8], 'little')
+    k1 = int.from_bytes(secret[8:16], 'little')
+    v0 = k0 ^ 0x736f6d6570736575
+    v1 = k1 ^ 0x646f72616e646f6d
+    v2 = k0 ^ 0x6c7967656e657261
+    v3 = k1 ^ 0x7465646279746573
+    tail = len(data) - len(data) % 8
+    words = [int.from_bytes(data[i:i + 8], 'little') for i in range(0, tail, 8)]
+    words.append((len(data) & 0xFF) << 56 | int.from_bytes(data[tail:], 'little'))
+    for word in words:
+        v3 ^= word
+        for _ in range(2):
+            v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0 ^= word
+    v2 ^= 0xFF
+    for _ in range(4):
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def siphash_hash(key: str) -> int:
+    """SipHash-2-4 of the key's UTF-8 bytes under this process's SIPHASH_KEY."""
+    return siphash24(key.encode())
+
+
+def builtin_hash(key: str) -> int:
+    """Python's own str hash (SipHash-1-3 in C, seeded per process), as 64 bits."""
+    return hash(key) & MASK64
+
+
+HASH_FUNCTIONS = {
+    'polynomial': full_polynomial_hash,
+    'fnv1a': fnv1a_hash,
+    'siphash': siphash_hash,
+    'builtin': builtin_hash,
+}
+
+
+def avalanche(hash_function: HashFunction, keys: List[str]) -> float:
+    """
+    Fraction of the 64 output bits that change when one input bit flips,
+    averaged over every ASCII bit of every key. 0.5 is ideal.
+    """
+    flipped = trials = 0
+    for key in keys:
+        original = hash_function(key)
+        for i, char in enumerate(key):
+            for bit in range(7):  # Stay within ASCII
+                changed = key[:i] + chr(ord(char) ^ 1 << bit) + key[i + 1:]
+                flipped += bin(original ^ hash_function(changed)).count('1')
+                trials += 1
+    return flipped / trials / 64
 
 
 # =============================================================================
@@ -74,41 +180,43 @@ class ChainedHashTable:
     """
     Hash table using separate chaining for collision resolution.
 
-    Each slot contains a list of (key, value) pairs.
+    Each slot contains a list of (key, value, hash) entries.
     """
 
-    def __init__(self, initial_size: int = 16):
+    def __init__(self, initial_size: int = 16,
+                 hash_function: HashFunction = full_polynomial_hash):
         """
         Initialize hash table with separate chaining.
 
         Args:
             initial_size: Initial number of slots
+            hash_function: Full-width hash of a key (see HASH_FUNCTIONS)
         """
         self.size = initial_size
         self.count = 0
-        self.table: List[List[Tuple[str, Any]]] = [[] for _ in range(self.size)]
+        self.hash_function = hash_function
+        self.table: List[List[Tuple[str, Any, int]]] = [[] for _ in range(self.size)]
 
     def _hash(self, key: str) -> int:
-        """Compute hash value for key."""
-        return polynomial_hash(key, self.size)
+        """Compute the slot for key."""
+        return self.hash_function(key) % self.size
 
     def load_factor(self) -> float:
         """Calculate current load factor (α = n/m)."""
-        # TODO: Implement
-        pass
+        return self.count / self.size
 
     def insert(self, key: str, value: Any) -> None:
-        """
-        Insert or update a key-value pair.
-
-        Challenge: Handle both new keys and updates to existing keys
-        """
-        # TODO: Implement
-        # 1. Compute hash
-        # 2. Search chain for existing key
-        # 3. Update if found, append if not
-        # 4. Check if resize needed
-        pass
+        """Insert or update a key-value pair."""
+        hash_value = self.hash_function(key)
+        chain = self.table[hash_value % self.size]
+        for i, (existing, _, cached) in enumerate(chain):
+            if cached == hash_value and existing == key:
+                chain[i] = (key, value, hash_value)
+                return
+        chain.append((key, value, hash_value))
+        self.count += 1
+        if self.load_factor() > MAX_LOAD_FACTOR:
+            self._resize()
 
     def search(self, key: str) -> Optional[Any]:
         """
@@ -116,11 +224,12 @@ class ChainedHashTable:
 
         Returns:
             Value if found, None otherwise
-
-        Challenge: Implement O(1 + α) search
         """
-        # TODO: Implement
-        pass
+        hash_value = self.hash_function(key)
+        for existing, value, cached in self.table[hash_value % self.size]:
+            if cached == hash_value and existing == key:
+                return value
+        return None
 
     def delete(self, key: str) -> bool:
         """
@@ -128,23 +237,24 @@ class ChainedHashTable:
 
         Returns:
             True if deleted, False if not found
-
-        Challenge: Remove from the chain
         """
-        # TODO: Implement
-        pass
+        hash_value = self.hash_function(key)
+        chain = self.table[hash_value % self.size]
+        for i, (existing, _, cached) in enumerate(chain):
+            if cached == hash_value and existing == key:
+                del chain[i]
+                self.count -= 1
+                return True
+        return False
 
     def _resize(self) -> None:
-        """
-        Resize and rehash when load factor exceeds threshold.
-
-        Challenge: Remember to rehash all items!
-        """
-        # TODO: Implement
-        # 1. Create new larger table
-        # 2. Rehash all existing items
-        # 3. Replace old table
-        pass
+        """Double the number of slots and move every entry by its stored hash."""
+        old_table = self.table
+        self.size *= 2
+        self.table = [[] for _ in range(self.size)]
+        for chain in old_table:
+            for entry in chain:
+                self.table[entry[2] % self.size].append(entry)
 
     def __str__(self) -> str:
         """String representation for debugging."""
@@ -155,6 +265,121 @@ class ChainedHashTable:
         return "\n".join(result) if result else "Empty table"
 
 
+class IncrementalHashTable(ChainedHashTable):
+    """
+    Separate chaining with incremental rehashing, like Redis's dict.
+
+    Growing does not rehash everything at once. It keeps the old table,
+    starts an empty one twice the size, and every insert, search and delete
+    then moves REHASH_BUCKETS more old buckets across. Until the old table
+    is drained, keys are looked up in both, and new keys go to the new one.
+    Buckets are None until they get their first key, so starting the new
+    table is one C-level allocation rather than a list per bucket.
+    """
+
+    REHASH_BUCKETS = 1  # Old buckets moved per operation (as in Redis)
+    EMPTY_VISITS = 10  # ...skipping at most this many empty ones per bucket
+
+    def __init__(self, initial_size: int = 16,
+                 hash_function: HashFunction = full_polynomial_hash):
+        """Initialize an incrementally rehashing chained table."""
+        super().__init__(initial_size, hash_function)
+        self.table: List[Optional[List[Tuple[str, Any, int]]]] = [None] * self.size
+        self.old_table: Optional[List[Optional[List[Tuple[str, Any, int]]]]] = None
+        self.old_size = 0
+        self.rehash_index = 0  # Old buckets before this one have been moved
+
+    def _chains(self, hash_value: int) -> Tuple[List[Tuple[str, Any, int]], ...]:
+        """
+        The chains that may hold a key with this hash: its bucket in the new
+        table, then its old bucket if that has not been moved yet. Moves a
+        few old buckets first.
+        """
+        index = hash_value % self.size
+        chain = self.table[index]
+        if self.old_table is None:
+            return () if chain is None else (chain,)
+        self._rehash_step()
+        chain = self.table[index]
+        chains = () if chain is None else (chain,)
+        if self.old_table is not None:
+            old_index = hash_value % self.old_size
+            if old_index >= self.rehash_index and self.old_table[old_index] is not None:
+                chains += (self.old_table[old_index],)
+        return chains
+
+    def insert(self, key: str, value: Any) -> None:
+        """Insert or update a key-value pair."""
+        hash_value = self.hash_function(key)
+        for chain in self._chains(hash_value):
+            for i, (existing, _, cached) in enumerate(chain):
+                if cached == hash_value and existing == key:
+                    chain[i] = (key, value, hash_value)
+                    return
+        index = hash_value % self.size
+        if self.table[index] is None:
+            self.table[index] = []
+        self.table[index].append((key, value, hash_value))
+        self.count += 1
+        if self.old_table is None and self.load_factor() > MAX_LOAD_FACTOR:
+            self._resize()
+
+    def search(self, key: str) -> Optional[Any]:
+        """Search for a key in both tables."""
+        hash_value = self.hash_function(key)
+        for chain in self._chains(hash_value):
+            for existing, value, cached in chain:
+                if cached == hash_value and existing == key:
+                    return value
+        return None
+
+    def delete(self, key: str) -> bool:
+        """Delete a key from whichever table holds it."""
+        hash_value = self.hash_function(key)
+        for chain in self._chains(hash_value):
+            for i, (existing, _, cached) in enumerate(chain):
+                if cached == hash_value and existing == key:
+                    del chain[i]
+                    self.count -= 1
+                    return True
+        return False
+
+    def _resize(self) -> None:
+        """Start rehashing into a table twice the size."""
+        self.old_table, self.old_size = self.table, self.size
+        self.size *= 2
+        self.table = [None] * self.size
+        self.rehash_index = 0
+
+    def _rehash_step(self) -> None:
+        """Move up to REHASH_BUCKETS non-empty old buckets into the new table."""
+        old_table, table = self.old_table, self.table
+        moved = visits = 0
+        index = self.rehash_index
+        while (index < self.old_size and moved < self.REHASH_BUCKETS
+               and visits < self.REHASH_BUCKETS * self.EMPTY_VISITS):
+            chain = old_table[index]
+            if chain:
+                for entry in chain:
+                    new_index = entry[2] % self.size
+                    if table[new_index] is None:
+                        table[new_index] = []
+                    table[new_index].append(entry)
+                moved += 1
+            old_table[index] = None
+            index += 1
+            visits += 1
+        self.rehash_index = index
+        if index == self.old_size:
+            self.old_table = None
+            self.old_size = 0
+
+    def finish_rehash(self) -> None:
+        """Move every remaining old bucket now."""
+        while self.old_table is not None:
+            self._rehash_step()
+
+
 # =============================================================================
 # Part 3: Hash Table with Linear Probing
 # =============================================================================
@@ -163,124 +388,604 @@ class LinearProbingHashTable:
     """
     Hash table using open addressing with linear probing.
 
-    Uses tombstones for deletion.
+    Uses tombstones for deletion. Tombstones count towards the load factor,
+    since searches must probe past them; a resize clears them.
     """
 
     DELETED = object()  # Sentinel for deleted slots
 
-    def __init__(self, initial_size: int = 16):
+    def __init__(self, initial_size: int = 16,
+                 hash_function: HashFunction = full_polynomial_hash):
         """Initialize hash table with linear probing."""
         self.size = initial_size
         self.count = 0
-        self.table: List[Optional[Tuple[str, Any]]] = [None] * self.size
+        self.tombstones = 0
+        self.hash_function = hash_function
+        self.table: List[Optional[Tuple[str, Any, int]]] = [None] * self.size
 
     def _hash(self, key: str) -> int:
-        """Compute hash value for key."""
-        return polynomial_hash(key, self.size)
+        """Compute the home slot for key."""
+        return self.hash_function(key) % self.size
+
+    def _step(self, hash_value: int) -> int:
+        """Distance between successive probes for a key with this hash."""
+        return 1
+
+    def load_factor(self) -> float:
+        """Calculate current load factor (α = n/m)."""
+        return self.count / self.size
 
-    def _probe(self, key: str, for_insert: bool = False) -> int:
+    def _probe(self, key: str, hash_value: int, for_insert: bool = False) -> int:
         """
-        Find slot for key using linear probing.
+        Find slot for key.
 
         Args:
             key: Key to find
-            for_insert: If True, stop at DELETED or None; if False, skip DELETED
+            hash_value: Its full hash; only entries with the same hash have
+                        their keys compared
+            for_insert: If True and key is absent, return the first DELETED
+                        slot passed on the way, so tombstones get reused
 
         Returns:
-            Index of slot
-
-        Challenge: Handle both insertion and search correctly
+            Index of the key's slot, or else of the None slot that ended
+            the search (or, for insert, of the first DELETED slot)
         """
-        # TODO: Implement
-        # For insert: stop at None or DELETED
-        # For search: skip DELETED, stop at None or matching key
-        pass
+        index = hash_value % self.size
+        step = self._step(hash_value)
+        reusable = None
+        while True:
+            entry = self.table[index]
+            if entry is None:
+                return reusable if reusable is not None else index
+            if entry is self.DELETED:
+                if for_insert and reusable is None:
+                    reusable = index
+            elif entry[2] == hash_value and entry[0] == key:
+                return index
+            index = (index + step) % self.size
 
     def insert(self, key: str, value: Any) -> None:
         """Insert or update a key-value pair."""
-        # TODO: Implement using _probe
-        pass
+        hash_value = self.hash_function(key)
+        index = self._probe(key, hash_value, for_insert=True)
+        entry = self.table[index]
+        if entry is None or entry is self.DELETED:
+            if entry is self.DELETED:
+                self.tombstones -= 1
+            self.count += 1
+        self.table[index] = (key, value, hash_value)
+        if (self.count + self.tombstones) / self.size > MAX_LOAD_FACTOR:
+            self._resize()
 
     def search(self, key: str) -> Optional[Any]:
         """Search for a key."""
-        # TODO: Implement using _probe
-        pass
+        entry = self.table[self._probe(key, self.hash_function(key))]
+        return None if entry is None else entry[1]
 
     def delete(self, key: str) -> bool:
-        """
-        Delete a key using tombstone.
-
-        Challenge: Mark as DELETED, don't set to None!
-        """
-        # TODO: Implement
-        pass
+        """Delete a key, leaving a DELETED tombstone so later probes continue."""
+        index = self._probe(key, self.hash_function(key))
+        if self.table[index] is None:
+            return False
+        self.table[index] = self.DELETED
+        self.count -= 1
+        self.tombstones += 1
+        return True
 
     def _resize(self) -> None:
-        """Resize and rehash (no tombstones in new table)."""
-        # TODO: Implement
-        # Good time to remove tombstones!
-        pass
+        """
+        Rehash into a table without tombstones: twice the size, or the same
+        size if it was mostly tombstones.
+        """
+        old_table = self.table
+        if self.load_factor() > MAX_LOAD_FACTOR / 2:
+            self.size *= 2
+        self.table = [None] * self.size
+        self.tombstones = 0
+        for entry in old_table:
+            if entry is not None and entry is not self.DELETED:
+                self.table[self._probe(entry[0], entry[2])] = entry
 
 
 # =============================================================================
 # Part 4: Hash Table with Double Hashing
 # =============================================================================
 
-class DoubleHashingTable:
+class DoubleHashingTable(LinearProbingHashTable):
     """
     Hash table using open addressing with double hashing.
 
-    Better distribution than linear probing.
+    Better distribution than linear probing. Probing, tombstones and
+    resizing work as in LinearProbingHashTable; only the step differs.
+    """
+
+    def _hash2(self, hash_value: int, prime: int = 7) -> int:
+        """
+        Secondary hash, as secondary_hash computes it but from the stored
+        full hash: never 0, and coprime to the table size so the probe
+        sequence (h1 + i * h2) % size visits every slot.
+        """
+        step = prime - hash_value % prime
+        while math.gcd(step, self.size) != 1:
+            step += 1
+        return step
+
+    _step = _hash2
+
+
+# =============================================================================
+# Part 5: Hash Table with Robin Hood Hashing
+# =============================================================================
+
+class RobinHoodHashTable:
+    """
+    Hash table using linear probing with Robin Hood insertion.
+
+    Each slot records its entry's probe distance (how far it sits past its
+    home slot). An insert that meets an entry closer to home than itself
+    takes that slot and carries the displaced entry on, so probe distances
+    stay even. Slots are kept sorted by home along each run, so a search
+    stops as soon as it is further from home than the slot's entry, and a
+    delete shifts the rest of the run back one slot instead of leaving a
+    tombstone.
     """
 
-    DELETED = object()
+    EMPTY = -1  # Probe distance of an empty slot
 
-    def __init__(self, initial_size: int = 16):
-        """Initialize hash table with double hashing."""
+    def __init__(self, initial_size: int = 16,
+                 hash_function: HashFunction = full_polynomial_hash):
+        """Initialize hash table with Robin Hood hashing."""
         self.size = initial_size
         self.count = 0
-        self.table: List[Optional[Tuple[str, Any]]] = [None] * self.size
+        self.hash_function = hash_function
+        self.table: List[Optional[Tuple[str, Any, int]]] = [None] * self.size
+        self.distances: List[int] = [self.EMPTY] * self.size
+
+    def _hash(self, key: str) -> int:
+        """Compute the home slot for key."""
+        return self.hash_function(key) % self.size
+
+    def load_factor(self) -> float:
+        """Calculate current load factor (α = n/m)."""
+        return self.count / self.size
+
+    def _find(self, key: str, hash_value: int) -> int:
+        """Index of key's slot, searching from its home slot; -1 if absent."""
+        table, distances, size = self.table, self.distances, self.size
+        index = hash_value % size
+        distance = 0
+        while distances[index] >= distance:
+            entry = table[index]
+            if entry[2] == hash_value and entry[0] == key:
+                return index
+            index = (index + 1) % size
+            distance += 1
+        return -1
+
+    def insert(self, key: str, value: Any) -> None:
+        """Insert or update a key-value pair."""
+        hash_value = self.hash_function(key)
+        index = self._find(key, hash_value)
+        if index >= 0:
+            self.table[index] = (key, value, hash_value)
+            return
+        self._place((key, value, hash_value), hash_value % self.size)
+        self.count += 1
+        if self.load_factor() > MAX_LOAD_FACTOR:
+            self._resize()
+
+    def _place(self, entry: Tuple[str, Any, int], index: int) -> None:
+        """Put an absent key's entry in its run, starting at its home slot."""
+        table, distances, size = self.table, self.distances, self.size
+        distance = 0
+        while True:
+            resident = distances[index]
+            if resident == self.EMPTY:
+                table[index] = entry
+                distances[index] = distance
+                return
+            if resident < distance:
+                # Take from the rich: the resident is closer to home than us
+                table[index], entry = entry, table[index]
+                distances[index], distance = distance, resident
+            index = (index + 1) % size
+            distance += 1
+
+    def search(self, key: str) -> Optional[Any]:
+        """Search for a key."""
+        index = self._find(key, self.hash_function(key))
+        return None if index < 0 else self.table[index][1]
+
+    def delete(self, key: str) -> bool:
+        """Delete a key by shifting the rest of its run back one slot."""
+        index = self._find(key, self.hash_function(key))
+        if index < 0:
+            return False
+        table, distances, size = self.table, self.distances, self.size
+        following = (index + 1) % size
+        while distances[following] > 0:
+            table[index] = table[following]
+            distances[index] = distances[following] - 1
+            index = following
+            following = (following + 1) % size
+        table[index] = None
+        distances[index] = self.EMPTY
+        self.count -= 1
+        return True
+
+    def _resize(self) -> None:
+        """Double the number of slots and reinsert every entry by its stored hash."""
+        old_table = self.table
+        self.size *= 2
+        self.table = [None] * self.size
+        self.distances = [self.EMPTY] * self.size
+        for entry in old_table:
+            if entry is not None:
+                self._place(entry, entry[2] % self.size)
+
+
+# =============================================================================
+# Part 6: Hash Table with Control Bytes (SwissTable)
+# =============================================================================
+
+class SwissHashTable:
+    """
+    Hash table using open addressing over groups of slots, SwissTable style.
+
+    A full hash splits in two: the high bits (h1) pick the group to probe
+    first, and the low 7 bits (h2) are stored in a control byte per slot,
+    kept apart from the keys in one bytearray. A control byte is EMPTY,
+    DELETED or a full slot's h2. A probe scans a whole group's control
+    bytes for h2 with bytearray.find (a C loop, standing in for the SIMD
+    compare of the original), compares keys only in the slots that match,
+    and stops at the first group that has an EMPTY byte. A miss usually
+    touches no keys at all.
+
+    Calls from Python are what a probe costs here, so each group also keeps
+    a summary int in `summaries`: bit h2 is set when some slot in the group
+    holds h2, and bit HAS_EMPTY while the group has an EMPTY slot. It is the
+    match mask the SIMD compare would compute, kept up to date on insert
+    and delete. Most misses read one summary and never call find, which
+    puts them ahead of Robin Hood's in benchmark_misses.
+    """
+
+    GROUP_SIZE = 16
+    EMPTY = 0x80
+    DELETED = 0xFE
+    FREE_BYTE = re.compile(b'[\x80-\xff]')  # EMPTY or DELETED
+    HAS_EMPTY = 1 << 128  # Summary bit: the group has an EMPTY slot
+    MAX_LOAD_FACTOR = 0.875  # Cheap misses let the table fill further
+
+    def __init__(self, initial_size: int = 16,
+                 hash_function: HashFunction = full_polynomial_hash):
+        """Initialize with at least initial_size slots, in whole groups."""
+        self.size = self.GROUP_SIZE
+        while self.size < initial_size:
+            self.size *= 2
+        self.group_mask = self.size // self.GROUP_SIZE - 1  # Group count is a power of two
+        self.count = 0
+        self.tombstones = 0
+        self.control = bytearray([self.EMPTY]) * self.size
+        self.summaries = [self.HAS_EMPTY] * (self.group_mask + 1)
+        self.keys: List[Optional[str]] = [None] * self.size
+        self.values: List[Any] = [None] * self.size
+        self.hashes = array('Q', bytes(8 * self.size))
+        self.hash_function = hash_function
 
-    def _hash1(self, key: str) -> int:
-        """Primary hash function."""
-        return polynomial_hash(key, self.size)
+    def _hash(self, key: str) -> int:
+        """Full-width hash value for key (h1 is its high bits, h2 its low 7)."""
+        return self.hash_function(key)
 
-    def _hash2(self, key: str) -> int:
+    def load_factor(self) -> float:
+        """Calculate current load factor (α = n/m)."""
+        return self.count / self.size
+
+    # Probing jumps 1, 2, 3, ... groups, which visits every group once
+    # because the number of groups is a power of two.
+
+    def _find(self, key: str, hash_value: int) -> int:
+        """Index of key's slot, or -1 if it is absent."""
+        # A common miss reads one summary and returns. HAS_EMPTY is the top
+        # bit, so `summary >> 128` tests it without an attribute lookup.
+        summaries, group_mask = self.summaries, self.group_mask
+        group = (hash_value >> 7) & group_mask
+        h2 = hash_value & 0x7F
+        jump = 0
+        while True:
+            summary = summaries[group]
+            if summary >> h2 & 1:
+                find = self.control.find
+                start = group * self.GROUP_SIZE
+                end = start + self.GROUP_SIZE
+                index = find(h2, start, end)
+                while index >= 0:
+                    if self.hashes[index] == hash_value and self.keys[index] == key:
+                        return index
+                    index = find(h2, index + 1, end)
+            if summary >> 128:
+                return -1
+            jump += 1
+            group = (group + jump) & group_mask
+
+    def _free_slot(self, hash_value: int) -> int:
         """
-        Secondary hash function.
+        First EMPTY or DELETED slot along the probe sequence. Both have the
+        high bit set and a full slot's h2 never does, so one regex search
+        over the group's control bytes finds either.
+        """
+        search, width, mask = self.FREE_BYTE.search, self.GROUP_SIZE, self.size - 1
+        start = ((hash_value >> 7) & self.group_mask) * width
+        jump = 0
+        while True:
+            free = search(self.control, start, start + width)
+            if free:
+                return free.start()
+            jump += 1
+            start = (start + jump * width) & mask
+
+    def insert(self, key: str, value: Any) -> None:
+        """Insert or update a key-value pair."""
+        hash_value = self.hash_function(key)
+        index = self._find(key, hash_value)
+        if index >= 0:
+            self.values[index] = value
+            return
+        if (self.count + self.tombstones + 1) / self.size > self.MAX_LOAD_FACTOR:
+            self._resize()
+        self._place(key, value, hash_value)
+        self.count += 1
+
+    def _place(self, key: str, value: Any, hash_value: int) -> None:
+        """Store an absent key in the first free slot of its probe sequence."""
+        index = self._free_slot(hash_value)
+        control, h2, group = self.control, hash_value & 0x7F, index // self.GROUP_SIZE
+        if control[index] == self.DELETED:
+            self.tombstones -= 1
+            control[index] = h2
+            self.summaries[group] |= 1 << h2
+        else:
+            control[index] = h2
+            start = group * self.GROUP_SIZE
+            if control.find(self.EMPTY, start, start + self.GROUP_SIZE) >= 0:
+                self.summaries[group] |= 1 << h2
+            else:  # That was the group's last EMPTY slot
+                self.summaries[group] = (self.summaries[group] | 1 << h2) ^ self.HAS_EMPTY
+        self.keys[index] = key
+        self.values[index] = value
+        self.hashes[index] = hash_value
+
+    def search(self, key: str) -> Optional[Any]:
+        """Search for a key."""
+        index = self._find(key, self.hash_function(key))
+        return None if index < 0 else self.values[index]
 
-        Challenge: Must never return 0!
+    def delete(self, key: str) -> bool:
         """
-        # TODO: Implement using secondary_hash
-        pass
+        Delete a key. Its slot can go back to EMPTY if its group still has
+        an EMPTY slot (the summary says so): no probe has ever passed
+        through that group, since groups only regain EMPTY slots in a
+        rebuild. Otherwise it becomes DELETED. Either way the summary drops
+        the slot's h2 unless another slot in the group still holds it.
+        """
+        index = self._find(key, self.hash_function(key))
+        if index < 0:
+            return False
+        control, group = self.control, index // self.GROUP_SIZE
+        h2, summary = control[index], self.summaries[group]
+        if summary >> 128:
+            control[index] = self.EMPTY
+        else:
+            control[index] = self.DELETED
+            self.tombstones += 1
+        start = group * self.GROUP_SIZE
+        if control.find(h2, start, start + self.GROUP_SIZE) < 0:
+            self.summaries[group] = summary ^ 1 << h2
+        self.keys[index] = self.values[index] = None
+        self.count -= 1
+        return True
 
-    def _probe(self, key: str, for_insert: bool = False) -> int:
+    def _resize(self) -> None:
         """
-        Find slot for key using double hashing.
+        Move every entry, by its stored hash, into a table without
+        tombstones: twice the size, or the same size if it was mostly
+        tombstones. The new table has no DELETED slots, so entries go
+        straight into free slots, and each group's HAS_EMPTY bit is settled
+        once at the end instead of after every entry.
+        """
+        old_keys, old_values, old_hashes = self.keys, self.values, self.hashes
+        if self.load_factor() > self.MAX_LOAD_FACTOR / 2:
+            self.size *= 2
+            self.group_mask = self.size // self.GROUP_SIZE - 1
+        width = self.GROUP_SIZE
+        control = self.control = bytearray([self.EMPTY]) * self.size
+        summaries = self.summaries = [self.HAS_EMPTY] * (self.group_mask + 1)
+        keys = self.keys = [None] * self.size
+        values = self.values = [None] * self.size
+        hashes = self.hashes = array('Q', bytes(8 * self.size))
+        self.tombstones = 0
+        free_slot = self._free_slot
+        for key, value, hash_value in zip(old_keys, old_values, old_hashes):
+            if key is not None:
+                index = free_slot(hash_value)
+                h2 = control[index] = hash_value & 0x7F
+                summaries[index // width] |= 1 << h2
+                keys[index], values[index], hashes[index] = key, value, hash_value
+        find = control.find
+        for group, start in enumerate(range(0, self.size, width)):
+            if find(self.EMPTY, start, start + width) < 0:
+                summaries[group] ^= self.HAS_EMPTY
+
+
+# =============================================================================
+# Part 7: Compact Hash Table (CPython dict layout)
+# =============================================================================
+
+class CompactHashTable:
+    """
+    Hash table laid out like CPython's dict.
+
+    The entries live in dense parallel arrays (keys, values, and hashes as
+    an array of unsigned 64-bit ints), in insertion order. The hash table proper is
+    a sparse array.array of small ints, each the position of an entry in
+    the dense arrays, or EMPTY or DUMMY. Index items are 1, 2, 4 or 8 bytes
+    wide, whatever the table size needs, so the sparse part costs a few
+    bytes per slot instead of a pointer to a tuple. Iteration walks the
+    dense arrays, so it yields keys in insertion order.
+    """
+
+    EMPTY = -1
+    DUMMY = -2  # Deleted: probes continue past it
+    PERTURB_SHIFT = 5
+
+    def __init__(self, initial_size: int = 8,
+                 hash_function: HashFunction = full_polynomial_hash):
+        """Initialize with at least initial_size index slots."""
+        self.size = 8
+        while self.size < initial_size:
+            self.size *= 2
+        self.count = 0
+        self.indices = self._new_indices(self.size)
+        self.keys: List[Optional[str]] = []
+        self.values: List[Any] = []
+        self.hashes = array('Q')
+        self.usable = self.size * 2 // 3  # Entries left before a resize
+        self.hash_function = hash_function
+
+    @classmethod
+    def _new_indices(cls, size: int) -> array:
+        """An index array of size EMPTY slots, in the narrowest int type."""
+        if size <= 1 << 7:
+            typecode = 'b'
+        elif size <= 1 << 15:
+            typecode = 'h'
+        elif size <= 1 << 31:
+            typecode = 'i'
+        else:
+            typecode = 'q'
+        return array(typecode, [cls.EMPTY]) * size
 
-        Probe sequence: (h1 + i * h2) % size
+    def _hash(self, key: str) -> int:
+        """Full-width hash value for key (the perturbed probe uses all of it)."""
+        return self.hash_function(key)
+
+    def load_factor(self) -> float:
+        """Calculate current load factor (α = n/m)."""
+        return self.count / self.size
+
+    def _lookup(self, key: str, hash_value: int) -> Tuple[int, int]:
         """
-        # TODO: Implement
-        pass
+        Probe for key as CPython does: each step mixes in 5 more high bits
+        of the hash, so keys whose low bits collide soon part ways.
+
+        Returns:
+            (index slot, entry) for a present key, or (first EMPTY slot, -1)
+        """
+        indices, hashes, keys = self.indices, self.hashes, self.keys
+        mask = self.size - 1
+        perturb = hash_value
+        slot = hash_value & mask
+        while True:
+            entry = indices[slot]
+            if entry == self.EMPTY:
+                return slot, -1
+            if entry >= 0 and hashes[entry] == hash_value and keys[entry] == key:
+                return slot, entry
+            perturb >>= self.PERTURB_SHIFT
+            slot = (slot * 5 + perturb + 1) & mask
 
     def insert(self, key: str, value: Any) -> None:
-        """Insert or update a key-value pair."""
-        # TODO: Implement
-        pass
+        """Insert or update a key-value pair (an update keeps its position)."""
+        hash_value = self._hash(key)
+        slot, entry = self._lookup(key, hash_value)
+        if entry >= 0:
+            self.values[entry] = value
+            return
+        if self.usable <= 0:
+            self._resize()
+            slot, _ = self._lookup(key, hash_value)
+        self.indices[slot] = len(self.keys)
+        self.keys.append(key)
+        self.values.append(value)
+        self.hashes.append(hash_value)
+        self.usable -= 1
+        self.count += 1
 
     def search(self, key: str) -> Optional[Any]:
         """Search for a key."""
-        # TODO: Implement
-        pass
+        _, entry = self._lookup(key, self._hash(key))
+        return None if entry < 0 else self.values[entry]
 
     def delete(self, key: str) -> bool:
-        """Delete a key."""
-        # TODO: Implement
-        pass
+        """Delete a key, leaving a DUMMY index slot and a hole in the entries."""
+        slot, entry = self._lookup(key, self._hash(key))
+        if entry < 0:
+            return False
+        self.indices[slot] = self.DUMMY
+        self.keys[entry] = self.values[entry] = None
+        self.count -= 1
+        return True
+
+    def _resize(self) -> None:
+        """
+        Compact the entries (dropping holes) and rebuild the index with room
+        for three times the live entries, reusing the stored hashes.
+        """
+        live = [entry for entry, key in enumerate(self.keys) if key is not None]
+        self.keys = [self.keys[entry] for entry in live]
+        self.values = [self.values[entry] for entry in live]
+        self.hashes = array('Q', [self.hashes[entry] for entry in live])
+        self.size = 8
+        while self.size < 3 * self.count:
+            self.size *= 2
+        self.indices = self._new_indices(self.size)
+        mask = self.size - 1
+        for entry, hash_value in enumerate(self.hashes):
+            perturb = hash_value
+            slot = hash_value & mask
+            while self.indices[slot] != self.EMPTY:
+                perturb >>= self.PERTURB_SHIFT
+                slot = (slot * 5 + perturb + 1) & mask
+            self.indices[slot] = entry
+        self.usable = self.size * 2 // 3 - self.count
+
+    def __iter__(self) -> Iterator[str]:
+        """Keys in insertion order."""
+        return (key for key in self.keys if key is not None)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """(key, value) pairs in insertion order."""
+        return ((key, value) for key, value in zip(self.keys, self.values) if key is not None)
+
+
+def make_table(strategy: CollisionStrategy, initial_size: int = 16,
+               incremental: bool = False,
+               hash_function: HashFunction = full_polynomial_hash):
+    """
+    Create an empty hash table using the given collision strategy.
+
+    incremental selects IncrementalHashTable, which rehashes a few buckets
+    per operation instead of all at once (chaining only). hash_function is
+    the full-width hash every table caches per entry (see HASH_FUNCTIONS).
+    """
+    if incremental:
+        if strategy is not CollisionStrategy.CHAINING:
+            raise ValueError(f"Incremental rehashing needs {CollisionStrategy.CHAINING}")
+        return IncrementalHashTable(initial_size, hash_function)
+    return TABLE_CLASSES[strategy](initial_size, hash_function)
+
+
+TABLE_CLASSES = {
+    CollisionStrategy.CHAINING: ChainedHashTable,
+    CollisionStrategy.LINEAR_PROBING: LinearProbingHashTable,
+    CollisionStrategy.DOUBLE_HASHING: DoubleHashingTable,
+    CollisionStrategy.ROBIN_HOOD: RobinHoodHashTable,
+    CollisionStrategy.SWISS_TABLE: SwissHashTable,
+    CollisionStrategy.COMPACT_DICT: CompactHashTable,
+}
 
 
 # =============================================================================
-# Part 5: Advanced Data Structures
+# Part 8: Advanced Data Structures
 # =============================================================================
 
 class HashSet:
@@ -411,11 +1116,23 @@ class BloomFilter:
 # Testing and Analysis
 # =============================================================================
 
+def random_keys(count: int, length: int = 8, seed: int = 0) -> List[str]:
+    """Distinct random lowercase keys, reproducible from seed."""
+    import random
+    import string
+
+    rng = random.Random(seed)
+    keys = set()
+    while len(keys) < count:
+        keys.add(''.join(rng.choices(string.ascii_lowercase, k=length)))
+    return sorted(keys)
+
+
 def test_hash_distribution():
     """
     Test and compare hash function quality.
 
-    Challenge: Generate test data and measure collision rates
+    A collision is a word landing in a slot an earlier word already took.
     """
     import random
     import string
@@ -429,31 +1146,436 @@ def test_hash_distribution():
     # Test simple_hash
     simple_collisions = 0
     simple_slots = set()
-    # TODO: Count collisions
+    for word in words:
+        slot = simple_hash(word, table_size)
+        simple_collisions += slot in simple_slots
+        simple_slots.add(slot)
 
     # Test polynomial_hash
     poly_collisions = 0
     poly_slots = set()
-    # TODO: Count collisions
+    for word in words:
+        slot = polynomial_hash(word, table_size)
+        poly_collisions += slot in poly_slots
+        poly_slots.add(slot)
 
     print(f"Simple hash: {simple_collisions} collisions, {len(simple_slots)} unique slots")
     print(f"Polynomial hash: {poly_collisions} collisions, {len(poly_slots)} unique slots")
 
+    # The full-width hash functions, in a table with room for every word.
+    # A uniform hash leaves m * (1 - (1 - 1/m)^n) slots taken.
+    table_size = 2048
+    distinct = set(words)
+    expected = len(distinct) - table_size * (1 - (1 - 1 / table_size) ** len(distinct))
+    for name, hash_function in HASH_FUNCTIONS.items():
+        collisions = len(distinct) - len({hash_function(word) % table_size for word in distinct})
+        ok = abs(collisions - expected) <= expected / 4
+        print(f"  {'✓' if ok else '✗'} {name}: {collisions} collisions in {table_size} slots "
+              f"(uniform: {expected:.0f})")
+
+    # The keyed and builtin hashes must also scramble every output bit
+    for name in ('siphash', 'builtin'):
+        spread = avalanche(HASH_FUNCTIONS[name], words[:100])
+        ok = 0.45 <= spread <= 0.55
+        print(f"  {'✓' if ok else '✗'} {name}: avalanche {spread:.3f} (ideal 0.5)")
+
+
+def test_hash_tables(operations: int = 20000):
+    """Check every strategy against a dict under random inserts, updates and deletes."""
+    import random
 
-def benchmark_collision_strategies():
+    keys = random_keys(500, length=3)
+    variants = [(strategy, False) for strategy in CollisionStrategy]
+    variants.append((CollisionStrategy.CHAINING, True))
+    for strategy, incremental in variants:
+        rng = random.Random(1)
+        table = make_table(strategy, initial_size=8, incremental=incremental)
+        expected = {}
+        ok = True
+        for step in range(operations):
+            key = rng.choice(keys)
+            action = rng.random()
+            if action < 0.5:
+                table.insert(key, step)
+                expected[key] = step
+            elif action < 0.8:
+                ok &= table.delete(key) == (expected.pop(key, None) is not None)
+            else:
+                ok &= table.search(key) == expected.get(key)
+        ok &= table.count == len(expected)
+        ok &= all(table.search(key) == expected.get(key) for key in keys)
+        if strategy is CollisionStrategy.COMPACT_DICT:
+            ok &= list(table.items()) == list(expected.items())  # Insertion order, like dict
+        name = strategy.value + (" (incremental)" if incremental else "")
+        print(f"  {'✓' if ok else '✗'} {name}: {operations} random operations")
+
+    # Incremental rehashing: keys stay reachable while both tables are live
+    table = IncrementalHashTable(8)
+    grown = random_keys(5000, seed=2)
+    ok, overlapping = True, 0
+    for n, key in enumerate(grown):
+        table.insert(key, n)
+        if table.old_table is not None:
+            overlapping += 1
+            ok &= table.search(grown[n // 2]) == n // 2
+    table.finish_rehash()
+    ok &= overlapping > 0 and table.old_table is None
+    ok &= table.count == len(grown) == sum(len(chain) for chain in table.table if chain)
+    print(f"  {'✓' if ok else '✗'} chaining (incremental): lookups during "
+          f"{overlapping} operations of rehashing")
+
+    # SipHash-2-4 reference vectors (key 00..0f, messages 00..n-1)
+    secret = bytes(range(16))
+    ok = (siphash24(b'', secret) == 0x726fdb47dd0e0e31
+          and siphash24(bytes(range(8)), secret) == 0x93f5f5799a932462
+          and siphash24(bytes(range(15)), secret) == 0xa129ca6149be45e5)
+    print(f"  {'✓' if ok else '✗'} siphash24: reference test vectors")
+
+    # Every table with every hash function; each key is hashed once per
+    # operation, never again when the table grows
+    grown = random_keys(3000, seed=3)
+    for name, hash_function in HASH_FUNCTIONS.items():
+        calls = 0
+
+        def counted(key: str) -> int:
+            nonlocal calls
+            calls += 1
+            return hash_function(key)
+
+        ok = True
+        for strategy, incremental in variants:
+            calls = 0
+            table = make_table(strategy, initial_size=8, incremental=incremental,
+                               hash_function=counted)
+            for n, key in enumerate(grown):
+                table.insert(key, n)
+            ok &= calls == len(grown) and table.count == len(grown)
+            ok &= all(table.search(key) == n for n, key in enumerate(grown))
+            ok &= table.search("absent") is None
+        print(f"  {'✓' if ok else '✗'} {name}: all tables, one hash per insert "
+              f"through every resize")
+
+    # Robin Hood invariants: exact distances, no tombstones, runs ordered by home
+    table = RobinHoodHashTable(8)
+    for key in keys:
+        table.insert(key, key)
+    for key in keys[::2]:
+        table.delete(key)
+    size = table.size
+    ok = all((entry is None) == (distance == table.EMPTY)
+             for entry, distance in zip(table.table, table.distances))
+    ok &= all(distance == (i - entry[2] % size) % size
+              for i, (entry, distance) in enumerate(zip(table.table, table.distances))
+              if entry is not None)
+    ok &= all(table.distances[(i + 1) % size] <= distance + 1
+              for i, distance in enumerate(table.distances))
+    print(f"  {'✓' if ok else '✗'} robin_hood: distances exact, no tombstones after deletes")
+
+    # Swiss summaries: exactly the h2 bytes and EMPTY slots of each group,
+    # through deletes that leave tombstones and inserts that reuse them
+    table = SwissHashTable(8)
+    for key in keys:
+        table.insert(key, key)
+    for key in keys[::2]:
+        table.delete(key)
+    for key in keys[::4]:
+        table.insert(key, key)
+    width = table.GROUP_SIZE
+    expected = []
+    for start in range(0, table.size, width):
+        summary = 0
+        for byte in table.control[start:start + width]:
+            if byte == table.EMPTY:
+                summary |= table.HAS_EMPTY
+            elif byte != table.DELETED:
+                summary |= 1 << byte
+        expected.append(summary)
+    ok = table.summaries == expected and table.tombstones == table.control.count(table.DELETED)
+    print(f"  {'✓' if ok else '✗'} swiss_table: group summaries match the control bytes")
+
+
+def benchmark_collision_strategies(count: int = 20000):
     """
     Compare performance of different collision resolution strategies.
 
-    Challenge: Measure insertion, search, and deletion times
+    Times inserting count keys, finding each (hits), looking up as many
+    absent keys (misses), and deleting them all.
     """
     import time
-    import random
-    import string
 
-    # TODO: Generate test data
-    # TODO: Test each strategy
-    # TODO: Measure and compare performance
-    pass
+    keys = random_keys(2 * count)
+    present, absent = keys[::2], keys[1::2]
+    print(f"{'strategy':<16} {'insert':>9} {'hit':>9} {'miss':>9} {'delete':>9}  (µs/op)")
+    for strategy in CollisionStrategy:
+        table = make_table(strategy)
+        timings = []
+        start = time.perf_counter()
+        for key in present:
+            table.insert(key, key)
+        timings.append(time.perf_counter() - start)
+        for operation, batch in ((table.search, present), (table.search, absent),
+                                 (table.delete, present)):
+            start = time.perf_counter()
+            for key in batch:
+                operation(key)
+            timings.append(time.perf_counter() - start)
+        timings = [seconds / count * 1e6 for seconds in timings]
+        print(f"{strategy.value:<16}" + "".join(f" {t:>9.2f}" for t in timings))
+
+
+def benchmark_churn(live: int = 20000, cycles: int = 40000):
+    """
+    Insert/delete churn on the open-addressing tables.
+
+    Keeps `live` keys in the table while each cycle deletes the oldest key
+    and inserts a new one. Reports the cycle rate, then the cost of misses
+    after churn, measured in time and in slots probed, and the spread of
+    probe distances, which Robin Hood hashing keeps narrow. Tombstones
+    count towards when the other tables resize, so they end up at a lower
+    load factor (more memory) than Robin Hood for the same keys.
+    """
+    import statistics
+    import time
+    from collections import deque
+
+    keys = random_keys(live + cycles + live)
+    initial, incoming, absent = keys[:live], keys[live:live + cycles], keys[live + cycles:]
+
+    def miss_probes(table, key: str) -> int:
+        """Slots a search for an absent key examines."""
+        hash_value = table.hash_function(key)
+        index, probes = hash_value % table.size, 1
+        if isinstance(table, RobinHoodHashTable):
+            distance = 0
+            while table.distances[index] >= distance:
+                index, probes, distance = (index + 1) % table.size, probes + 1, distance + 1
+        else:
+            step = table._step(hash_value)
+            while table.table[index] is not None:
+                index, probes = (index + step) % table.size, probes + 1
+        return probes
+
+    def distances(table) -> List[int]:
+        """How far each entry sits from its home slot along its probe sequence."""
+        if isinstance(table, RobinHoodHashTable):
+            return [d for d in table.distances if d != table.EMPTY]
+        result = []
+        for index, entry in enumerate(table.table):
+            if entry is not None and entry is not table.DELETED:
+                probe, step, distance = entry[2] % table.size, table._step(entry[2]), 0
+                while probe != index:
+                    probe, distance = (probe + step) % table.size, distance + 1
+                result.append(distance)
+        return result
+
+    print(f"churn: {live} live keys, {cycles} delete+insert cycles")
+    print(f"{'strategy':<16} {'cycles/s':>9} {'load':>5} {'miss µs':>8} {'miss probes':>12} "
+          f"{'mean dist':>10} {'max dist':>9} {'variance':>9} {'tombstones':>11}")
+    for strategy in (CollisionStrategy.LINEAR_PROBING, CollisionStrategy.DOUBLE_HASHING,
+                     CollisionStrategy.ROBIN_HOOD):
+        table = make_table(strategy)
+        for key in initial:
+            table.insert(key, key)
+        order = deque(initial)
+        start = time.perf_counter()
+        for key in incoming:
+            table.delete(order.popleft())
+            table.insert(key, key)
+            order.append(key)
+        rate = cycles / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for key in absent:
+            table.search(key)
+        miss = (time.perf_counter() - start) / len(absent) * 1e6
+        probes = statistics.mean(miss_probes(table, key) for key in absent)
+        spread = distances(table)
+        print(f"{strategy.value:<16} {rate:>9.0f} {table.load_factor():>5.2f} "
+              f"{miss:>8.2f} {probes:>12.2f} "
+              f"{statistics.mean(spread):>10.2f} {max(spread):>9} "
+              f"{statistics.pvariance(spread):>9.2f} {getattr(table, 'tombstones', 0):>11}")
+
+
+def benchmark_misses(count: int = 24000, lookups: int = 50000, repeat: int = 5):
+    """
+    Miss-heavy lookups on the open-addressing tables.
+
+    Every table holds the same count keys in 32768 slots (load 0.73, just
+    below where the probing tables resize), and 90% of the lookups are for
+    absent keys. Hashing the query is timed on its own and the probe time
+    is what is left. Best of `repeat` runs.
+    """
+    import time
+
+    keys = random_keys(count + lookups)
+    stored, absent = keys[:count], keys[count:]
+    queries = [stored[i % count] if i % 10 == 0 else absent[i] for i in range(lookups)]
+    strategies = (CollisionStrategy.LINEAR_PROBING, CollisionStrategy.DOUBLE_HASHING,
+                  CollisionStrategy.ROBIN_HOOD, CollisionStrategy.SWISS_TABLE)
+    tables = {}
+    for strategy in strategies:
+        tables[strategy] = make_table(strategy)
+        for key in stored:
+            tables[strategy].insert(key, key)
+    hashing = dict.fromkeys(strategies, float('inf'))
+    lookup = dict.fromkeys(strategies, float('inf'))
+    for _ in range(repeat):
+        for strategy, table in tables.items():
+            start = time.perf_counter()
+            hash_function = table.hash_function
+            for key in queries:
+                hash_function(key)
+            hashing[strategy] = min(hashing[strategy], time.perf_counter() - start)
+            start = time.perf_counter()
+            for key in queries:
+                table.search(key)
+            lookup[strategy] = min(lookup[strategy], time.perf_counter() - start)
+    print(f"misses: {count} keys, {lookups} lookups (90% misses)")
+    print(f"{'strategy':<16} {'slots':>6} {'lookup µs':>10} {'hash µs':>8} {'probe µs':>9}")
+    for strategy, table in tables.items():
+        total, hashed = lookup[strategy] / lookups * 1e6, hashing[strategy] / lookups * 1e6
+        print(f"{strategy.value:<16} {table.size:>6} {total:>10.2f} {hashed:>8.2f} "
+              f"{total - hashed:>9.2f}")
+
+
+def benchmark_hash_functions(count: int = 20000, repeat: int = 3):
+    """
+    Speed and quality of each function in HASH_FUNCTIONS.
+
+    - hashes/s: best of `repeat` runs over count random 8-letter keys
+    - chi²/df: sequential keys "user:0", "user:1", ... spread over 1024
+      buckets; about 1 for a uniform hash, far above 1 for a clumpy one
+    - avalanche: fraction of the 64 output bits that change when one input
+      bit flips; 0.5 is ideal
+    - flood: inserting 2048 keys built from the blocks "Aa" and "BB", which
+      all share one polynomial hash, into a ChainedHashTable. Against the
+      polynomial hash every insert walks one long chain; a keyed hash gives
+      an attacker no way to build such keys.
+    """
+    import time
+
+    keys = random_keys(count)
+    sequential = [f"user:{n}" for n in range(64 * 1024)]
+    sample = keys[:200]
+    flood = ['']
+    for _ in range(11):
+        flood = [prefix + block for prefix in flood for block in ("Aa", "BB")]
+
+    print(f"hash functions: {count} keys, chi² over 1024 buckets, {len(flood)} flood keys")
+    print(f"{'function':<12} {'hashes/s':>10} {'chi²/df':>8} {'avalanche':>10} "
+          f"{'flood inserts/s':>16} {'longest chain':>14}")
+    for name, hash_function in HASH_FUNCTIONS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for key in keys:
+                hash_function(key)
+            best = min(best, time.perf_counter() - start)
+
+        buckets = [0] * 1024
+        for key in sequential:
+            buckets[hash_function(key) % 1024] += 1
+        expected = len(sequential) / 1024
+        chi2 = sum((n - expected) ** 2 for n in buckets) / expected / 1023
+
+        spread = avalanche(hash_function, sample)
+
+        table = ChainedHashTable(hash_function=hash_function)
+        start = time.perf_counter()
+        for key in flood:
+            table.insert(key, key)
+        flood_time = time.perf_counter() - start
+        longest = max(len(chain) for chain in table.table)
+
+        print(f"{name:<12} {count / best:>10,.0f} {chi2:>8.2f} {spread:>10.3f} "
+              f"{len(flood) / flood_time:>16,.0f} {longest:>14}")
+
+
+def benchmark_rehash_latency(count: int = 500_000):
+    """
+    Latency of each operation while a chained table grows to count keys,
+    rehashing all at once (ChainedHashTable) or incrementally
+    (IncrementalHashTable). Each operation inserts a key and then looks up
+    an earlier one. The cyclic garbage collector is paused so that its own
+    pauses do not show up as spikes.
+    """
+    import gc
+    import time
+
+    keys = random_keys(count)
+    print(f"rehash latency: {count} insert+search operations (µs)")
+    print(f"{'table':<14} {'p50':>7} {'p99':>7} {'p99.9':>8} {'p99.99':>9} {'max':>9} "
+          f"{'total s':>8}")
+    for incremental in (False, True):
+        table = make_table(CollisionStrategy.CHAINING, incremental=incremental)
+        latencies = []
+        clock = time.perf_counter_ns
+        gc.disable()
+        try:
+            for n, key in enumerate(keys):
+                start = clock()
+                table.insert(key, n)
+                table.search(keys[n // 2])
+                latencies.append(clock() - start)
+        finally:
+            gc.enable()
+        latencies.sort()
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000
+
+        name = "incremental" if incremental else "all at once"
+        print(f"{name:<14} {percentile(0.5):>7.1f} {percentile(0.99):>7.1f} "
+              f"{percentile(0.999):>8.1f} {percentile(0.9999):>9.1f} "
+              f"{latencies[-1] / 1000:>9.1f} {sum(latencies) / 1e9:>8.2f}")
+
+
+def structure_bytes(table: Any, shared: set) -> int:
+    """
+    Bytes held by a table's own objects: the instance, the lists, tuples and
+    arrays it reaches, and any ints too big to be cached. Objects whose ids
+    are in shared (the keys and values) and singletons are not counted.
+    """
+    import sys
+
+    seen = set(shared)
+    total = 0
+    pending = [table]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, (bool, type)):
+            continue
+        if type(obj) is int and -5 <= obj <= 256:
+            continue  # CPython caches small ints
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (list, tuple)):
+            pending.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            total += sys.getsizeof(vars(obj))
+            pending.extend(vars(obj).values())
+    return total
+
+
+def benchmark_memory(count: int = 1_000_000):
+    """
+    Bytes per entry of each table holding count keys, not counting the
+    keys and values themselves (see structure_bytes).
+    """
+    import time
+
+    keys = random_keys(count)
+    shared = {id(key) for key in keys}
+    print(f"memory: {count} keys")
+    print(f"{'strategy':<16} {'slots':>9} {'load':>5} {'bytes/entry':>12} {'build s':>8}")
+    for strategy in CollisionStrategy:
+        start = time.perf_counter()
+        table = make_table(strategy)
+        for key in keys:
+            table.insert(key, key)
+        seconds = time.perf_counter() - start
+        print(f"{strategy.value:<16} {table.size:>9} {table.load_factor():>5.2f} "
+              f"{structure_bytes(table, shared) / count:>12.1f} {seconds:>8.1f}")
+        del table
 
 
 def test_spell_checker():
@@ -479,5 +1601,21 @@ if __name__ == "__main__":
     print("Testing hash distribution...")
     test_hash_distribution()
 
+    print("\nTesting hash tables...")
+    test_hash_tables()
+
+    print("\n" + "=" * 50)
+    benchmark_collision_strategies()
+    print()
+    benchmark_churn()
+    print()
+    benchmark_misses()
+    print()
+    benchmark_hash_functions()
+    print()
+    benchmark_memory()
+    print()
+    benchmark_rehash_latency()
+
     print("\n" + "=" * 50)
     print("Implement the other functions to enable more tests!")
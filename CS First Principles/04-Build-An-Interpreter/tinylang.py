@@ -3,11 +3,76 @@ TinyLang: Build an Interpreter from First Principles
 
 This module implements a complete interpreter for a simple programming language.
 Work through GUIDE.md to understand each component deeply.
+
+Three execution backends are provided:
+- "vm":      compile the AST to bytecode and run it on a stack machine (default)
+- "tree":    walk the AST directly with the Evaluator (reference implementation)
+- "closure": compile the AST to nested Python closures
+
+NumPy is optional; it is only needed for TinyLang(numeric=True).
 """
 
-from typing import List, Any, Optional, Dict
-from dataclasses import dataclass
-from enum import Enum, auto
+from typing import (List, Any, Optional, Dict, Tuple, NamedTuple, Iterable, Iterator, Deque,
+                    Callable, Set)
+import asyncio
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field, fields
+from enum import Enum, IntEnum, auto
+import gc
+import hashlib
+import inspect
+import io
+import json
+import math
+import operator
+import os
+import pickle
+import re
+import signal
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:  # only the numeric builtins need it
+    np = None
+
+
+# =============================================================================
+# Errors
+# =============================================================================
+
+class TinyLangError(Exception):
+    """Base class for all errors reported by the interpreter."""
+
+    def __init__(self, message: str, line: int = 0, column: int = 0):
+        self.message = message
+        self.line = line
+        self.column = column
+        if line:
+            message = f"{message} (line {line}, column {column})"
+        super().__init__(message)
+
+
+class LexerError(TinyLangError):
+    """Invalid characters or unterminated literals."""
+
+
+class ParseError(TinyLangError):
+    """Unexpected tokens or invalid syntax."""
+
+
+class TinyLangRuntimeError(TinyLangError):
+    """Errors raised while executing a program (undefined names, bad types, ...)."""
+
+
+class BudgetExceeded(TinyLangRuntimeError):
+    """A program used more steps or memory than its Budget allows."""
 
 
 # =============================================================================
@@ -26,6 +91,7 @@ class TokenType(Enum):
     ELSE = auto()
     WHILE = auto()
     FOR = auto()
+    IN = auto()
     FUNC = auto()
     RETURN = auto()
     TRUE = auto()
@@ -64,15 +130,20 @@ class TokenType(Enum):
     COMMA = auto()      # ,
     SEMICOLON = auto()  # ;
     COLON = auto()      # :
+    AT = auto()         # @ (function annotations)
 
     # Special
     EOF = auto()
     NEWLINE = auto()
 
 
-@dataclass
-class Token:
-    """Represents a token from the lexer."""
+class Token(NamedTuple):
+    """
+    Represents a token from the lexer.
+
+    A NamedTuple rather than a dataclass: tokens are immutable, allocated by
+    the million on large sources, and a tuple has no per-instance __dict__.
+    """
     type: TokenType
     value: Any
     line: int
@@ -94,6 +165,7 @@ class Lexer:
         'else': TokenType.ELSE,
         'while': TokenType.WHILE,
         'for': TokenType.FOR,
+        'in': TokenType.IN,
         'func': TokenType.FUNC,
         'return': TokenType.RETURN,
         'true': TokenType.TRUE,
@@ -104,6 +176,47 @@ class Lexer:
         'not': TokenType.NOT,
     }
 
+    KEYWORD_VALUES = {
+        TokenType.TRUE: True,
+        TokenType.FALSE: False,
+        TokenType.NULL: None,
+    }
+
+    TWO_CHAR_TOKENS = {
+        '**': TokenType.POWER,
+        '==': TokenType.EQUALS_EQUALS,
+        '!=': TokenType.NOT_EQUALS,
+        '<=': TokenType.LESS_EQUAL,
+        '>=': TokenType.GREATER_EQUAL,
+    }
+
+    SINGLE_CHAR_TOKENS = {
+        '+': TokenType.PLUS,
+        '-': TokenType.MINUS,
+        '*': TokenType.MULTIPLY,
+        '/': TokenType.DIVIDE,
+        '%': TokenType.MODULO,
+        '=': TokenType.EQUALS,
+        '<': TokenType.LESS_THAN,
+        '>': TokenType.GREATER_THAN,
+        '(': TokenType.LPAREN,
+        ')': TokenType.RPAREN,
+        '{': TokenType.LBRACE,
+        '}': TokenType.RBRACE,
+        '[': TokenType.LBRACKET,
+        ']': TokenType.RBRACKET,
+        ',': TokenType.COMMA,
+        ';': TokenType.SEMICOLON,
+        ':': TokenType.COLON,
+        '@': TokenType.AT,
+    }
+
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', '\\': '\\', '"': '"', "'": "'"}
+
+    DIGITS = frozenset(string.digits)
+    IDENTIFIER_START = frozenset(string.ascii_letters + '_')
+    IDENTIFIER_CHARS = IDENTIFIER_START | DIGITS
+
     def __init__(self, source: str):
         self.source = source
         self.pos = 0
@@ -113,179 +226,421 @@ class Lexer:
 
     def current_char(self) -> Optional[str]:
         """Get current character without advancing."""
-        # TODO: Implement
-        pass
+        if self.pos < len(self.source):
+            return self.source[self.pos]
+        return None
 
     def peek_char(self, offset: int = 1) -> Optional[str]:
         """Look ahead at future character."""
-        # TODO: Implement
-        pass
+        pos = self.pos + offset
+        if pos < len(self.source):
+            return self.source[pos]
+        return None
 
     def advance(self) -> Optional[str]:
         """Move to next character and return it."""
-        # TODO: Implement
-        # Remember to track line and column numbers!
-        pass
+        char = self.current_char()
+        if char is None:
+            return None
+        self.pos += 1
+        if char == '\n':
+            self.line += 1
+            self.column = 1
+        else:
+            self.column += 1
+        return char
 
     def skip_whitespace(self):
         """Skip spaces and tabs (but not newlines)."""
-        # TODO: Implement
-        pass
+        while self.current_char() in (' ', '\t', '\r'):
+            self.advance()
 
     def skip_comment(self):
         """Skip single-line comments (e.g., // or #)."""
-        # TODO: Implement
-        pass
+        while self.current_char() is not None and self.current_char() != '\n':
+            self.advance()
 
     def read_number(self) -> Token:
         """
         Read a number token (integer or float).
 
-        Challenge: Handle both integers and decimals
+        Integers stay ints; a '.' followed by a digit makes a float.
         """
-        # TODO: Implement
-        pass
+        line, column = self.line, self.column
+        start = self.pos
+        while self.current_char() in self.DIGITS:
+            self.advance()
+        if self.current_char() == '.' and self.peek_char() in self.DIGITS:
+            self.advance()
+            while self.current_char() in self.DIGITS:
+                self.advance()
+            return Token(TokenType.NUMBER, float(self.source[start:self.pos]), line, column)
+        return Token(TokenType.NUMBER, int(self.source[start:self.pos]), line, column)
 
     def read_string(self) -> Token:
         """
         Read a string literal.
 
-        Challenge: Handle escape sequences like \n, \t, \"
+        Handles escape sequences like \\n, \\t, \\"
         """
-        # TODO: Implement
-        pass
+        line, column = self.line, self.column
+        quote = self.advance()
+        chars = []
+        while True:
+            char = self.advance()
+            if char is None:
+                raise LexerError("Unterminated string", line, column)
+            if char == quote:
+                break
+            if char == '\\':
+                escaped = self.advance()
+                if escaped is None:
+                    raise LexerError("Unterminated string", line, column)
+                chars.append(self.ESCAPES.get(escaped, '\\' + escaped))
+            else:
+                chars.append(char)
+        return Token(TokenType.STRING, ''.join(chars), line, column)
 
     def read_identifier(self) -> Token:
         """
         Read an identifier or keyword.
 
-        Challenge: Check if it's a keyword or identifier
+        Keywords are looked up in KEYWORDS once the whole word is read.
         """
-        # TODO: Implement
-        pass
+        line, column = self.line, self.column
+        start = self.pos
+        while self.current_char() in self.IDENTIFIER_CHARS:
+            self.advance()
+        word = self.source[start:self.pos]
+        token_type = self.KEYWORDS.get(word)
+        if token_type is None:
+            return Token(TokenType.IDENTIFIER, word, line, column)
+        return Token(token_type, self.KEYWORD_VALUES.get(token_type, word), line, column)
 
     def tokenize(self) -> List[Token]:
         """
         Main tokenization method.
 
-        Challenge: Handle all token types, track position for errors
+        Newlines are significant (they end statements) and become NEWLINE tokens.
+        The list always ends with an EOF token.
         """
-        # TODO: Implement
-        # Hint: Big switch/if-elif on current character
-        pass
+        self.tokens = list(self.stream())
+        return self.tokens
+
+    def stream(self) -> Iterator[Token]:
+        """
+        Yield tokens one at a time, ending with EOF.
+
+        The Parser can pull from this generator directly, so the full token
+        list never has to exist in memory.
+        """
+        while True:
+            char = self.current_char()
+            if char is None:
+                break
+
+            if char in (' ', '\t', '\r'):
+                self.skip_whitespace()
+                continue
+            if char == '#' or (char == '/' and self.peek_char() == '/'):
+                self.skip_comment()
+                continue
+
+            line, column = self.line, self.column
+            if char == '\n':
+                self.advance()
+                yield Token(TokenType.NEWLINE, '\n', line, column)
+            elif char in self.DIGITS:
+                yield self.read_number()
+            elif char in self.IDENTIFIER_START:
+                yield self.read_identifier()
+            elif char in ('"', "'"):
+                yield self.read_string()
+            elif char + (self.peek_char() or '') in self.TWO_CHAR_TOKENS:
+                lexeme = self.advance() + self.advance()
+                yield Token(self.TWO_CHAR_TOKENS[lexeme], lexeme, line, column)
+            elif char in self.SINGLE_CHAR_TOKENS:
+                self.advance()
+                yield Token(self.SINGLE_CHAR_TOKENS[char], char, line, column)
+            else:
+                raise LexerError(f"Unexpected character {char!r}", line, column)
+
+        yield Token(TokenType.EOF, None, self.line, self.column)
+
+
+class RegexLexer(Lexer):
+    """
+    Single-pass tokenizer driven by one compiled master regex.
+
+    Produces exactly the same tokens (and line/column positions) as the
+    character-at-a-time Lexer, but each lexeme is matched by the regex engine
+    in C rather than by a Python loop per character. Identifiers and keywords
+    are interned, so repeated names share one string object.
+    """
+
+    # Each match swallows the whitespace and comments before one token, so
+    # the Python loop runs once per token. Groups are numbered in this order
+    # and dispatched on match.lastindex. FLOAT must precede INT, and OP lists
+    # two-char operators first. END matches trailing blanks at end of input;
+    # MISMATCH turns any other character into an error.
+    TOKEN_SPEC = [
+        ('NAME', r'[A-Za-z_][A-Za-z0-9_]*'),
+        ('OP', r'\*\*|==|!=|<=|>=|[-+*/%=<>(){}\[\],;:@]'),
+        ('NEWLINE', r'\n'),
+        ('FLOAT', r'[0-9]+\.[0-9]+'),
+        ('INT', r'[0-9]+'),
+        ('STRING', r'"(?:[^"\\]|\\.)*"|' + r"'(?:[^'\\]|\\.)*'"),
+        ('END', r'\Z'),
+        ('MISMATCH', r'.'),
+    ]
+    NAME, OP, NEWLINE, FLOAT, INT, STRING, END, MISMATCH = range(1, len(TOKEN_SPEC) + 1)
+    MASTER_PATTERN = re.compile(
+        r'(?:[ \t\r]+|(?:#|//)[^\n]*)*(?:'
+        + '|'.join(f'({pattern})' for _, pattern in TOKEN_SPEC) + ')',
+        re.DOTALL)
+    ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+    OPERATOR_TOKENS = {**Lexer.SINGLE_CHAR_TOKENS, **Lexer.TWO_CHAR_TOKENS}
+
+    def __init__(self, source: str):
+        super().__init__(source)
+        # Word -> (token type, value); doubles as the intern table.
+        self.words: Dict[str, Tuple[TokenType, Any]] = {}
+
+    def _unescape(self, match: 're.Match') -> str:
+        escaped = match.group(1)
+        return self.ESCAPES.get(escaped, '\\' + escaped)
+
+    def _word(self, lexeme: str) -> Tuple[TokenType, Any]:
+        """Classify an identifier or keyword the first time it is seen."""
+        lexeme = sys.intern(lexeme)
+        token_type = self.KEYWORDS.get(lexeme)
+        if token_type is None:
+            entry = (TokenType.IDENTIFIER, lexeme)
+        else:
+            entry = (token_type, self.KEYWORD_VALUES.get(token_type, lexeme))
+        self.words[lexeme] = entry
+        return entry
+
+    def stream(self) -> Iterator[Token]:
+        """
+        Yield tokens in one pass over the master regex matches.
+
+        Columns are computed from the offset of the current line start, so
+        only NEWLINEs and multi-line strings need to update line tracking.
+        """
+        source = self.source
+        words, operators = self.words, self.OPERATOR_TOKENS
+        new_token = tuple.__new__  # skips NamedTuple's Python-level __new__
+        NAME, OP, NEWLINE, FLOAT, INT, STRING, END = \
+            self.NAME, self.OP, self.NEWLINE, self.FLOAT, self.INT, self.STRING, self.END
+        NUMBER = TokenType.NUMBER
+
+        line = 1
+        line_start = 0
+        for match in self.MASTER_PATTERN.finditer(source):
+            kind = match.lastindex
+            lexeme = match.group(kind)
+            start = match.start(kind)
+            column = start - line_start + 1
+            if kind == NAME:
+                entry = words.get(lexeme) or self._word(lexeme)
+                yield new_token(Token, (entry[0], entry[1], line, column))
+            elif kind == OP:
+                yield new_token(Token, (operators[lexeme], lexeme, line, column))
+            elif kind == NEWLINE:
+                yield new_token(Token, (TokenType.NEWLINE, '\n', line, column))
+                line += 1
+                line_start = start + 1
+            elif kind == INT:
+                yield new_token(Token, (NUMBER, int(lexeme), line, column))
+            elif kind == FLOAT:
+                yield new_token(Token, (NUMBER, float(lexeme), line, column))
+            elif kind == STRING:
+                body = lexeme[1:-1]
+                if '\\' in body:
+                    body = self.ESCAPE_PATTERN.sub(self._unescape, body)
+                yield new_token(Token, (TokenType.STRING, body, line, column))
+                newlines = lexeme.count('\n')
+                if newlines:
+                    line += newlines
+                    line_start = start + lexeme.rindex('\n') + 1
+            elif kind == END:
+                break
+            elif lexeme in ('"', "'"):
+                raise LexerError("Unterminated string", line, column)
+            else:
+                raise LexerError(f"Unexpected character {lexeme!r}", line, column)
+
+        self.line, self.column, self.pos = line, len(source) - line_start + 1, len(source)
+        yield Token(TokenType.EOF, None, self.line, self.column)
 
 
 # =============================================================================
 # Part 2: Abstract Syntax Tree (AST) Nodes
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
-    """Base class for all AST nodes."""
-    line: int = 0
-    column: int = 0
+    """
+    Base class for all AST nodes.
+
+    Nodes are slotted: a program has one per expression, and slots store
+    the fields inline in the object instead of in a per-node __dict__.
+    """
+    # Keyword-only so subclasses can declare required fields after them.
+    # Positions are not part of ==: two trees are equal if they mean the same.
+    line: int = field(default=0, kw_only=True, compare=False)
+    column: int = field(default=0, kw_only=True, compare=False)
+    # Set by the Resolver: whether evaluating this node may call a function.
+    has_call: bool = field(default=True, kw_only=True, repr=False, compare=False)
+
+
+def resolved(default: Any = None) -> Any:
+    """A field filled in by the Resolver (hidden from repr and ==)."""
+    return field(default=default, kw_only=True, repr=False, compare=False)
 
 
 # Literals
-@dataclass
+@dataclass(slots=True)
 class NumberNode(ASTNode):
     value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class StringNode(ASTNode):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BooleanNode(ASTNode):
     value: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class NullNode(ASTNode):
     pass
 
 
 # Variables
-@dataclass
+@dataclass(slots=True)
 class VariableNode(ASTNode):
     name: str
+    depth: int = resolved()
+    slot: int = resolved()
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentNode(ASTNode):
     name: str
     value: ASTNode
+    depth: int = resolved()
+    slot: int = resolved()
 
 
 # Operations
-@dataclass
+@dataclass(slots=True)
 class BinaryOpNode(ASTNode):
     left: ASTNode
     operator: str
     right: ASTNode
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOpNode(ASTNode):
     operator: str
     operand: ASTNode
 
 
+# Arrays
+@dataclass(slots=True)
+class ArrayNode(ASTNode):
+    elements: List[ASTNode]
+
+
+@dataclass(slots=True)
+class IndexNode(ASTNode):
+    target: ASTNode
+    index: ASTNode
+
+
+@dataclass(slots=True)
+class SliceNode(ASTNode):
+    target: ASTNode
+    start: Optional[ASTNode] = None  # None: from the beginning
+    stop: Optional[ASTNode] = None   # None: to the end
+
+
+@dataclass(slots=True)
+class IndexAssignmentNode(ASTNode):
+    target: ASTNode
+    index: ASTNode
+    value: ASTNode
+
+
 # Control Flow
-@dataclass
+@dataclass(slots=True)
 class IfNode(ASTNode):
     condition: ASTNode
     then_branch: ASTNode
     else_branch: Optional[ASTNode] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileNode(ASTNode):
     condition: ASTNode
     body: ASTNode
 
 
-@dataclass
+@dataclass(slots=True)
 class ForNode(ASTNode):
     variable: str
     iterable: ASTNode
     body: ASTNode
+    depth: int = resolved()
+    slot: int = resolved()
 
 
 # Functions
-@dataclass
+@dataclass(slots=True)
 class FunctionDefNode(ASTNode):
     name: str
     params: List[str]
     body: ASTNode
+    memo_size: int = 0  # results cached by @memo; 0 if not memoized
+    depth: int = resolved()
+    slot: int = resolved()
+    local_count: int = resolved(0)
+    local_names: List[str] = resolved()
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCallNode(ASTNode):
     name: str
     arguments: List[ASTNode]
+    depth: int = resolved()
+    slot: int = resolved()
+    inline_cache: Any = resolved()  # CallSite, filled in by the Evaluator
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnNode(ASTNode):
     value: Optional[ASTNode] = None
 
 
 # Compound
-@dataclass
+@dataclass(slots=True)
 class BlockNode(ASTNode):
     statements: List[ASTNode]
 
 
-@dataclass
+@dataclass(slots=True)
 class ProgramNode(ASTNode):
     statements: List[ASTNode]
 
 
 # =============================================================================
-# Part 3: Parser
+# Part 3: Parser and Optimizer
 # =============================================================================
 
 class Parser:
@@ -293,215 +648,1605 @@ class Parser:
     Parser for TinyLang.
 
     Converts tokens into an Abstract Syntax Tree (AST).
+
+    Grammar (lowest to highest precedence):
+        expression     := logical_and ('or' logical_and)*
+        logical_and    := comparison ('and' comparison)*
+        comparison     := additive (('==' | '!=' | '<' | '>' | '<=' | '>=') additive)*
+        additive       := multiplicative (('+' | '-') multiplicative)*
+        multiplicative := unary (('*' | '/' | '%') unary)*
+        unary          := ('-' | 'not') unary | power
+        power          := postfix ('**' unary)?
+        postfix        := primary ('[' expression ']' | '[' expression? ':' expression? ']')*
+        primary        := NUMBER | STRING | 'true' | 'false' | 'null'
+                        | IDENTIFIER ('(' arguments ')')? | '(' expression ')'
+                        | '[' (expression (',' expression)* ','?)? ']'
+
+    Expressions are parsed by one Pratt loop driven by BINDING_POWERS
+    rather than a method per level; PrecedenceClimbingParser keeps the
+    method-per-level version. An indexed expression followed by '=' is an
+    element assignment, and `@memo` or `@memo(size)` before a function
+    definition memoizes the function.
     """
 
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.pos = 0
+    # How tightly each binary operator binds; 0 (absent) ends an expression.
+    # Prefix '-' and 'not' bind between '*' and '**', so -x ** 2 is -(x ** 2)
+    # and -x * 2 is (-x) * 2.
+    BINDING_POWERS = {
+        TokenType.OR: 1,
+        TokenType.AND: 2,
+        TokenType.EQUALS_EQUALS: 3, TokenType.NOT_EQUALS: 3,
+        TokenType.LESS_THAN: 3, TokenType.GREATER_THAN: 3,
+        TokenType.LESS_EQUAL: 3, TokenType.GREATER_EQUAL: 3,
+        TokenType.PLUS: 4, TokenType.MINUS: 4,
+        TokenType.MULTIPLY: 5, TokenType.DIVIDE: 5, TokenType.MODULO: 5,
+        TokenType.POWER: 7,
+    }
+    PREFIX_BINDING_POWER = 6
+    RIGHT_ASSOCIATIVE = {TokenType.POWER}
+    STATEMENT_TERMINATORS = {TokenType.NEWLINE, TokenType.SEMICOLON}
+
+    def __init__(self, tokens: Iterable[Token]):
+        """
+        Args:
+            tokens: a token list, or an iterator such as Lexer.stream(); tokens
+                    are pulled only as the parser needs them
+        """
+        self.tokens = iter(tokens)
+        # Tokens pulled from the stream but not consumed yet; lookahead[0] is
+        # the current token. The grammar never needs more than two.
+        self.lookahead: Deque[Token] = deque()
+        self.last_token = Token(TokenType.EOF, None, 0, 0)
+        self.pos = 0  # number of tokens consumed
+        self.fill(1)
+
+    def fill(self, count: int):
+        """Pull tokens until the lookahead buffer holds at least count."""
+        while len(self.lookahead) < count:
+            # Past the end of the stream, keep repeating the final (EOF) token.
+            token = next(self.tokens, self.last_token)
+            self.lookahead.append(token)
+            self.last_token = token
 
     def current_token(self) -> Token:
         """Get current token."""
-        # TODO: Implement
-        pass
+        return self.lookahead[0]
 
     def peek_token(self, offset: int = 1) -> Token:
         """Look ahead at future token."""
-        # TODO: Implement
-        pass
+        if len(self.lookahead) <= offset:
+            self.fill(offset + 1)
+        return self.lookahead[offset]
 
     def advance(self) -> Token:
         """Move to next token and return current."""
-        # TODO: Implement
-        pass
+        token = self.lookahead[0]
+        if token.type != TokenType.EOF:
+            self.lookahead.popleft()
+            self.pos += 1
+            if not self.lookahead:
+                self.fill(1)
+        return token
 
     def expect(self, token_type: TokenType) -> Token:
         """
         Consume token of expected type or raise error.
 
-        Challenge: Provide helpful error messages
+        The error names both the expected and the actual token.
         """
-        # TODO: Implement
-        pass
+        token = self.current_token()
+        if token.type != token_type:
+            raise ParseError(
+                f"Expected {token_type.name} but found {token.type.name} ({token.value!r})",
+                token.line, token.column)
+        return self.advance()
+
+    def skip_terminators(self):
+        """Skip blank lines and semicolons between statements."""
+        while self.current_token().type in self.STATEMENT_TERMINATORS:
+            self.advance()
+
+    def end_statement(self):
+        """Require a newline, ';', '}' or end of input after a statement."""
+        token = self.current_token()
+        if token.type in self.STATEMENT_TERMINATORS:
+            self.skip_terminators()
+        elif token.type not in (TokenType.RBRACE, TokenType.EOF):
+            raise ParseError(f"Unexpected token {token.value!r} after statement",
+                             token.line, token.column)
 
     def parse(self) -> ProgramNode:
         """
         Parse entire program.
 
-        Challenge: Handle multiple statements
+        Statements are separated by newlines or semicolons.
         """
-        # TODO: Implement
-        pass
+        statements = []
+        self.skip_terminators()
+        while self.current_token().type != TokenType.EOF:
+            statements.append(self.parse_statement())
+            self.end_statement()
+        return ProgramNode(statements, line=1, column=1)
 
     def parse_statement(self) -> ASTNode:
         """
         Parse a single statement.
 
-        Challenge: Dispatch to correct parser based on token type
+        Dispatches on the first token; anything else is an expression.
         """
-        # TODO: Implement
-        pass
+        token = self.current_token()
+        if token.type == TokenType.IF:
+            return self.parse_if_statement()
+        if token.type == TokenType.WHILE:
+            return self.parse_while_statement()
+        if token.type == TokenType.FOR:
+            return self.parse_for_statement()
+        if token.type == TokenType.FUNC:
+            return self.parse_function_def()
+        if token.type == TokenType.AT:
+            return self.parse_memo_function_def()
+        if token.type == TokenType.RETURN:
+            return self.parse_return_statement()
+        if token.type == TokenType.IDENTIFIER and self.peek_token().type == TokenType.EQUALS:
+            return self.parse_assignment()
+        expression = self.parse_expression()
+        if isinstance(expression, IndexNode) and self.current_token().type == TokenType.EQUALS:
+            self.advance()
+            value = self.parse_expression()
+            return IndexAssignmentNode(expression.target, expression.index, value,
+                                       line=expression.line, column=expression.column)
+        return expression
+
+    def parse_block(self) -> BlockNode:
+        """Parse a brace-delimited block of statements."""
+        start = self.expect(TokenType.LBRACE)
+        statements = []
+        self.skip_terminators()
+        while self.current_token().type not in (TokenType.RBRACE, TokenType.EOF):
+            statements.append(self.parse_statement())
+            self.end_statement()
+        self.expect(TokenType.RBRACE)
+        return BlockNode(statements, line=start.line, column=start.column)
+
+    def parse_assignment(self) -> AssignmentNode:
+        """Parse `name = expression`."""
+        name = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.EQUALS)
+        value = self.parse_expression()
+        return AssignmentNode(name.value, value, line=name.line, column=name.column)
 
     def parse_if_statement(self) -> IfNode:
-        """Parse if-else statement."""
-        # TODO: Implement
-        pass
+        """Parse if-else statement (`else if` chains nest IfNodes)."""
+        start = self.expect(TokenType.IF)
+        condition = self.parse_expression()
+        then_branch = self.parse_block()
+        else_branch = None
+        if self.current_token().type == TokenType.ELSE:
+            self.advance()
+            if self.current_token().type == TokenType.IF:
+                else_branch = self.parse_if_statement()
+            else:
+                else_branch = self.parse_block()
+        return IfNode(condition, then_branch, else_branch, line=start.line, column=start.column)
 
     def parse_while_statement(self) -> WhileNode:
         """Parse while loop."""
-        # TODO: Implement
-        pass
+        start = self.expect(TokenType.WHILE)
+        condition = self.parse_expression()
+        body = self.parse_block()
+        return WhileNode(condition, body, line=start.line, column=start.column)
+
+    def parse_for_statement(self) -> ForNode:
+        """Parse `for name in iterable { ... }`."""
+        start = self.expect(TokenType.FOR)
+        variable = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.IN)
+        iterable = self.parse_expression()
+        body = self.parse_block()
+        return ForNode(variable.value, iterable, body, line=start.line, column=start.column)
 
     def parse_function_def(self) -> FunctionDefNode:
         """Parse function definition."""
-        # TODO: Implement
-        pass
+        start = self.expect(TokenType.FUNC)
+        name = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.LPAREN)
+        params = []
+        if self.current_token().type != TokenType.RPAREN:
+            params.append(self.expect(TokenType.IDENTIFIER).value)
+            while self.current_token().type == TokenType.COMMA:
+                self.advance()
+                params.append(self.expect(TokenType.IDENTIFIER).value)
+        self.expect(TokenType.RPAREN)
+        body = self.parse_block()
+        return FunctionDefNode(name.value, params, body, line=start.line, column=start.column)
+
+    def parse_memo_function_def(self) -> FunctionDefNode:
+        """Parse `@memo` or `@memo(size)`, then the function definition it marks."""
+        self.expect(TokenType.AT)
+        name = self.expect(TokenType.IDENTIFIER)
+        if name.value != 'memo':
+            raise ParseError(f"Unknown annotation '@{name.value}'", name.line, name.column)
+        size = MEMO_CACHE_SIZE
+        if self.current_token().type == TokenType.LPAREN:
+            self.advance()
+            size_token = self.expect(TokenType.NUMBER)
+            size = size_token.value
+            if type(size) is not int or size < 1:
+                raise ParseError("@memo size must be a positive integer",
+                                 size_token.line, size_token.column)
+            self.expect(TokenType.RPAREN)
+        self.skip_newlines()
+        if self.current_token().type != TokenType.FUNC:
+            token = self.current_token()
+            raise ParseError(f"Expected a function definition after @memo, "
+                             f"found {token.type.name} ({token.value!r})",
+                             token.line, token.column)
+        node = self.parse_function_def()
+        node.memo_size = size
+        return node
 
     def parse_return_statement(self) -> ReturnNode:
         """Parse return statement."""
-        # TODO: Implement
-        pass
+        start = self.expect(TokenType.RETURN)
+        value = None
+        if self.current_token().type not in (TokenType.NEWLINE, TokenType.SEMICOLON,
+                                             TokenType.RBRACE, TokenType.EOF):
+            value = self.parse_expression()
+        return ReturnNode(value, line=start.line, column=start.column)
+
+    def parse_expression(self, min_power: int = 0) -> ASTNode:
+        """
+        Parse an expression whose operators bind tighter than min_power.
+
+        Parses a prefix operator or a primary with its subscripts, then
+        keeps taking binary operators while the next one binds tighter than
+        min_power. Each right operand is parsed at its operator's own power,
+        so equal operators group to the left; a right-associative one uses
+        one less, so `a ** b ** c` is `a ** (b ** c)`. A literal costs two
+        calls (this and parse_primary) instead of one per precedence level.
+        """
+        lookahead = self.lookahead  # lookahead[0] is current_token(), without the call
+        token = lookahead[0]
+        if token.type == TokenType.MINUS or token.type == TokenType.NOT:
+            self.advance()
+            operand = self.parse_expression(self.PREFIX_BINDING_POWER)
+            left = UnaryOpNode(token.value, operand, line=token.line, column=token.column)
+        else:
+            left = self.parse_primary()
+            while lookahead[0].type == TokenType.LBRACKET:
+                left = self.parse_subscript(left)
+
+        binding_powers = self.BINDING_POWERS
+        while True:
+            op = lookahead[0]
+            power = binding_powers.get(op.type, 0)
+            if power <= min_power:
+                return left
+            self.advance()
+            if op.type in self.RIGHT_ASSOCIATIVE:
+                power -= 1
+            right = self.parse_expression(power)
+            left = BinaryOpNode(left, op.value, right, line=op.line, column=op.column)
+
+    def parse_subscript(self, node: ASTNode) -> ASTNode:
+        """Parse one `[i]` or `[i:j]` after node."""
+        bracket = self.expect(TokenType.LBRACKET)
+        position = {'line': bracket.line, 'column': bracket.column}
+        start = None
+        if self.current_token().type != TokenType.COLON:
+            start = self.parse_expression()
+        if self.current_token().type == TokenType.COLON:
+            self.advance()
+            stop = None
+            if self.current_token().type != TokenType.RBRACKET:
+                stop = self.parse_expression()
+            self.expect(TokenType.RBRACKET)
+            return SliceNode(node, start, stop, **position)
+        self.expect(TokenType.RBRACKET)
+        return IndexNode(node, start, **position)
+
+    def parse_primary(self) -> ASTNode:
+        """
+        Parse primary expressions (numbers, strings, variables, etc.).
+
+        Handles parentheses and function calls.
+        """
+        token = self.current_token()
+        position = {'line': token.line, 'column': token.column}
+
+        if token.type == TokenType.NUMBER:
+            self.advance()
+            return NumberNode(token.value, **position)
+        if token.type == TokenType.STRING:
+            self.advance()
+            return StringNode(token.value, **position)
+        if token.type in (TokenType.TRUE, TokenType.FALSE):
+            self.advance()
+            return BooleanNode(token.type == TokenType.TRUE, **position)
+        if token.type == TokenType.NULL:
+            self.advance()
+            return NullNode(**position)
+        if token.type == TokenType.IDENTIFIER:
+            self.advance()
+            if self.current_token().type == TokenType.LPAREN:
+                return FunctionCallNode(token.value, self.parse_arguments(), **position)
+            return VariableNode(token.value, **position)
+        if token.type == TokenType.LPAREN:
+            self.advance()
+            expr = self.parse_expression()
+            self.expect(TokenType.RPAREN)
+            return expr
+        if token.type == TokenType.LBRACKET:
+            return ArrayNode(self.parse_array_elements(), **position)
+
+        raise ParseError(f"Unexpected token {token.type.name} ({token.value!r})",
+                         token.line, token.column)
+
+    def parse_array_elements(self) -> List[ASTNode]:
+        """Parse `[a, b, ...]`; newlines between elements are ignored."""
+        self.expect(TokenType.LBRACKET)
+        elements = []
+        self.skip_newlines()
+        while self.current_token().type != TokenType.RBRACKET:
+            elements.append(self.parse_expression())
+            self.skip_newlines()
+            if self.current_token().type != TokenType.COMMA:
+                break
+            self.advance()
+            self.skip_newlines()
+        self.expect(TokenType.RBRACKET)
+        return elements
+
+    def skip_newlines(self):
+        """Skip NEWLINE tokens (inside brackets, where they end nothing)."""
+        while self.current_token().type == TokenType.NEWLINE:
+            self.advance()
+
+    def parse_arguments(self) -> List[ASTNode]:
+        """Parse a parenthesised, comma-separated argument list."""
+        self.expect(TokenType.LPAREN)
+        arguments = []
+        if self.current_token().type != TokenType.RPAREN:
+            arguments.append(self.parse_expression())
+            while self.current_token().type == TokenType.COMMA:
+                self.advance()
+                arguments.append(self.parse_expression())
+        self.expect(TokenType.RPAREN)
+        return arguments
+
+
+class PrecedenceClimbingParser(Parser):
+    """
+    Parser with one method per precedence level, as in the grammar.
+
+    Builds exactly the same AST as Parser, which parses expressions with a
+    table-driven Pratt loop instead; this version reads like the grammar
+    but goes through a call per level (nine in all) for every operand.
+    Kept as the reference for tests and benchmark_parsers.
+    """
+
+    COMPARISON_OPERATORS = {
+        TokenType.EQUALS_EQUALS, TokenType.NOT_EQUALS,
+        TokenType.LESS_THAN, TokenType.GREATER_THAN,
+        TokenType.LESS_EQUAL, TokenType.GREATER_EQUAL,
+    }
+    ADDITIVE_OPERATORS = {TokenType.PLUS, TokenType.MINUS}
+    MULTIPLICATIVE_OPERATORS = {TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO}
 
     def parse_expression(self) -> ASTNode:
         """
         Parse an expression (lowest precedence level).
 
-        Challenge: Handle operator precedence correctly
+        This handles logical OR; each level below binds tighter.
         """
-        # TODO: Implement
-        # This should handle logical OR (lowest precedence)
-        pass
+        left = self.parse_logical_and()
+        while self.current_token().type == TokenType.OR:
+            op = self.advance()
+            right = self.parse_logical_and()
+            left = BinaryOpNode(left, 'or', right, line=op.line, column=op.column)
+        return left
 
     def parse_logical_and(self) -> ASTNode:
         """Parse logical AND expressions."""
-        # TODO: Implement
-        pass
+        left = self.parse_comparison()
+        while self.current_token().type == TokenType.AND:
+            op = self.advance()
+            right = self.parse_comparison()
+            left = BinaryOpNode(left, 'and', right, line=op.line, column=op.column)
+        return left
 
     def parse_comparison(self) -> ASTNode:
         """Parse comparison expressions (==, !=, <, >, <=, >=)."""
-        # TODO: Implement
-        pass
+        left = self.parse_additive()
+        while self.current_token().type in self.COMPARISON_OPERATORS:
+            op = self.advance()
+            right = self.parse_additive()
+            left = BinaryOpNode(left, op.value, right, line=op.line, column=op.column)
+        return left
 
     def parse_additive(self) -> ASTNode:
         """Parse addition and subtraction."""
-        # TODO: Implement
-        pass
+        left = self.parse_multiplicative()
+        while self.current_token().type in self.ADDITIVE_OPERATORS:
+            op = self.advance()
+            right = self.parse_multiplicative()
+            left = BinaryOpNode(left, op.value, right, line=op.line, column=op.column)
+        return left
 
     def parse_multiplicative(self) -> ASTNode:
         """Parse multiplication and division."""
-        # TODO: Implement
-        pass
+        left = self.parse_unary()
+        while self.current_token().type in self.MULTIPLICATIVE_OPERATORS:
+            op = self.advance()
+            right = self.parse_unary()
+            left = BinaryOpNode(left, op.value, right, line=op.line, column=op.column)
+        return left
 
     def parse_unary(self) -> ASTNode:
         """Parse unary operators (-, not)."""
-        # TODO: Implement
-        pass
+        token = self.current_token()
+        if token.type in (TokenType.MINUS, TokenType.NOT):
+            self.advance()
+            operand = self.parse_unary()
+            return UnaryOpNode(token.value, operand, line=token.line, column=token.column)
+        return self.parse_power()
 
     def parse_power(self) -> ASTNode:
         """Parse exponentiation (right-associative)."""
-        # TODO: Implement
-        pass
+        base = self.parse_postfix()
+        if self.current_token().type == TokenType.POWER:
+            op = self.advance()
+            exponent = self.parse_unary()
+            return BinaryOpNode(base, '**', exponent, line=op.line, column=op.column)
+        return base
+
+    def parse_postfix(self) -> ASTNode:
+        """Parse indexing `a[i]` and slicing `a[i:j]` after a primary."""
+        node = self.parse_primary()
+        while self.current_token().type == TokenType.LBRACKET:
+            node = self.parse_subscript(node)
+        return node
+
+
+class Optimizer:
+    """
+    AST-to-AST optimization pass, run between Parser.parse and the Resolver.
+
+    - Constant folding: operators applied to literals become one literal
+      (`2 + 3 * 4` -> 14), including `and`/`or`/`not` on constants.
+    - Strength reduction: `x ** 2` becomes a `square` unary op for a
+      variable x, which multiplies ints and leaves everything else to `**`.
+    - Dead branches: an if with a constant condition is replaced by the branch
+      that runs; `while false` loops are removed. Names a dropped branch
+      assigns stay behind in a never-run `if false` stub, because the
+      Resolver still has to see them to decide which variables are global
+      and which are local to a function.
+
+    Folding uses apply_binary_op, so results are exactly what the program
+    would compute at runtime. An operation that would fail (`1 / 0`,
+    `"a" - 1`) is left alone so the error is still reported when it runs.
+    """
 
-    def parse_primary(self) -> ASTNode:
+    LITERAL_NODES = (NumberNode, StringNode, BooleanNode, NullNode)
+    FOLDABLE_OPERATORS = {'+', '-', '*', '/', '%', '**', '==', '!=', '<', '>', '<=', '>='}
+    # Folded strings and ints larger than this stay as runtime expressions
+    # rather than being baked into the program (e.g. "ab" * 100000).
+    MAX_FOLDED_SIZE = 1000
+
+    def __init__(self):
+        self.folded = 0
+        self.reduced = 0
+        self.pruned = 0
+
+    def optimize(self, program: ProgramNode) -> ProgramNode:
+        """Optimize a program in place and return it."""
+        program.statements = self.optimize_statements(program.statements)
+        return program
+
+    def optimize_statements(self, statements: List[ASTNode]) -> List[ASTNode]:
         """
-        Parse primary expressions (numbers, strings, variables, etc.).
+        Optimize a statement list.
 
-        Challenge: Handle parentheses, function calls, array access
+        Pruned ifs and loops come back as blocks, which are spliced into the
+        list (blocks do not create scopes). If the last statement disappears
+        this way, a null literal keeps it from handing the list's value to
+        the statement before it.
         """
-        # TODO: Implement
-        pass
+        result = []
+        for statement in statements:
+            statement = self.optimize_node(statement)
+            if isinstance(statement, BlockNode):
+                result.extend(statement.statements)
+                last_is_empty = not statement.statements
+            else:
+                result.append(statement)
+                last_is_empty = False
+        if statements and last_is_empty:
+            result.append(NullNode(line=statements[-1].line, column=statements[-1].column))
+        return result
+
+    def optimize_node(self, node: ASTNode) -> ASTNode:
+        """Return the optimized replacement for node (possibly node itself)."""
+        if isinstance(node, BinaryOpNode):
+            node.left = self.optimize_node(node.left)
+            node.right = self.optimize_node(node.right)
+            return self.fold_binary_op(node)
+        if isinstance(node, UnaryOpNode):
+            node.operand = self.optimize_node(node.operand)
+            return self.fold_unary_op(node)
+        if isinstance(node, IfNode):
+            return self.optimize_if(node)
+        if isinstance(node, WhileNode):
+            node.condition = self.optimize_node(node.condition)
+            if self.is_constant(node.condition) and not self.constant_value(node.condition):
+                self.pruned += 1
+                return BlockNode(self.declarations(node.body), line=node.line,
+                                 column=node.column)
+            node.body = self.optimize_node(node.body)
+        elif isinstance(node, AssignmentNode):
+            node.value = self.optimize_node(node.value)
+        elif isinstance(node, ForNode):
+            node.iterable = self.optimize_node(node.iterable)
+            node.body = self.optimize_node(node.body)
+        elif isinstance(node, FunctionDefNode):
+            node.body = self.optimize_node(node.body)
+        elif isinstance(node, FunctionCallNode):
+            node.arguments = [self.optimize_node(arg) for arg in node.arguments]
+        elif isinstance(node, ArrayNode):
+            node.elements = [self.optimize_node(element) for element in node.elements]
+        elif isinstance(node, (IndexNode, IndexAssignmentNode)):
+            node.target = self.optimize_node(node.target)
+            node.index = self.optimize_node(node.index)
+            if isinstance(node, IndexAssignmentNode):
+                node.value = self.optimize_node(node.value)
+        elif isinstance(node, SliceNode):
+            node.target = self.optimize_node(node.target)
+            if node.start is not None:
+                node.start = self.optimize_node(node.start)
+            if node.stop is not None:
+                node.stop = self.optimize_node(node.stop)
+        elif isinstance(node, ReturnNode):
+            if node.value is not None:
+                node.value = self.optimize_node(node.value)
+        elif isinstance(node, (BlockNode, ProgramNode)):
+            node.statements = self.optimize_statements(node.statements)
+        return node
+
+    def optimize_if(self, node: IfNode) -> ASTNode:
+        """Replace an if whose condition is constant by the branch that runs."""
+        node.condition = self.optimize_node(node.condition)
+        if not self.is_constant(node.condition):
+            node.then_branch = self.optimize_node(node.then_branch)
+            if node.else_branch is not None:
+                node.else_branch = self.optimize_node(node.else_branch)
+            return node
+        self.pruned += 1
+        if self.constant_value(node.condition):
+            branch, dropped = node.then_branch, node.else_branch
+        else:
+            branch, dropped = node.else_branch, node.then_branch
+        statements = self.declarations(dropped)
+        if branch is not None:
+            branch = self.optimize_node(branch)
+            statements += branch.statements if isinstance(branch, BlockNode) else [branch]
+        return BlockNode(statements, line=node.line, column=node.column)
+
+    @staticmethod
+    def declarations(dropped: Optional[ASTNode]) -> List[ASTNode]:
+        """
+        An `if false` stub declaring the names a dropped branch assigns, or
+        nothing if it assigns none.
+        """
+        if dropped is None:
+            return []
+        body = dropped.statements if isinstance(dropped, BlockNode) else [dropped]
+        line, column = dropped.line, dropped.column
+        loop_variables = Resolver.declared_names(body, loops_only=True)
+        stub: List[ASTNode] = [
+            ForNode(name, ArrayNode([], line=line, column=column),
+                    BlockNode([], line=line, column=column), line=line, column=column)
+            for name in loop_variables]
+        stub += [AssignmentNode(name, NullNode(line=line, column=column),
+                                line=line, column=column)
+                 for name in Resolver.declared_names(body) if name not in loop_variables]
+        if not stub:
+            return []
+        return [IfNode(BooleanNode(False, line=line, column=column),
+                       BlockNode(stub, line=line, column=column), line=line, column=column)]
+
+    def fold_binary_op(self, node: BinaryOpNode) -> ASTNode:
+        """Fold a binary operation on constants, or strength-reduce it."""
+        left, right = node.left, node.right
+        if node.operator in ('and', 'or') and self.is_constant(left):
+            # `and`/`or` return an operand, so a constant left side decides
+            # which operand the whole expression is.
+            self.folded += 1
+            if bool(self.constant_value(left)) == (node.operator == 'and'):
+                return right
+            return left
+        if (node.operator in self.FOLDABLE_OPERATORS
+                and self.is_constant(left) and self.is_constant(right)):
+            left_value, right_value = self.constant_value(left), self.constant_value(right)
+            if allocation_size(node.operator, left_value, right_value) > self.MAX_FOLDED_SIZE:
+                return node  # Too big to keep, so do not build it either
+            try:
+                value = apply_binary_op(node.operator, left_value, right_value)
+            except (ArithmeticError, TypeError, ValueError, TinyLangError):
+                return node
+            if isinstance(value, str) and len(value) > self.MAX_FOLDED_SIZE:
+                return node
+            if isinstance(value, int) and value.bit_length() > self.MAX_FOLDED_SIZE:
+                return node
+            self.folded += 1
+            return self.literal(value, node)
+        if (node.operator == '**' and isinstance(left, VariableNode)
+                and isinstance(right, NumberNode) and type(right.value) is int
+                and right.value == 2):
+            self.reduced += 1
+            return UnaryOpNode('square', left, line=node.line, column=node.column)
+        return node
+
+    def fold_unary_op(self, node: UnaryOpNode) -> ASTNode:
+        """Fold `not` and `-` applied to a constant."""
+        if not self.is_constant(node.operand):
+            return node
+        value = self.constant_value(node.operand)
+        if node.operator == 'not':
+            value = not value
+        else:
+            try:
+                value = -value
+            except TypeError:
+                return node
+        self.folded += 1
+        return self.literal(value, node)
+
+    def is_constant(self, node: ASTNode) -> bool:
+        return isinstance(node, self.LITERAL_NODES)
+
+    def constant_value(self, node: ASTNode) -> Any:
+        return None if isinstance(node, NullNode) else node.value
+
+    @staticmethod
+    def literal(value: Any, node: ASTNode) -> ASTNode:
+        """Build the literal node for a folded value, at node's position."""
+        position = dict(line=node.line, column=node.column)
+        if value is None:
+            return NullNode(**position)
+        if isinstance(value, bool):
+            return BooleanNode(value, **position)
+        if isinstance(value, str):
+            return StringNode(value, **position)
+        return NumberNode(value, **position)
+
+    @staticmethod
+    def count_nodes(node: Any) -> int:
+        """Number of AST nodes in a tree (for before/after reports)."""
+        if isinstance(node, list):
+            return sum(Optimizer.count_nodes(item) for item in node)
+        if not isinstance(node, ASTNode):
+            return 0
+        return 1 + sum(Optimizer.count_nodes(getattr(node, f.name))
+                       for f in fields(node) if f.compare)
 
 
 # =============================================================================
-# Part 4: Environment (Symbol Table)
+# Part 4: Environment (Symbol Table) and Resolver
 # =============================================================================
 
+class _Undefined:
+    """Marker stored in frame slots that have not been assigned yet."""
+
+    def __repr__(self):
+        return "<undefined>"
+
+
+UNDEFINED = _Undefined()
+
+
 class Environment:
     """
     Environment for variable storage with lexical scoping.
 
-    Supports nested scopes through parent reference.
+    Each function call gets one fixed-size frame: a list of values indexed by
+    slot. The Resolver gives every variable reference a (depth, slot) address
+    ahead of time, so a lookup is `depth` parent hops plus one list index
+    instead of a dictionary probe per enclosing scope.
     """
 
-    def __init__(self, parent: Optional['Environment'] = None):
-        self.variables: Dict[str, Any] = {}
+    __slots__ = ('values', 'parent')
+
+    def __init__(self, parent: Optional['Environment'] = None,
+                 values: Optional[List[Any]] = None):
+        self.values: List[Any] = [] if values is None else values
         self.parent = parent
 
+    def ancestor(self, depth: int) -> 'Environment':
+        """Return the frame `depth` levels up the closure chain."""
+        env = self
+        for _ in range(depth):
+            env = env.parent
+        return env
+
+    def get_at(self, depth: int, slot: int) -> Any:
+        """Get the value at a resolved (depth, slot) address."""
+        return self.ancestor(depth).values[slot]
+
+    def set_at(self, depth: int, slot: int, value: Any):
+        """Set the value at a resolved (depth, slot) address."""
+        self.ancestor(depth).values[slot] = value
+
+
+class GlobalEnvironment(Environment):
+    """
+    The outermost frame.
+
+    Globals are slots too, but the set of globals grows over a session (the
+    REPL, builtins, forward references), so this frame keeps a name -> slot
+    table and can be extended. Host code can still work with names.
+
+    A slot is also reserved for every name that is only read, and for every
+    builtin; `declared` holds just the names top-level code assigns, which
+    are the globals a function body may assign to.
+    """
+
+    __slots__ = ('slots', 'names', 'declared')
+
+    def __init__(self):
+        super().__init__()
+        self.slots: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.declared: Set[str] = set()
+
+    def slot(self, name: str) -> int:
+        """Return the slot for a global name, reserving one if it is new."""
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.values)
+            self.names.append(name)
+            self.values.append(UNDEFINED)
+        return slot
+
+    def declare(self, name: str) -> int:
+        """Return the slot for a global that top-level code assigns."""
+        self.declared.add(name)
+        return self.slot(name)
+
     def define(self, name: str, value: Any):
-        """Define a new variable in current scope."""
-        # TODO: Implement
-        pass
+        """Define (or overwrite) a global variable."""
+        self.values[self.slot(name)] = value
 
     def get(self, name: str) -> Any:
-        """
-        Get variable value, checking parent scopes if needed.
+        """Get a global by name; raises TinyLangRuntimeError if it is unset."""
+        slot = self.slots.get(name)
+        if slot is None or self.values[slot] is UNDEFINED:
+            raise TinyLangRuntimeError(f"Undefined variable '{name}'")
+        return self.values[slot]
 
-        Challenge: Implement scope chain lookup
+    def restore(self, saved: List[Any], declared: Iterable[str] = ()):
         """
-        # TODO: Implement
-        pass
-
-    def set(self, name: str, value: Any):
+        Return to a state saved as list(self.values) and set(self.declared):
+        globals added since are forgotten and the earlier ones get their
+        saved values back.
         """
-        Set variable value in the scope where it's defined.
+        for name in self.names[len(saved):]:
+            del self.slots[name]
+        del self.names[len(saved):]
+        self.values[:] = saved
+        self.declared = set(declared)
+
 
-        Challenge: Find the right scope
+class Resolver:
+    """
+    Static pass that gives every variable reference a (depth, slot) address.
+
+    Blocks do not open scopes; each function body does. Within a function:
+    - parameters and for-loop variables are always local
+    - any other name assigned in the body is local, unless an enclosing
+      function or top-level code assigns it too; then the assignment updates
+      that outer variable (this is how closures mutate captured state).
+      Names that are only read outside, and builtins, do not count, so a
+      function cannot overwrite a builtin by assigning to its name
+    - a name that is read but declared nowhere gets a global slot, so using
+      it before it exists is reported at run time as an undefined variable
+
+    Resolution writes `depth`/`slot` onto VariableNode, AssignmentNode,
+    ForNode, FunctionDefNode and FunctionCallNode, plus `local_count` (the
+    frame size) onto FunctionDefNode. Every node also gets `has_call`, which
+    lets the Evaluator walk call-free subtrees with plain recursion.
+    """
+
+    def __init__(self, global_env: GlobalEnvironment):
+        self.global_env = global_env
+        self.scopes: List[Dict[str, int]] = []  # enclosing function scopes, innermost last
+
+    def resolve(self, program: ProgramNode) -> ProgramNode:
+        """Resolve a whole program in place and return it."""
+        for name in self.declared_names(program.statements):
+            self.global_env.declare(name)
+        self.scopes = []
+        self.resolve_node(program)
+        return program
+
+    @staticmethod
+    def declared_names(statements: List[ASTNode], loops_only: bool = False) -> List[str]:
         """
-        # TODO: Implement
-        pass
+        Names assigned by these statements (or, with loops_only, just their
+        for-loop variables), not looking inside nested functions.
+        """
+        names: Dict[str, None] = {}
+        pending = list(reversed(statements))
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (AssignmentNode, FunctionDefNode)):
+                if not loops_only:
+                    names[node.name] = None
+            elif isinstance(node, ForNode):
+                names[node.variable] = None
+                pending.append(node.body)
+            elif isinstance(node, IfNode):
+                if node.else_branch is not None:
+                    pending.append(node.else_branch)
+                pending.append(node.then_branch)
+            elif isinstance(node, WhileNode):
+                pending.append(node.body)
+            elif isinstance(node, BlockNode):
+                pending.extend(reversed(node.statements))
+        return list(names)
+
+    def lookup(self, name: str) -> Tuple[int, int]:
+        """Address of name as seen from the innermost scope."""
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name in scope:
+                return depth, scope[name]
+        return len(self.scopes), self.global_env.slot(name)
+
+    def resolve_node(self, node: ASTNode) -> bool:
+        """Annotate node and its children; return node.has_call."""
+        has_call = False
+        if isinstance(node, VariableNode):
+            node.depth, node.slot = self.lookup(node.name)
+        elif isinstance(node, AssignmentNode):
+            has_call = self.resolve_node(node.value)
+            node.depth, node.slot = self.lookup(node.name)
+        elif isinstance(node, BinaryOpNode):
+            has_call = self.resolve_node(node.left) | self.resolve_node(node.right)
+        elif isinstance(node, UnaryOpNode):
+            has_call = self.resolve_node(node.operand)
+        elif isinstance(node, IfNode):
+            has_call = self.resolve_node(node.condition) | self.resolve_node(node.then_branch)
+            if node.else_branch is not None:
+                has_call |= self.resolve_node(node.else_branch)
+        elif isinstance(node, WhileNode):
+            has_call = self.resolve_node(node.condition) | self.resolve_node(node.body)
+        elif isinstance(node, ForNode):
+            has_call = self.resolve_node(node.iterable)
+            node.depth, node.slot = self.lookup(node.variable)
+            has_call |= self.resolve_node(node.body)
+        elif isinstance(node, FunctionDefNode):
+            node.depth, node.slot = self.lookup(node.name)
+            self.resolve_function(node)
+        elif isinstance(node, FunctionCallNode):
+            for arg in node.arguments:
+                self.resolve_node(arg)
+            node.depth, node.slot = self.lookup(node.name)
+            has_call = True
+        elif isinstance(node, ReturnNode):
+            if node.value is not None:
+                has_call = self.resolve_node(node.value)
+        elif isinstance(node, ArrayNode):
+            for element in node.elements:
+                has_call |= self.resolve_node(element)
+        elif isinstance(node, IndexNode):
+            has_call = self.resolve_node(node.target) | self.resolve_node(node.index)
+        elif isinstance(node, SliceNode):
+            has_call = self.resolve_node(node.target)
+            for bound in (node.start, node.stop):
+                if bound is not None:
+                    has_call |= self.resolve_node(bound)
+        elif isinstance(node, IndexAssignmentNode):
+            has_call = (self.resolve_node(node.target) | self.resolve_node(node.index)
+                        | self.resolve_node(node.value))
+        elif isinstance(node, (BlockNode, ProgramNode)):
+            for statement in node.statements:
+                has_call |= self.resolve_node(statement)
+        node.has_call = has_call
+        return has_call
+
+    def resolve_function(self, node: FunctionDefNode):
+        """Lay out the function's frame (parameters first) and resolve its body."""
+        scope: Dict[str, int] = {}
+        for param in node.params:
+            if param in scope:
+                raise ParseError(f"Duplicate parameter '{param}' in {node.name}()",
+                                 node.line, node.column)
+            scope[param] = len(scope)
+
+        body = node.body.statements if isinstance(node.body, BlockNode) else [node.body]
+        for name in self.declared_names(body, loops_only=True):
+            if name not in scope:
+                scope[name] = len(scope)
+        for name in self.declared_names(body):
+            if name in scope or self.is_declared_outside(name):
+                continue
+            scope[name] = len(scope)
+
+        self.scopes.append(scope)
+        try:
+            self.resolve_node(node.body)
+        finally:
+            self.scopes.pop()
+        node.local_count = len(scope)
+        node.local_names = list(scope)
+
+    def is_declared_outside(self, name: str) -> bool:
+        """True if an enclosing function or top-level code assigns name."""
+        return any(name in scope for scope in self.scopes) or name in self.global_env.declared
 
 
 # =============================================================================
 # Part 5: Evaluator (Interpreter)
 # =============================================================================
 
+MEMO_CACHE_SIZE = 10000  # results kept by a plain @memo
+
+
+def memo_key(args: List[Any]) -> tuple:
+    """
+    The @memo cache key for a call: the arguments and their types, so calls
+    that are equal in Python but not in TinyLang (f(1) and f(true)) differ.
+    """
+    return (*args, *map(type, args))
+
+
+class MemoCache:
+    """
+    Bounded LRU cache of one @memo function's results, keyed by memo_key.
+
+    Each function value gets its own cache when its definition runs. Calls
+    with an unhashable argument (an array) are not cached; they always run
+    the body and are counted as uncacheable.
+    """
+    __slots__ = ('maxsize', 'entries', 'hits', 'misses', 'evictions', 'uncacheable')
+
+    def __init__(self, maxsize: int = MEMO_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries: 'OrderedDict[tuple, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    def get(self, key: tuple) -> Any:
+        """The cached result for key, now the most recently used, or UNDEFINED."""
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return UNDEFINED
+        except TypeError:
+            self.uncacheable += 1
+            return UNDEFINED
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: Any):
+        """Cache a result, evicting the least recently used one when full."""
+        try:
+            self.entries[key] = value
+        except TypeError:
+            return
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'uncacheable': self.uncacheable, 'size': len(self.entries),
+                'maxsize': self.maxsize}
+
+
 @dataclass
 class Function:
     """Represents a user-defined function."""
     params: List[str]
     body: ASTNode
     closure: Environment  # For lexical scoping!
+    name: str = "<anonymous>"
+    local_count: int = 0  # frame size: parameters plus other locals
+    memo: Optional[MemoCache] = None  # results cache of a @memo function
+
+    def __repr__(self):
+        return f"<func {self.name}>"
 
 
-class ReturnValue(Exception):
-    """Exception used to implement return statements."""
-    def __init__(self, value):
-        self.value = value
+class CallSite:
+    """
+    Inline cache entry for one FunctionCallNode.
+
+    Records the callee last seen at the call site and everything about
+    calling it that does not change while the binding holds that callee:
+    its kind, that the argument count matches, the frame padding and the
+    callee's @memo cache.
+    """
+    __slots__ = ('callee', 'kind', 'padding', 'simple_args', 'direct', 'node', 'memo')
+
+    USER = 'user'        # a TinyLang Function
+    BUILTIN = 'builtin'  # a Python callable
+    ERROR = 'error'      # undefined, not callable, or wrong arity (never cached)
+
+    def __init__(self, node: 'FunctionCallNode', callee: Any):
+        self.node = node
+        self.callee = callee
+        self.padding: List[Any] = []
+        self.memo: Optional[MemoCache] = None
+        self.simple_args = not any(arg.has_call for arg in node.arguments)
+        if isinstance(callee, Function):
+            self.memo = callee.memo
+            if len(node.arguments) == len(callee.params):
+                self.kind = CallSite.USER
+                self.padding = [UNDEFINED] * (callee.local_count - len(callee.params))
+            else:
+                self.kind = CallSite.ERROR
+        elif callable(callee):
+            self.kind = CallSite.BUILTIN
+        else:
+            self.kind = CallSite.ERROR
+        # Builtins and functions whose body makes no calls can be run without
+        # an evaluator frame when their arguments make no calls either.
+        self.direct = self.simple_args and (
+            self.kind is CallSite.BUILTIN
+            or (self.kind is CallSite.USER and not callee.body.has_call
+                and self.memo is None))
+        if callee is UNDEFINED:
+            self.raise_error(len(node.arguments))
+
+    def raise_error(self, argc: int):
+        """
+        Raise the error for calling this callee. An undefined callee is
+        reported from __init__, before the arguments are evaluated; the
+        other errors once they have been.
+        """
+        node, callee = self.node, self.callee
+        if callee is UNDEFINED:
+            message = f"Undefined variable '{node.name}'"
+        elif isinstance(callee, Function):
+            message = (f"{callee.name}() takes {len(callee.params)} arguments "
+                       f"but {argc} were given")
+        else:
+            message = f"'{node.name}' is not a function"
+        raise TinyLangRuntimeError(message, node.line, node.column)
+
+
+class TailCall:
+    """
+    Result of `return f(...)` when f is a user function.
+
+    Instead of calling f from inside the returning function (growing the
+    stack), the evaluator hands f's call site and arguments back to the
+    caller's frame, which runs f in place of the function that returned.
+    """
+    __slots__ = ('site', 'args')
+
+    def __init__(self, site: CallSite, args: List[Any]):
+        self.site = site
+        self.args = args
+
+
+def to_string(value: Any) -> str:
+    """Format a runtime value the way TinyLang prints it."""
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if np is not None and isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        return "[" + ", ".join(f'"{item}"' if isinstance(item, str) else to_string(item)
+                               for item in value) + "]"
+    return str(value)
+
+
+# Values that support indexing and slicing: arrays, strings and (with NumPy)
+# numeric arrays. Only arrays and numeric arrays support element assignment.
+INDEXABLE_TYPES = (list, str) if np is None else (list, str, np.ndarray)
+MUTABLE_ARRAY_TYPES = (list,) if np is None else (list, np.ndarray)
+
+
+def to_index(value: Any, line: int = 0, column: int = 0) -> int:
+    """An index or slice bound as a Python int (whole floats are accepted)."""
+    if type(value) is int:
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if hasattr(value, '__index__'):  # NumPy integers
+        return operator.index(value)
+    raise TinyLangRuntimeError(f"Index must be an integer, not {to_string(value)}",
+                               line, column)
+
+
+def get_index(target: Any, index: Any, line: int = 0, column: int = 0) -> Any:
+    """
+    `target[index]` for an array or string; negative indexes count from the
+    end. Shared by every backend; errors carry the given position (the VM
+    passes none and adds the instruction's).
+    """
+    if not isinstance(target, INDEXABLE_TYPES):
+        raise TinyLangRuntimeError(f"Cannot index {to_string(target)}", line, column)
+    position = index if type(index) is int else to_index(index, line, column)
+    try:
+        return target[position]
+    except IndexError:
+        raise TinyLangRuntimeError(f"Index {to_string(index)} out of range for length "
+                                   f"{len(target)}", line, column) from None
+
+
+def get_slice(target: Any, start: Any, stop: Any, line: int = 0, column: int = 0) -> Any:
+    """`target[start:stop]`, a new array or string; null bounds are open."""
+    if not isinstance(target, INDEXABLE_TYPES):
+        raise TinyLangRuntimeError(f"Cannot slice {to_string(target)}", line, column)
+    if start is not None:
+        start = to_index(start, line, column)
+    if stop is not None:
+        stop = to_index(stop, line, column)
+    if isinstance(target, (list, str)):
+        return target[start:stop]
+    return target[start:stop].copy()  # a NumPy slice is a view; arrays copy
+
+
+def set_index(target: Any, index: Any, value: Any, line: int = 0, column: int = 0):
+    """`target[index] = value` for an array."""
+    if not isinstance(target, MUTABLE_ARRAY_TYPES):
+        raise TinyLangRuntimeError(f"Cannot assign to an element of {to_string(target)}",
+                                   line, column)
+    position = index if type(index) is int else to_index(index, line, column)
+    try:
+        target[position] = value
+    except IndexError:
+        raise TinyLangRuntimeError(f"Index {to_string(index)} out of range for length "
+                                   f"{len(target)}", line, column) from None
+
+
+def apply_binary_op(operator: str, left: Any, right: Any) -> Any:
+    """
+    Apply an arithmetic or comparison operator to two evaluated operands.
+
+    Shared by every backend so they agree on semantics. `and`/`or` are not
+    handled here because they short-circuit.
+    """
+    if operator == '+':
+        if isinstance(left, str) or isinstance(right, str):
+            return to_string(left) + to_string(right)
+        return left + right
+    if operator == '-':
+        return left - right
+    if operator == '*':
+        return left * right
+    if operator == '/':
+        return left / right
+    if operator == '%':
+        return left % right
+    if operator == '**':
+        return left ** right
+    if operator == '==':
+        return left == right
+    if operator == '!=':
+        return left != right
+    if operator == '<':
+        return left < right
+    if operator == '>':
+        return left > right
+    if operator == '<=':
+        return left <= right
+    if operator == '>=':
+        return left >= right
+    raise TinyLangRuntimeError(f"Unknown operator '{operator}'")
+
+
+def array_bytes(count: int) -> int:
+    """Rough size of an array (a Python list) of count elements."""
+    return 56 + 8 * count
+
+
+def value_bytes(value: Any) -> int:
+    """Rough size of a string, array or numeric array; 0 for anything else."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, list):
+        return array_bytes(len(value))
+    return getattr(value, 'nbytes', 0)
+
+
+# Operand types whose `+` and `*` results stay small (`**` on ints does not)
+SMALL_OPERANDS = {int, bool, float}
+SMALL_POWER_OPERANDS = {bool, float}
+
+
+def allocation_size(operator: str, left: Any, right: Any) -> int:
+    """
+    Rough size in bytes of the value `left <operator> right` is about to
+    build, for charging a memory Budget before it is built: string and
+    array repetition and concatenation, element-wise numeric array results
+    and large integer powers. 0 when the result is small. Only `+`, `*` and
+    `**` are charged; the other operators cannot build a value much larger
+    than their operands.
+    """
+    small = SMALL_POWER_OPERANDS if operator == '**' else SMALL_OPERANDS
+    if type(left) in small and type(right) in small:
+        return 0
+    if operator == '*':
+        if isinstance(left, int) and isinstance(right, (str, list)):
+            left, right = right, left
+        if isinstance(left, str) and isinstance(right, int):
+            return len(left) * max(right, 0)
+        if isinstance(left, list) and isinstance(right, int):
+            return array_bytes(len(left) * max(right, 0))
+    elif operator == '+':
+        if isinstance(left, list) and isinstance(right, list):
+            return array_bytes(len(left) + len(right))
+        if isinstance(left, (str, list)) or isinstance(right, (str, list)):
+            return value_bytes(left) + value_bytes(right)
+    elif operator == '**':
+        if type(left) is int and type(right) is int and right > 0:
+            return left.bit_length() * right // 8
+    return max(getattr(left, 'nbytes', 0), getattr(right, 'nbytes', 0))
+
+
+def square(value: Any) -> Any:
+    """
+    `value ** 2`, as the Optimizer's `square` op computes it: an int is
+    multiplied by itself, which is exact and cheaper than `**`; anything else
+    goes through `**` so floats still overflow and bad types get the same
+    error as without the optimizer.
+    """
+    if type(value) is int:
+        return value * value
+    return value ** 2
+
+
+def resident_memory() -> int:
+    """
+    This process's resident memory in bytes: the current size on Linux, the
+    peak size from getrusage elsewhere, or 0 if neither is available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Budget:
+    """
+    Step and memory limits for running a program.
+
+    A step is one loop iteration or one call of a user function; a program
+    cannot run for long without taking steps. Backends keep a countdown of
+    steps (the fuel) and decrement it once per step. Only when it runs out
+    do they call refuel(), which counts the steps, enforces the limits and
+    grants the next batch of fuel, so the check in the hot loop is a
+    decrement and a test.
+
+    Memory is the growth in resident memory since the program started,
+    sampled on each refuel (every CHECK_INTERVAL steps). Between samples,
+    the operations that can build a large value in one go (string and array
+    `+` and `*`, big `**`, join, push, array literals, numeric array and
+    range) charge() their estimated size first, so one huge allocation is
+    refused before it happens instead of being noticed after it.
+
+    Resident memory belongs to the whole process, so max_memory only measures
+    one program when that program is the only one running in its process (as
+    in run, run_file and each run_batch worker). Scripts interleaved on one
+    event loop would be charged for each other's allocations, which is why
+    run_concurrently does not accept a memory limit.
+    """
+
+    CHECK_INTERVAL = 4096
+
+    def __init__(self, max_steps: Optional[int] = None, max_memory: Optional[int] = None):
+        """
+        Args:
+            max_steps: most loop iterations plus calls a program may make
+            max_memory: most bytes resident memory may grow by
+        """
+        self.max_steps = max_steps
+        self.max_memory = max_memory
+        self.steps = 0      # steps counted at the last refuel
+        self.granted = 0    # fuel handed out at the last refuel
+        self.fuel = 0       # countdown, for backends that keep it here
+        self.base_memory = 0
+        self.memory_used = 0  # growth at the last sample
+        self.charged = 0      # bytes charged since the last sample
+
+    @property
+    def limited(self) -> bool:
+        return self.max_steps is not None or self.max_memory is not None
+
+    def start(self) -> int:
+        """Begin running a program; returns its first grant of fuel."""
+        self.steps = self.granted = 0
+        if self.max_memory is not None:
+            self.base_memory = resident_memory()
+        return self.refuel()
+
+    def charge(self, size: int, line: int = 0, column: int = 0):
+        """
+        Account for an allocation of about `size` bytes before it is made.
+        Charges add up between samples; once they could pass max_memory,
+        resident memory is sampled again, and BudgetExceeded (at
+        line/column) is raised if the allocation would not fit.
+        """
+        self.charged += size
+        if self.memory_used + self.charged > self.max_memory:
+            self.memory_used = resident_memory() - self.base_memory
+            self.charged = size
+            if self.memory_used + size > self.max_memory:
+                raise BudgetExceeded(f"Memory limit of {self.max_memory} bytes exceeded "
+                                     f"({self.memory_used} bytes used, {size} more "
+                                     f"requested)", line, column)
+
+    def refuel(self, line: int = 0, column: int = 0) -> int:
+        """
+        Called when the fuel runs out: count the steps it covered, raise
+        BudgetExceeded (at line/column) if a limit is passed, else return
+        the next grant.
+        """
+        self.steps += self.granted
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExceeded(f"Step limit of {self.max_steps} exceeded", line, column)
+        if self.max_memory is not None:
+            used = self.memory_used = resident_memory() - self.base_memory
+            self.charged = 0
+            if used > self.max_memory:
+                raise BudgetExceeded(f"Memory limit of {self.max_memory} bytes exceeded "
+                                     f"({used} bytes used)", line, column)
+        granted = self.CHECK_INTERVAL if self.max_memory is not None else sys.maxsize
+        if self.max_steps is not None:
+            granted = min(granted, self.max_steps + 1 - self.steps)
+        self.granted = self.fuel = granted
+        return granted
 
 
 class Evaluator:
     """
     Evaluator for TinyLang.
 
-    Walks the AST and executes it.
+    Walks the AST and executes it, in one of two ways:
+
+    - Subtrees that cannot call a function (node.has_call is False, as set
+      by the Resolver) are evaluated by the plain recursive evaluate_*
+      methods. Their recursion depth is bounded by how deeply the source
+      is nested, not by how deeply the program recurses at run time.
+    - Everything else runs as generator frames on an explicit stack (see
+      run). A step_* generator yields (child, env) when it needs a child
+      evaluated and receives its value back, so TinyLang calls never nest
+      Python calls and deep recursion cannot hit RecursionError.
+
+    `return` sets self.returning instead of raising an exception; enclosing
+    blocks and loops stop when they see it. `return f(...)` of a user
+    function returns a TailCall that the caller's frame runs in place,
+    so tail recursion runs in constant space.
+
+    Every loop iteration and user-function call burns one unit of
+    self.fuel, which is topped up (and the limits checked) by the Budget.
     """
 
-    def __init__(self):
-        self.global_env = Environment()
-        self._setup_builtins()
+    def __init__(self, global_env: Optional[GlobalEnvironment] = None,
+                 budget: Optional[Budget] = None):
+        """
+        Args:
+            global_env: share an existing global frame (with its builtins)
+                        instead of creating a new one
+            budget: step and memory limits for each program (default: none)
+        """
+        self.global_env = global_env if global_env is not None else GlobalEnvironment()
+        if global_env is None:
+            self._setup_builtins()
+        self.returning = False
+        self.budget = budget if budget is not None else Budget()
+        self.fuel = self.budget.start()
+        self.evaluators = {
+            NumberNode: self.evaluate_number,
+            StringNode: self.evaluate_string,
+            BooleanNode: self.evaluate_boolean,
+            NullNode: self.evaluate_null,
+            VariableNode: self.evaluate_variable,
+            AssignmentNode: self.evaluate_assignment,
+            BinaryOpNode: self.evaluate_binary_op,
+            UnaryOpNode: self.evaluate_unary_op,
+            ArrayNode: self.evaluate_array,
+            IndexNode: self.evaluate_index,
+            SliceNode: self.evaluate_slice,
+            IndexAssignmentNode: self.evaluate_index_assignment,
+            IfNode: self.evaluate_if,
+            WhileNode: self.evaluate_while,
+            ForNode: self.evaluate_for,
+            FunctionDefNode: self.evaluate_function_def,
+            ReturnNode: self.evaluate_return,
+            BlockNode: self.evaluate_block,
+            ProgramNode: self.evaluate_program,
+        }
+        self.steppers = {
+            AssignmentNode: self.step_assignment,
+            BinaryOpNode: self.step_binary_op,
+            UnaryOpNode: self.step_unary_op,
+            ArrayNode: self.step_array,
+            IndexNode: self.step_index,
+            SliceNode: self.step_slice,
+            IndexAssignmentNode: self.step_index_assignment,
+            IfNode: self.step_if,
+            WhileNode: self.step_while,
+            ForNode: self.step_for,
+            FunctionCallNode: self.step_function_call,
+            ReturnNode: self.step_return,
+            BlockNode: self.step_block,
+            ProgramNode: self.step_program,
+        }
 
     def _setup_builtins(self):
         """Setup built-in functions."""
-        # TODO: Add built-ins like print, len, range, etc.
         self.global_env.define('print', self._builtin_print)
-        pass
+        self.global_env.define('len', self._builtin_len)
+        self.global_env.define('str', self._builtin_str)
+        self.global_env.define('range', self._builtin_range)
+        self.global_env.define('push', self._builtin_push)
+        self.global_env.define('pop', self._builtin_pop)
+        self.global_env.define('join', self._builtin_join)
+
+    def setup_numeric_builtins(self):
+        """
+        Define the NumPy-backed builtins (TinyLang(numeric=True)).
+
+        Numeric arrays are float64 ndarrays. Arithmetic and comparison
+        operators between them (or with a number) are element-wise and
+        broadcast, so `xs * 2 + ys` is one C loop per operator rather than
+        a TinyLang loop per element. `range` returns a numeric array here.
+        """
+        if np is None:
+            raise ImportError("TinyLang(numeric=True) requires NumPy (pip install numpy)")
+        self.global_env.define('array', self._builtin_array)
+        self.global_env.define('range', self._builtin_numeric_range)
+        self.global_env.define('sum', self._builtin_sum)
+        self.global_env.define('dot', self._builtin_dot)
+        self.global_env.define('map_add', self._builtin_map_add)
+
+    def _builtin_array(self, values):
+        """Built-in array: a numeric array from an array of numbers."""
+        if self.budget.max_memory is not None and isinstance(values, list):
+            self.budget.charge(8 * len(values))
+        return np.asarray(values, dtype=np.float64)
+
+    def _builtin_numeric_range(self, *args):
+        """Numeric range: range(stop) or range(start, stop[, step]) as an array."""
+        if self.budget.max_memory is not None:
+            start, stop, step = (0, *args, 1) if len(args) == 1 else (*args, 1)[:3]
+            if step:
+                self.budget.charge(8 * max(0, math.ceil((stop - start) / step)))
+        return np.arange(*args, dtype=np.float64)
+
+    def _builtin_sum(self, values):
+        """Built-in sum of an array or numeric array, in one call."""
+        return np.sum(values, dtype=np.float64).item()
+
+    def _builtin_dot(self, left, right):
+        """Built-in dot product (matrix product for 2-D arrays)."""
+        result = np.dot(left, right)
+        return result.item() if np.ndim(result) == 0 else result
+
+    def _builtin_map_add(self, values, addend):
+        """Built-in map_add: add a number (or array) to every element."""
+        return np.add(values, addend, dtype=np.float64)
 
     def _builtin_print(self, *args):
         """Built-in print function."""
-        print(*args)
+        print(*(to_string(arg) for arg in args))
         return None
 
+    def _builtin_len(self, value):
+        """Built-in len function."""
+        return len(value)
+
+    def _builtin_str(self, value):
+        """Built-in str function."""
+        return to_string(value)
+
+    def _builtin_range(self, *args):
+        """Built-in range function: range(stop) or range(start, stop[, step])."""
+        return range(*(int(arg) for arg in args))
+
+    def _builtin_push(self, array, value):
+        """Built-in push: append value to an array in amortized O(1)."""
+        if not isinstance(array, list):
+            raise TypeError(f"push() expects an array, not {to_string(array)}")
+        if self.budget.max_memory is not None:
+            self.budget.charge(8)
+        array.append(value)
+        return None
+
+    def _builtin_pop(self, array):
+        """Built-in pop: remove and return an array's last element."""
+        if not isinstance(array, list):
+            raise TypeError(f"pop() expects an array, not {to_string(array)}")
+        if not array:
+            raise ValueError("pop() from an empty array")
+        return array.pop()
+
+    def _builtin_join(self, array, separator=""):
+        """
+        Built-in join: concatenate an array's elements as strings in linear
+        time. Pushing pieces and joining once is how to build a large string;
+        `s = s + piece` in a loop copies s every time.
+        """
+        if not isinstance(array, list):
+            raise TypeError(f"join() expects an array, not {to_string(array)}")
+        separator = to_string(separator)
+        if self.budget.max_memory is not None:
+            self.budget.charge(sum(len(item) if isinstance(item, str) else 8 for item in array)
+                               + len(separator) * len(array))
+        return separator.join(
+            item if isinstance(item, str) else to_string(item) for item in array)
+
     def evaluate(self, node: ASTNode, env: Environment) -> Any:
         """
         Main evaluation method.
 
-        Challenge: Implement visitor pattern for each node type
+        Dispatches on the node type to the matching evaluate_* method, or to
+        the explicit-stack loop if the node may call a function.
+        The tree must have been through the Resolver first.
         """
-        # TODO: Implement dispatch to specific evaluate methods
+        if node.has_call:
+            return self.run(node, env)
+        evaluator = self.evaluators.get(type(node))
+        if evaluator is None:
+            raise TinyLangRuntimeError(f"Cannot evaluate {type(node).__name__}",
+                                       node.line, node.column)
+        return evaluator(node, env)
+
+    def run(self, node: ASTNode, env: Environment) -> Any:
+        """
+        Evaluate node on an explicit stack of step_* generator frames.
 
-        if isinstance(node, NumberNode):
-            return self.evaluate_number(node, env)
-        # TODO: Add other node types
-        pass
+        Each frame yields the (child, env) it needs; the child's frame is
+        pushed, and when it finishes its value is sent back to its parent.
+        """
+        steppers = self.steppers
+        stack = []
+        frame = steppers[type(node)](node, env)
+        value = None
+        while True:
+            try:
+                child, child_env = frame.send(value)
+            except StopIteration as done:
+                if not stack:
+                    return done.value
+                value = done.value
+                frame = stack.pop()
+                continue
+            if type(child) is FunctionCallNode:
+                # Fast path: a builtin or leaf function called with call-free
+                # arguments cannot re-enter the evaluator, so it needs no
+                # frame of its own.
+                site = child.inline_cache
+                if (site is not None and site.direct
+                        and child_env.get_at(child.depth, child.slot) is site.callee):
+                    value = self.call_direct(child, site, child_env)
+                    continue
+            stack.append(frame)
+            frame = steppers[type(child)](child, child_env)
+            value = None
+
+    # -- recursive evaluation of call-free subtrees ---------------------------
 
     def evaluate_number(self, node: NumberNode, env: Environment) -> float:
         """Evaluate number literal."""
@@ -509,147 +2254,2664 @@ class Evaluator:
 
     def evaluate_string(self, node: StringNode, env: Environment) -> str:
         """Evaluate string literal."""
-        # TODO: Implement
-        pass
+        return node.value
 
-    def evaluate_variable(self, node: VariableNode, env: Environment) -> Any:
-        """Evaluate variable reference."""
-        # TODO: Implement using environment
-        pass
+    def evaluate_boolean(self, node: BooleanNode, env: Environment) -> bool:
+        """Evaluate boolean literal."""
+        return node.value
+
+    def evaluate_null(self, node: NullNode, env: Environment) -> None:
+        """Evaluate null literal."""
+        return None
+
+    def evaluate_variable(self, node: VariableNode, env: Environment) -> Any:
+        """Evaluate variable reference via its resolved (depth, slot)."""
+        value = env.get_at(node.depth, node.slot)
+        if value is UNDEFINED:
+            raise TinyLangRuntimeError(f"Undefined variable '{node.name}'",
+                                       node.line, node.column)
+        return value
 
     def evaluate_assignment(self, node: AssignmentNode, env: Environment) -> Any:
         """Evaluate variable assignment."""
-        # TODO: Implement
-        pass
+        value = self.evaluate(node.value, env)
+        env.set_at(node.depth, node.slot, value)
+        return value
 
     def evaluate_binary_op(self, node: BinaryOpNode, env: Environment) -> Any:
         """
         Evaluate binary operation.
 
-        Challenge: Handle +, -, *, /, %, **, ==, !=, <, >, <=, >=, and, or
+        Handles +, -, *, /, %, **, ==, !=, <, >, <=, >=, and, or
         """
-        # TODO: Implement
-        pass
+        operator = node.operator
+        left = self.evaluate(node.left, env)
+        if operator == 'and':
+            return left and self.evaluate(node.right, env)
+        if operator == 'or':
+            return left or self.evaluate(node.right, env)
+        right = self.evaluate(node.right, env)
+        return self.binary_op(node, left, right)
+
+    def binary_op(self, node: BinaryOpNode, left: Any, right: Any) -> Any:
+        """Apply a (non short-circuit) binary operator, reporting errors at node."""
+        if self.budget.max_memory is not None and node.operator in ('+', '*', '**'):
+            size = allocation_size(node.operator, left, right)
+            if size:
+                self.budget.charge(size, node.line, node.column)
+        try:
+            return apply_binary_op(node.operator, left, right)
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise TinyLangRuntimeError(str(e), node.line, node.column) from None
 
     def evaluate_unary_op(self, node: UnaryOpNode, env: Environment) -> Any:
-        """Evaluate unary operation (-, not)."""
-        # TODO: Implement
-        pass
+        """Evaluate unary operation (-, not, and the optimizer's square)."""
+        return self.unary_op(node, self.evaluate(node.operand, env))
+
+    def unary_op(self, node: UnaryOpNode, operand: Any) -> Any:
+        """Apply a unary operator, reporting errors at node."""
+        if node.operator == 'not':
+            return not operand
+        try:
+            if node.operator == 'square':
+                return square(operand)
+            return -operand
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise TinyLangRuntimeError(str(e), node.line, node.column) from None
+
+    def evaluate_array(self, node: ArrayNode, env: Environment) -> List[Any]:
+        """Evaluate an array literal to a new list."""
+        if self.budget.max_memory is not None:
+            self.budget.charge(array_bytes(len(node.elements)), node.line, node.column)
+        return [self.evaluate(element, env) for element in node.elements]
+
+    def evaluate_index(self, node: IndexNode, env: Environment) -> Any:
+        """Evaluate `target[index]`."""
+        return get_index(self.evaluate(node.target, env), self.evaluate(node.index, env),
+                         node.line, node.column)
+
+    def evaluate_slice(self, node: SliceNode, env: Environment) -> Any:
+        """Evaluate `target[start:stop]`."""
+        target = self.evaluate(node.target, env)
+        start = None if node.start is None else self.evaluate(node.start, env)
+        stop = None if node.stop is None else self.evaluate(node.stop, env)
+        return get_slice(target, start, stop, node.line, node.column)
+
+    def evaluate_index_assignment(self, node: IndexAssignmentNode, env: Environment) -> Any:
+        """Evaluate `target[index] = value`; its value is the value assigned."""
+        target = self.evaluate(node.target, env)
+        index = self.evaluate(node.index, env)
+        value = self.evaluate(node.value, env)
+        set_index(target, index, value, node.line, node.column)
+        return value
 
     def evaluate_if(self, node: IfNode, env: Environment) -> Any:
         """Evaluate if-else statement."""
-        # TODO: Implement
-        pass
+        if self.evaluate(node.condition, env):
+            return self.evaluate(node.then_branch, env)
+        if node.else_branch is not None:
+            return self.evaluate(node.else_branch, env)
+        return None
 
     def evaluate_while(self, node: WhileNode, env: Environment) -> Any:
         """Evaluate while loop."""
-        # TODO: Implement
-        pass
+        while self.evaluate(node.condition, env):
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(node.line, node.column)
+            value = self.evaluate(node.body, env)
+            if self.returning:
+                return value
+        return None
+
+    def iterate(self, node: ForNode, iterable: Any) -> Iterator:
+        """Start a for-in loop over any iterable value."""
+        try:
+            return iter(iterable)
+        except TypeError:
+            raise TinyLangRuntimeError(f"Cannot iterate over {to_string(iterable)}",
+                                       node.line, node.column) from None
+
+    def evaluate_for(self, node: ForNode, env: Environment) -> Any:
+        """Evaluate for-in loop over any iterable value."""
+        iterator = self.iterate(node, self.evaluate(node.iterable, env))
+        target = env.ancestor(node.depth).values
+        for item in iterator:
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(node.line, node.column)
+            target[node.slot] = item
+            value = self.evaluate(node.body, env)
+            if self.returning:
+                return value
+        return None
 
     def evaluate_function_def(self, node: FunctionDefNode, env: Environment) -> Any:
         """
         Evaluate function definition.
 
-        Challenge: Create Function object with closure!
+        The Function captures the current environment as its closure.
         """
-        # TODO: Implement
-        # Remember to capture current environment for closures
-        pass
+        memo = MemoCache(node.memo_size) if node.memo_size else None
+        function = Function(node.params, node.body, env, node.name, node.local_count, memo)
+        env.set_at(node.depth, node.slot, function)
+        return None
 
-    def evaluate_function_call(self, node: FunctionCallNode, env: Environment) -> Any:
+    def evaluate_return(self, node: ReturnNode, env: Environment) -> Any:
+        """Evaluate return statement: flag the return for enclosing statements."""
+        value = None if node.value is None else self.evaluate(node.value, env)
+        self.returning = True
+        return value
+
+    def evaluate_block(self, node: BlockNode, env: Environment) -> Any:
+        """Evaluate block of statements; the value is the last statement's."""
+        result = None
+        for statement in node.statements:
+            result = self.evaluate(statement, env)
+            if self.returning:
+                break
+        return result
+
+    def evaluate_program(self, node: ProgramNode, env: Environment) -> Any:
+        """Evaluate entire program (a top-level return ends it early)."""
+        self.returning = False
+        self.fuel = self.budget.start()
+        result = self.evaluate_block(node, env)
+        self.returning = False
+        return result
+
+    # -- explicit-stack evaluation of subtrees that may call ------------------
+    #
+    # Each step_* mirrors its evaluate_* counterpart; `(yield child, env)`
+    # stands in for `self.evaluate(child, env)` when the child may call.
+
+    def step_assignment(self, node: AssignmentNode, env: Environment):
+        value = yield node.value, env
+        env.set_at(node.depth, node.slot, value)
+        return value
+
+    def step_binary_op(self, node: BinaryOpNode, env: Environment):
+        left = (yield node.left, env) if node.left.has_call else self.evaluate(node.left, env)
+        if node.operator == 'and':
+            if not left:
+                return left
+            return (yield node.right, env) if node.right.has_call else self.evaluate(node.right, env)
+        if node.operator == 'or':
+            if left:
+                return left
+            return (yield node.right, env) if node.right.has_call else self.evaluate(node.right, env)
+        right = (yield node.right, env) if node.right.has_call else self.evaluate(node.right, env)
+        return self.binary_op(node, left, right)
+
+    def step_unary_op(self, node: UnaryOpNode, env: Environment):
+        return self.unary_op(node, (yield node.operand, env))
+
+    def step_array(self, node: ArrayNode, env: Environment):
+        if self.budget.max_memory is not None:
+            self.budget.charge(array_bytes(len(node.elements)), node.line, node.column)
+        values = []
+        for element in node.elements:
+            values.append((yield element, env) if element.has_call
+                          else self.evaluate(element, env))
+        return values
+
+    def step_index(self, node: IndexNode, env: Environment):
+        target = (yield node.target, env) if node.target.has_call \
+            else self.evaluate(node.target, env)
+        index = (yield node.index, env) if node.index.has_call else self.evaluate(node.index, env)
+        return get_index(target, index, node.line, node.column)
+
+    def step_slice(self, node: SliceNode, env: Environment):
+        target = (yield node.target, env) if node.target.has_call \
+            else self.evaluate(node.target, env)
+        bounds = []
+        for bound in (node.start, node.stop):
+            if bound is None:
+                bounds.append(None)
+            else:
+                bounds.append((yield bound, env) if bound.has_call else self.evaluate(bound, env))
+        return get_slice(target, bounds[0], bounds[1], node.line, node.column)
+
+    def step_index_assignment(self, node: IndexAssignmentNode, env: Environment):
+        target = (yield node.target, env) if node.target.has_call \
+            else self.evaluate(node.target, env)
+        index = (yield node.index, env) if node.index.has_call else self.evaluate(node.index, env)
+        value = (yield node.value, env) if node.value.has_call else self.evaluate(node.value, env)
+        set_index(target, index, value, node.line, node.column)
+        return value
+
+    def step_if(self, node: IfNode, env: Environment):
+        condition = node.condition
+        if (yield condition, env) if condition.has_call else self.evaluate(condition, env):
+            branch = node.then_branch
+        elif node.else_branch is not None:
+            branch = node.else_branch
+        else:
+            return None
+        return (yield branch, env) if branch.has_call else self.evaluate(branch, env)
+
+    def step_while(self, node: WhileNode, env: Environment):
+        condition, body = node.condition, node.body
+        while (yield condition, env) if condition.has_call else self.evaluate(condition, env):
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(node.line, node.column)
+            value = (yield body, env) if body.has_call else self.evaluate(body, env)
+            if self.returning:
+                return value
+        return None
+
+    def step_for(self, node: ForNode, env: Environment):
+        iterable = (yield node.iterable, env) if node.iterable.has_call \
+            else self.evaluate(node.iterable, env)
+        iterator = self.iterate(node, iterable)
+        target = env.ancestor(node.depth).values
+        body = node.body
+        for item in iterator:
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(node.line, node.column)
+            target[node.slot] = item
+            value = (yield body, env) if body.has_call else self.evaluate(body, env)
+            if self.returning:
+                return value
+        return None
+
+    def step_block(self, node: BlockNode, env: Environment):
+        result = None
+        for statement in node.statements:
+            if statement.has_call:
+                result = yield statement, env
+            else:
+                result = self.evaluate(statement, env)
+            if self.returning:
+                break
+        return result
+
+    def step_program(self, node: ProgramNode, env: Environment):
+        """Run the program; a top-level return ends it early."""
+        self.returning = False
+        self.fuel = self.budget.start()
+        result = yield from self.step_block(node, env)
+        if self.returning:
+            self.returning = False
+            if type(result) is TailCall:
+                result = yield from self.call_function(result.site, result.args)
+        return result
+
+    def step_return(self, node: ReturnNode, env: Environment):
         """
-        Evaluate function call.
+        Evaluate a return whose value may call.
 
-        Challenge: Create new environment, bind parameters, handle return
+        `return f(...)` of a user function becomes a TailCall for the
+        enclosing call frame to run instead of a nested call.
         """
-        # TODO: Implement
-        # 1. Get function object
-        # 2. Evaluate arguments
-        # 3. Create new environment with function's closure as parent
-        # 4. Bind parameters to arguments
-        # 5. Execute function body
-        # 6. Handle ReturnValue exception
-        pass
+        value = node.value
+        if isinstance(value, FunctionCallNode):
+            site = self.call_site(value, env)
+            if site.simple_args:
+                args = self.evaluate_args(value, env)
+            else:
+                args = yield from self.step_args(value, env)
+            if site.kind is CallSite.USER:
+                self.returning = True
+                return TailCall(site, args)
+            result = self.call_builtin(value, site, args)
+        else:
+            result = yield value, env
+        self.returning = True
+        return result
+
+    def step_function_call(self, node: FunctionCallNode, env: Environment):
+        site = self.call_site(node, env)
+        if site.simple_args:
+            args = self.evaluate_args(node, env)
+        else:
+            args = yield from self.step_args(node, env)
+        if site.kind is not CallSite.USER:
+            return self.call_builtin(node, site, args)
+        # Same loop as call_function, inlined: this runs once per call.
+        pending = None
+        while True:
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(node.line, node.column)
+            function = site.callee
+            memo = site.memo
+            if memo is not None:
+                key = memo_key(args)
+                result = memo.get(key)
+                if result is not UNDEFINED:
+                    break
+                if pending is None:
+                    pending = []
+                pending.append((memo, key))
+            if site.padding:
+                args.extend(site.padding)
+            call_env = Environment(function.closure, args)
+            body = function.body
+            result = (yield body, call_env) if body.has_call else self.evaluate(body, call_env)
+            if not self.returning:
+                result = None
+                break
+            self.returning = False
+            if type(result) is not TailCall:
+                break
+            site, args = result.site, result.args
+            if site.kind is CallSite.ERROR:
+                site.raise_error(len(args))
+        if pending is not None:
+            self.remember(pending, result)
+        return result
+
+    def call_direct(self, node: FunctionCallNode, site: 'CallSite', env: Environment) -> Any:
+        """Call a site.direct callee with plain recursion (see run)."""
+        args = self.evaluate_args(node, env)
+        if site.kind is CallSite.BUILTIN:
+            return self.call_builtin(node, site, args)
+        self.fuel -= 1
+        if not self.fuel:
+            self.fuel = self.budget.refuel(node.line, node.column)
+        function = site.callee
+        if site.padding:
+            args.extend(site.padding)
+        result = self.evaluate(function.body, Environment(function.closure, args))
+        if not self.returning:
+            return None
+        self.returning = False
+        return result
 
-    def evaluate_return(self, node: ReturnNode, env: Environment) -> Any:
-        """Evaluate return statement."""
-        # TODO: Implement using ReturnValue exception
-        pass
+    def call_site(self, node: FunctionCallNode, env: Environment) -> 'CallSite':
+        """
+        Look up the callee of a call through the node's inline cache.
 
-    def evaluate_block(self, node: BlockNode, env: Environment) -> Any:
-        """Evaluate block of statements."""
-        # TODO: Implement
-        pass
+        The cache holds the callee seen last time; it stays valid for as long
+        as the binding still holds that same object, so reassigning the name
+        (to another function or to anything else) is the only invalidation.
+        """
+        function = env.get_at(node.depth, node.slot)
+        site = node.inline_cache
+        if site is not None and site.callee is function:
+            return site
+        site = CallSite(node, function)
+        if site.kind is not CallSite.ERROR:
+            node.inline_cache = site
+        return site
+
+    def evaluate_args(self, node: FunctionCallNode, env: Environment) -> List[Any]:
+        """Evaluate call-free arguments, with fast paths for 0-2 arguments."""
+        arguments = node.arguments
+        argc = len(arguments)
+        if argc == 1:
+            return [self.evaluate(arguments[0], env)]
+        if argc == 2:
+            return [self.evaluate(arguments[0], env), self.evaluate(arguments[1], env)]
+        return [self.evaluate(arg, env) for arg in arguments]
+
+    def step_args(self, node: FunctionCallNode, env: Environment):
+        """Evaluate arguments when some of them may call."""
+        args = []
+        for arg in node.arguments:
+            args.append((yield arg, env) if arg.has_call else self.evaluate(arg, env))
+        return args
+
+    def call_function(self, site: 'CallSite', args: List[Any]):
+        """
+        Run a user function's body in a new frame and return its value.
 
-    def evaluate_program(self, node: ProgramNode, env: Environment) -> Any:
-        """Evaluate entire program."""
-        # TODO: Implement
-        pass
+        Tail calls made by the body loop here, reusing this generator frame.
+        A @memo function's cached result ends the loop early; a computed one
+        is stored for every @memo function in the chain of tail calls, since
+        they all return it.
+        """
+        pending = None  # (MemoCache, key) of each @memo function awaiting the result
+        while True:
+            if site.kind is CallSite.ERROR:
+                site.raise_error(len(args))
+            self.fuel -= 1
+            if not self.fuel:
+                self.fuel = self.budget.refuel(site.node.line, site.node.column)
+            function = site.callee
+            memo = site.memo
+            if memo is not None:
+                key = memo_key(args)
+                result = memo.get(key)
+                if result is not UNDEFINED:
+                    break
+                if pending is None:
+                    pending = []
+                pending.append((memo, key))
+            # Parameters occupy the first slots; other locals start unset.
+            if site.padding:
+                args.extend(site.padding)
+            call_env = Environment(function.closure, args)
+            body = function.body
+            result = (yield body, call_env) if body.has_call else self.evaluate(body, call_env)
+            if not self.returning:
+                result = None
+                break
+            self.returning = False
+            if type(result) is not TailCall:
+                break
+            site, args = result.site, result.args
+        if pending is not None:
+            self.remember(pending, result)
+        return result
+
+    @staticmethod
+    def remember(pending: List[Tuple[MemoCache, tuple]], result: Any):
+        """
+        Store a call's result in the @memo caches waiting for it, innermost
+        call first, as if each call in the tail-call chain had returned.
+        """
+        for memo, key in reversed(pending):
+            memo.put(key, result)
+
+    def call_builtin(self, node: FunctionCallNode, site: 'CallSite', args: List[Any]) -> Any:
+        """Call a Python builtin, reporting errors at the call site."""
+        if site.kind is CallSite.ERROR:
+            site.raise_error(len(args))
+        try:
+            return site.callee(*args)
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise TinyLangRuntimeError(str(e), node.line, node.column) from None
+        except BudgetExceeded as e:  # a builtin's Budget.charge knows no position
+            raise BudgetExceeded(e.message, node.line, node.column) from None
+
+
+class Profile:
+    """
+    Results of a profiled run (TinyLang.run(..., profile=True)).
+
+    Times are in nanoseconds. Line time is exclusive: the time spent in
+    nodes that start on that line, not in lines they reach through calls.
+    Function time is reported both cumulative (inclusive, with recursive
+    calls counted once) and self (exclusive).
+    """
+
+    def __init__(self, source: str):
+        self.source_lines = source.splitlines()
+        self.line_hits: Dict[int, int] = defaultdict(int)
+        self.line_time: Dict[int, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.cumulative_time: Dict[str, int] = defaultdict(int)
+        self.self_time: Dict[str, int] = defaultdict(int)
+        self.stacks: Dict[Tuple[str, ...], int] = defaultdict(int)  # call stack -> self time
+
+    def report(self, limit: int = 10) -> str:
+        """Hot-spot tables: functions by cumulative time, lines by time."""
+        total = sum(self.line_time.values()) or 1
+        lines = [f"{'function':<20} {'calls':>8} {'cumulative ms':>14} {'self ms':>9} {'self %':>7}"]
+        functions = sorted(self.cumulative_time, key=self.cumulative_time.get, reverse=True)
+        for name in functions[:limit]:
+            lines.append(f"{name:<20} {self.calls[name]:>8} "
+                         f"{self.cumulative_time[name] / 1e6:>14.2f} "
+                         f"{self.self_time[name] / 1e6:>9.2f} "
+                         f"{100 * self.self_time[name] / total:>6.1f}%")
+        lines.append("")
+        lines.append(f"{'line':>5} {'hits':>8} {'ms':>9} {'%':>6}  source")
+        hot_lines = [line for line in self.line_time if 0 < line <= len(self.source_lines)]
+        for line in sorted(hot_lines, key=self.line_time.get, reverse=True)[:limit]:
+            text = self.source_lines[line - 1].strip()
+            lines.append(f"{line:>5} {self.line_hits[line]:>8} {self.line_time[line] / 1e6:>9.2f} "
+                         f"{100 * self.line_time[line] / total:>5.1f}%  {text[:50]}")
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """
+        Call stacks in the collapsed format read by flamegraph.pl, speedscope
+        and similar tools: `<program>;outer;inner <microseconds>` per line.
+        """
+        lines = []
+        for stack, nanoseconds in sorted(self.stacks.items()):
+            microseconds = nanoseconds // 1000
+            if microseconds:
+                lines.append(f"{';'.join(stack)} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    def write_collapsed(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.collapsed_stacks())
+
+
+class ProfilingEvaluator(Evaluator):
+    """
+    Evaluator that records a Profile while it runs.
+
+    Used only for TinyLang.run(..., profile=True); ordinary runs use the
+    plain Evaluator or the VM, so profiling costs nothing when it is off.
+    Every node evaluation is bracketed by enter/leave events, and the time
+    between consecutive events is charged to the innermost node's line and
+    to the current TinyLang call stack. Builtins appear as functions too.
+    """
+
+    PROGRAM = '<program>'
+
+    def __init__(self, global_env: GlobalEnvironment, profile: Profile,
+                 budget: Optional[Budget] = None):
+        super().__init__(global_env, budget)
+        self.profile = profile
+        self.bodies: Dict[int, str] = {}  # id(function body) -> function name
+        self.statements: set = set()      # ids of statement nodes (line hits)
+        self.lines = [0]
+        self.functions: List[str] = []
+        self.stack_key: Tuple[str, ...] = ()
+        self.active: Dict[str, int] = defaultdict(int)
+        self.started: Dict[str, int] = {}
+        self.last = time.perf_counter_ns()
+
+    def register(self, node: Any):
+        """Record which nodes are statements and which are function bodies."""
+        if isinstance(node, list):
+            for item in node:
+                self.register(item)
+            return
+        if not isinstance(node, ASTNode):
+            return
+        if isinstance(node, (BlockNode, ProgramNode)):
+            self.statements.update(id(statement) for statement in node.statements)
+        if isinstance(node, FunctionDefNode):
+            self.bodies[id(node.body)] = node.name
+        for f in fields(node):
+            if f.compare:
+                self.register(getattr(node, f.name))
+
+    def profile_program(self, program: ProgramNode) -> Any:
+        """Evaluate a program, recording its profile."""
+        self.register(program)
+        self.last = time.perf_counter_ns()
+        self.enter_function(self.PROGRAM, self.last)
+        try:
+            return self.evaluate(program, self.global_env)
+        finally:
+            now = time.perf_counter_ns()
+            self.charge(now)
+            while self.functions:  # more than <program> if unwound by an error
+                self.leave_function(now)
+
+    # -- events ----------------------------------------------------------------
+
+    def charge(self, now: int):
+        """Charge the time since the last event to the innermost line and stack."""
+        elapsed = now - self.last
+        profile = self.profile
+        profile.line_time[self.lines[-1]] += elapsed
+        profile.self_time[self.functions[-1]] += elapsed
+        profile.stacks[self.stack_key] += elapsed
+        self.last = now
+
+    def enter(self, node: ASTNode):
+        now = time.perf_counter_ns()
+        self.charge(now)
+        if id(node) in self.statements:
+            self.profile.line_hits[node.line] += 1
+        self.lines.append(node.line or self.lines[-1])
+        name = self.bodies.get(id(node))
+        if name is not None:
+            self.enter_function(name, now)
+
+    def leave(self, node: ASTNode):
+        now = time.perf_counter_ns()
+        self.charge(now)
+        self.lines.pop()
+        if id(node) in self.bodies:
+            self.leave_function(now)
+
+    def enter_function(self, name: str, now: int):
+        self.profile.calls[name] += 1
+        if not self.active[name]:
+            self.started[name] = now
+        self.active[name] += 1
+        self.functions.append(name)
+        self.stack_key = tuple(self.functions)
+
+    def leave_function(self, now: int):
+        name = self.functions.pop()
+        self.stack_key = tuple(self.functions)
+        self.active[name] -= 1
+        if not self.active[name]:
+            self.profile.cumulative_time[name] += now - self.started.pop(name)
+
+    # -- instrumented evaluation ----------------------------------------------
+
+    def evaluate(self, node: ASTNode, env: Environment) -> Any:
+        if node.has_call:
+            return self.run(node, env)
+        self.enter(node)
+        try:
+            return super().evaluate(node, env)
+        finally:
+            self.leave(node)
+
+    def run(self, node: ASTNode, env: Environment) -> Any:
+        """Evaluator.run with enter/leave events and no direct-call fast path."""
+        steppers = self.steppers
+        stack = []
+        nodes = []
+        self.enter(node)
+        frame = steppers[type(node)](node, env)
+        value = None
+        while True:
+            try:
+                child, child_env = frame.send(value)
+            except StopIteration as done:
+                self.leave(node)
+                if not stack:
+                    return done.value
+                value = done.value
+                frame, node = stack.pop(), nodes.pop()
+                continue
+            stack.append(frame)
+            nodes.append(node)
+            node = child
+            self.enter(child)
+            frame = steppers[type(child)](child, child_env)
+            value = None
+
+    def call_builtin(self, node: FunctionCallNode, site: 'CallSite', args: List[Any]) -> Any:
+        now = time.perf_counter_ns()
+        self.charge(now)
+        self.enter_function(node.name, now)
+        try:
+            return super().call_builtin(node, site, args)
+        finally:
+            now = time.perf_counter_ns()
+            self.charge(now)
+            self.leave_function(now)
+
+
+class Awaiting:
+    """An async builtin's awaitable, on its way to AsyncEvaluator.run_async."""
+    __slots__ = ('awaitable', 'node')
+
+    def __init__(self, awaitable: Any, node: FunctionCallNode):
+        self.awaitable = awaitable
+        self.node = node
+
+
+class AsyncEvaluator(Evaluator):
+    """
+    Evaluator whose builtins may be coroutines (or other awaitables).
+
+    run_async is Evaluator.run as a coroutine. A builtin call that returns
+    an awaitable hands it, as an Awaiting, to that loop, which awaits it
+    (suspending only this script) and passes the result on as the call's
+    value. Many scripts, each with its own AsyncEvaluator, can so share one
+    event loop while they wait for I/O. Scripts switch only at awaits: one
+    that computes without awaiting holds the loop until its next await.
+    """
+
+    def _setup_builtins(self):
+        super()._setup_builtins()
+        self.global_env.define('sleep', self._builtin_sleep)
+
+    async def _builtin_sleep(self, seconds, result=None):
+        """Built-in sleep: wait without blocking other scripts (a stand-in for I/O)."""
+        await asyncio.sleep(seconds)
+        return result
+
+    def call_builtin(self, node: FunctionCallNode, site: 'CallSite', args: List[Any]) -> Any:
+        result = super().call_builtin(node, site, args)
+        if inspect.isawaitable(result):
+            return Awaiting(result, node)
+        return result
+
+    async def evaluate_async(self, node: ASTNode, env: Environment) -> Any:
+        """Evaluate node, awaiting the async builtins it calls."""
+        if node.has_call:
+            return await self.run_async(node, env)
+        return self.evaluate(node, env)
+
+    async def run_async(self, node: ASTNode, env: Environment) -> Any:
+        """The loop of Evaluator.run, awaiting each Awaiting a call produces."""
+        steppers = self.steppers
+        stack = []
+        frame = steppers[type(node)](node, env)
+        value = None
+        while True:
+            try:
+                child, child_env = frame.send(value)
+            except StopIteration as done:
+                value = done.value
+                if type(value) is Awaiting:
+                    value = await self.wait_for(value)
+                if not stack:
+                    return value
+                frame = stack.pop()
+                continue
+            if type(child) is FunctionCallNode:
+                site = child.inline_cache
+                if (site is not None and site.direct
+                        and child_env.get_at(child.depth, child.slot) is site.callee):
+                    value = self.call_direct(child, site, child_env)
+                    if type(value) is Awaiting:
+                        value = await self.wait_for(value)
+                    continue
+            stack.append(frame)
+            frame = steppers[type(child)](child, child_env)
+            value = None
+
+    @staticmethod
+    async def wait_for(pending: Awaiting) -> Any:
+        """Await an async builtin's result, reporting its errors at the call."""
+        try:
+            return await pending.awaitable
+        except (ArithmeticError, TypeError, ValueError) as e:
+            node = pending.node
+            raise TinyLangRuntimeError(str(e), node.line, node.column) from None
 
 
 # =============================================================================
-# Part 6: REPL and File Execution
+# Part 6: Bytecode Compiler
 # =============================================================================
 
+class OpCode(IntEnum):
+    """
+    Instructions for the TinyLang stack machine.
+
+    Every instruction in CodeObject.instructions is an (opcode, arg) pair of
+    ints; arg is 0 when unused. Jump arguments are absolute instruction
+    indexes. Pairs are used rather than a flat int list because unpacking
+    one tuple is measurably cheaper than two list lookups in the VM loop.
+
+    Variables are addressed by slot: FAST is the current frame, GLOBAL the
+    outermost frame, and DEREF any frame in between (a captured variable).
+    """
+    LOAD_CONST = auto()          # push constants[arg]
+    LOAD_FAST = auto()           # push current frame slot arg
+    STORE_FAST = auto()          # pop into current frame slot arg
+    LOAD_GLOBAL = auto()         # push global slot arg
+    STORE_GLOBAL = auto()        # pop into global slot arg
+    LOAD_DEREF = auto()          # operands[arg] = (depth, slot, name)
+    STORE_DEREF = auto()         # operands[arg] = (depth, slot, name)
+    POP_TOP = auto()
+    DUP_TOP = auto()
+
+    BINARY_OP = auto()           # pop right, left; push BINARY_OPERATORS[arg] result
+    BINARY_FAST_CONST = auto()   # operands[arg]: push `local <op> constant`
+    STORE_FAST_CONST = auto()    # operands[arg]: target = local <op> constant (i = i + 1)
+    NEGATE = auto()
+    NOT = auto()
+    SQUARE = auto()              # the Optimizer's `square` op (x ** 2)
+
+    BUILD_ARRAY = auto()         # pop arg values; push them as a new array
+    INDEX = auto()               # pop index, target; push target[index]
+    SLICE = auto()               # pop stop, start, target; push target[start:stop]
+    STORE_INDEX = auto()         # pop value, index, target; target[index] = value; push value
+
+    JUMP = auto()                # pc = arg
+    POP_JUMP_IF_FALSE = auto()   # pop; jump if falsy
+    POP_JUMP_IF_TRUE = auto()    # pop; jump if truthy
+    JUMP_ON_FAST_CONST = auto()  # operands[arg]: jump to target if bool(local <op> constant) == when
+    JUMP_IF_FALSE_OR_POP = auto()  # `and`: keep falsy left operand, else pop it
+    JUMP_IF_TRUE_OR_POP = auto()   # `or`: keep truthy left operand, else pop it
+    GET_ITER = auto()
+    FOR_ITER = auto()            # push next item, or pop iterator and jump to arg
+
+    MAKE_FUNCTION = auto()       # push CompiledFunction for constants[arg]
+    CHECK_CALLEE = auto()        # operands[arg] as for CALL: fail now if the callee is undefined
+    CALL = auto()                # operands[arg] = (name, depth, slot, argc)
+    TAIL_CALL = auto()           # CALL that replaces the current frame (`return f(...)`)
+    RETURN = auto()
+
+
+# Depth used in CALL operands for a callee stored in the global frame.
+GLOBAL_DEPTH = -1
+
+# BINARY_OP arguments index both lists. The operator-module functions are C
+# calls; `+` on a string and a non-string raises TypeError and the VM falls
+# back to apply_binary_op, which does the TinyLang concatenation.
+BINARY_OPERATORS = ['+', '-', '*', '/', '%', '**', '==', '!=', '<', '>', '<=', '>=']
+BINARY_FUNCTIONS = [
+    operator.add, operator.sub, operator.mul, operator.truediv, operator.mod, operator.pow,
+    operator.eq, operator.ne, operator.lt, operator.gt, operator.le, operator.ge,
+]
+
+
+def budgeted_binary_functions(budget: Budget) -> List[Callable]:
+    """
+    BINARY_FUNCTIONS for a program under a memory limit: `+`, `*` and `**`
+    charge budget for the value they are about to build (allocation_size).
+    """
+    functions = list(BINARY_FUNCTIONS)
+    for operator_name in ('+', '*', '**'):
+        index = BINARY_OPERATORS.index(operator_name)
+        small = SMALL_POWER_OPERANDS if operator_name == '**' else SMALL_OPERANDS
+
+        def charged(left, right, operator_name=operator_name, function=functions[index],
+                    small=small):
+            if type(left) not in small or type(right) not in small:
+                size = allocation_size(operator_name, left, right)
+                if size:
+                    budget.charge(size)
+            return function(left, right)
+        functions[index] = charged
+    return functions
+
+
+@dataclass
+class CodeObject:
+    """Bytecode for the whole program or for one function body."""
+    name: str
+    params: List[str] = field(default_factory=list)
+    instructions: List[Tuple[int, int]] = field(default_factory=list)
+    constants: List[Any] = field(default_factory=list)
+    operands: List[tuple] = field(default_factory=list)  # for multi-argument instructions
+    positions: List[Tuple[int, int]] = field(default_factory=list)  # per instruction
+    # Instruction index -> position of the variable a fused *_FAST_CONST
+    # instruction reads, so an undefined one is reported where it is written.
+    variable_positions: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+    # Slot -> name for this frame's variables (error messages, disassembly).
+    # None for the program itself, whose frame is the global frame.
+    local_names: Optional[List[str]] = None
+    frame_size: int = 0
+    memo_size: int = 0  # @memo cache size of a function's code; 0 if not memoized
+
+    def disassemble(self) -> str:
+        """Human-readable listing of the instructions (nested code included)."""
+        lines = [f"Disassembly of {self.name}:"]
+        nested = []
+
+        def local(slot):
+            return self.local_names[slot] if self.local_names is not None else f"global {slot}"
+
+        for pc, (opcode, arg) in enumerate(self.instructions):
+            opcode = OpCode(opcode)
+            detail = ""
+            if opcode in (OpCode.LOAD_CONST, OpCode.MAKE_FUNCTION):
+                detail = f"({self.constants[arg]!r})"
+                if isinstance(self.constants[arg], CodeObject):
+                    nested.append(self.constants[arg])
+            elif opcode in (OpCode.LOAD_FAST, OpCode.STORE_FAST):
+                detail = f"({local(arg)})"
+            elif opcode in (OpCode.LOAD_DEREF, OpCode.STORE_DEREF):
+                depth, slot, name = self.operands[arg]
+                detail = f"({name} at depth {depth})"
+            elif opcode == OpCode.BINARY_OP:
+                detail = f"({BINARY_OPERATORS[arg]})"
+            elif opcode == OpCode.BINARY_FAST_CONST:
+                slot, op_index, constant = self.operands[arg]
+                detail = f"({local(slot)} {BINARY_OPERATORS[op_index]} {constant!r})"
+            elif opcode == OpCode.STORE_FAST_CONST:
+                target, slot, op_index, constant = self.operands[arg]
+                detail = (f"({local(target)} = {local(slot)} "
+                          f"{BINARY_OPERATORS[op_index]} {constant!r})")
+            elif opcode == OpCode.JUMP_ON_FAST_CONST:
+                slot, op_index, constant, when, target = self.operands[arg]
+                detail = (f"(if ({local(slot)} {BINARY_OPERATORS[op_index]} {constant!r})"
+                          f" is {when} -> {target})")
+            elif opcode in (OpCode.CALL, OpCode.TAIL_CALL):
+                name, depth, slot, argc = self.operands[arg]
+                detail = f"({name} with {argc} args)"
+            elif opcode == OpCode.CHECK_CALLEE:
+                detail = f"({self.operands[arg][0]})"
+            line = self.positions[pc][0]
+            lines.append(f"  {line:>4} {pc:>5} {opcode.name:<22}{arg:<6}{detail}")
+        for code in nested:
+            lines.append("")
+            lines.append(code.disassemble())
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"<code {self.name}>"
+
+
+@dataclass
+class CompiledFunction:
+    """A function value produced by MAKE_FUNCTION in the VM."""
+    name: str
+    params: List[str]
+    code: CodeObject
+    closure: Environment
+    memo: Optional[MemoCache] = None
+
+    def __repr__(self):
+        return f"<func {self.name}>"
+
+
+class Compiler:
+    """
+    Compiles a resolved ProgramNode into a CodeObject for the VirtualMachine.
+
+    Statements are compiled with a `want_value` flag: only the statement whose
+    value becomes the result of a block (the last one) leaves anything on the
+    stack, so loops do not pay for pushing and popping unused values.
+    """
+
+    LITERAL_NODES = (NumberNode, StringNode, BooleanNode)
+    UNARY_OPCODES = {'-': OpCode.NEGATE, 'not': OpCode.NOT, 'square': OpCode.SQUARE}
+
+    def __init__(self):
+        self.code: Optional[CodeObject] = None
+        self.depth = 0  # number of functions enclosing the code being compiled
+        self._constant_index: Dict[Any, int] = {}
+
+    def compile(self, program: ProgramNode) -> CodeObject:
+        """Compile a whole program (already annotated by the Resolver)."""
+        return self._compile_code(CodeObject('<program>'), program.statements, program,
+                                  want_value=True)
+
+    def _compile_code(self, code: CodeObject, statements: List[ASTNode],
+                      node: ASTNode, want_value: bool) -> CodeObject:
+        """Compile statements into code, ending with RETURN."""
+        saved = (self.code, self._constant_index)
+        self.code, self._constant_index = code, {}
+        try:
+            self.compile_statements(statements, node, want_value)
+            if not want_value:
+                self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+            self.emit(OpCode.RETURN, 0, node)
+            return self.code
+        finally:
+            self.code, self._constant_index = saved
+
+    # -- emission helpers ----------------------------------------------------
+
+    def emit(self, opcode: OpCode, arg: int, node: ASTNode) -> int:
+        """Append an instruction and return its index."""
+        self.code.instructions.append((int(opcode), arg))
+        self.code.positions.append((node.line, node.column))
+        return len(self.code.instructions) - 1
+
+    def emit_fused(self, opcode: OpCode, operands: int, node: ASTNode,
+                   variable: VariableNode) -> int:
+        """Emit a *_FAST_CONST instruction, remembering where its variable is."""
+        index = self.emit(opcode, operands, node)
+        self.code.variable_positions[index] = (variable.line, variable.column)
+        return index
+
+    def patch_jump(self, index: int, target: Optional[int] = None):
+        """Point the jump at `index` to `target` (default: the next instruction)."""
+        if target is None:
+            target = len(self.code.instructions)
+        opcode, arg = self.code.instructions[index]
+        if opcode == OpCode.JUMP_ON_FAST_CONST:
+            self.code.operands[arg] = self.code.operands[arg][:4] + (target,)
+        else:
+            self.code.instructions[index] = (opcode, target)
+
+    def add_constant(self, value: Any) -> int:
+        """Return the constant-pool index of value, adding it if needed."""
+        if isinstance(value, CodeObject):
+            self.code.constants.append(value)
+            return len(self.code.constants) - 1
+        key = (type(value), value)
+        if key not in self._constant_index:
+            self._constant_index[key] = len(self.code.constants)
+            self.code.constants.append(value)
+        return self._constant_index[key]
+
+    def add_operands(self, *operands: Any) -> int:
+        """Store extra arguments for one instruction and return their index."""
+        self.code.operands.append(operands)
+        return len(self.code.operands) - 1
+
+    def emit_load(self, name: str, depth: int, slot: int, node: ASTNode):
+        """Push a variable, picking the cheapest instruction for its address."""
+        if depth == 0:
+            self.emit(OpCode.LOAD_FAST, slot, node)
+        elif depth == self.depth:
+            self.emit(OpCode.LOAD_GLOBAL, slot, node)
+        else:
+            self.emit(OpCode.LOAD_DEREF, self.add_operands(depth, slot, name), node)
+
+    def emit_store(self, name: str, depth: int, slot: int, node: ASTNode):
+        """Pop into a variable, picking the cheapest instruction for its address."""
+        if depth == 0:
+            self.emit(OpCode.STORE_FAST, slot, node)
+        elif depth == self.depth:
+            self.emit(OpCode.STORE_GLOBAL, slot, node)
+        else:
+            self.emit(OpCode.STORE_DEREF, self.add_operands(depth, slot, name), node)
+
+    # -- statements ----------------------------------------------------------
+
+    def compile_statements(self, statements: List[ASTNode], node: ASTNode, want_value: bool):
+        """Compile a statement list; only the last one may produce a value."""
+        if not statements:
+            if want_value:
+                self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+            return
+        for statement in statements[:-1]:
+            self.compile_statement(statement, want_value=False)
+        self.compile_statement(statements[-1], want_value)
+
+    def compile_statement(self, node: ASTNode, want_value: bool):
+        """Compile one statement, leaving its value on the stack if wanted."""
+        if (isinstance(node, AssignmentNode) and not want_value and node.depth == 0
+                and self._is_fast_const(node.value)):
+            value = node.value
+            operands = self.add_operands(node.slot, value.left.slot,
+                                         BINARY_OPERATORS.index(value.operator), value.right.value)
+            self.emit_fused(OpCode.STORE_FAST_CONST, operands, node, value.left)
+        elif isinstance(node, AssignmentNode):
+            self.compile_expression(node.value)
+            if want_value:
+                self.emit(OpCode.DUP_TOP, 0, node)
+            self.emit_store(node.name, node.depth, node.slot, node)
+        elif isinstance(node, IndexAssignmentNode):
+            self.compile_expression(node.target)
+            self.compile_expression(node.index)
+            self.compile_expression(node.value)
+            self.emit(OpCode.STORE_INDEX, 0, node)
+            if not want_value:
+                self.emit(OpCode.POP_TOP, 0, node)
+        elif isinstance(node, IfNode):
+            self.compile_if(node, want_value)
+        elif isinstance(node, WhileNode):
+            self.compile_while(node, want_value)
+        elif isinstance(node, ForNode):
+            self.compile_for(node, want_value)
+        elif isinstance(node, FunctionDefNode):
+            self.compile_function_def(node, want_value)
+        elif isinstance(node, ReturnNode):
+            if node.value is None:
+                self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+            elif isinstance(node.value, FunctionCallNode):
+                self.compile_call(node.value, OpCode.TAIL_CALL)
+            else:
+                self.compile_expression(node.value)
+            self.emit(OpCode.RETURN, 0, node)
+        elif isinstance(node, BlockNode):
+            self.compile_statements(node.statements, node, want_value)
+        else:
+            self.compile_expression(node)
+            if not want_value:
+                self.emit(OpCode.POP_TOP, 0, node)
+
+    def compile_if(self, node: IfNode, want_value: bool):
+        """if/else: test, jump over the then-branch when false."""
+        jump_to_else = self.compile_conditional_jump(node.condition, when=False)
+        self.compile_statement(node.then_branch, want_value)
+        jump_to_end = self.emit(OpCode.JUMP, 0, node)
+        self.patch_jump(jump_to_else)
+        if node.else_branch is not None:
+            self.compile_statement(node.else_branch, want_value)
+        elif want_value:
+            self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+        self.patch_jump(jump_to_end)
+
+    def compile_while(self, node: WhileNode, want_value: bool):
+        """
+        while: the test sits after the body, so each iteration runs one
+        conditional jump back to the top instead of a test plus a JUMP.
+        """
+        enter_jump = self.emit(OpCode.JUMP, 0, node)
+        body_start = len(self.code.instructions)
+        self.compile_statement(node.body, want_value=False)
+        self.patch_jump(enter_jump)
+        repeat_jump = self.compile_conditional_jump(node.condition, when=True)
+        self.patch_jump(repeat_jump, body_start)
+        if want_value:
+            self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+
+    def compile_conditional_jump(self, condition: ASTNode, when: bool) -> int:
+        """
+        Emit a jump taken when the truth of condition equals `when`.
+
+        Returns the jump's index so the caller can patch in the target.
+        """
+        if self._is_fast_const(condition):
+            op_index = BINARY_OPERATORS.index(condition.operator)
+            operands = self.add_operands(condition.left.slot, op_index,
+                                         condition.right.value, when, 0)
+            return self.emit_fused(OpCode.JUMP_ON_FAST_CONST, operands, condition,
+                                   condition.left)
+        self.compile_expression(condition)
+        opcode = OpCode.POP_JUMP_IF_TRUE if when else OpCode.POP_JUMP_IF_FALSE
+        return self.emit(opcode, 0, condition)
+
+    def compile_for(self, node: ForNode, want_value: bool):
+        """for-in: keep the iterator on the stack while the loop runs."""
+        self.compile_expression(node.iterable)
+        self.emit(OpCode.GET_ITER, 0, node)
+        loop_start = self.emit(OpCode.FOR_ITER, 0, node)
+        self.emit_store(node.variable, node.depth, node.slot, node)
+        self.compile_statement(node.body, want_value=False)
+        self.emit(OpCode.JUMP, loop_start, node)
+        self.patch_jump(loop_start)
+        if want_value:
+            self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+
+    def compile_function_def(self, node: FunctionDefNode, want_value: bool):
+        """Compile the body to its own CodeObject and bind a closure over it."""
+        body = node.body.statements if isinstance(node.body, BlockNode) else [node.body]
+        code = CodeObject(node.name, list(node.params), local_names=list(node.local_names),
+                          frame_size=node.local_count, memo_size=node.memo_size)
+        self.depth += 1
+        try:
+            self._compile_code(code, body, node, want_value=False)
+        finally:
+            self.depth -= 1
+        self.emit(OpCode.MAKE_FUNCTION, self.add_constant(code), node)
+        self.emit_store(node.name, node.depth, node.slot, node)
+        if want_value:
+            self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+
+    # -- expressions ---------------------------------------------------------
+
+    def compile_expression(self, node: ASTNode):
+        """Compile an expression so that it pushes exactly one value."""
+        if isinstance(node, self.LITERAL_NODES):
+            self.emit(OpCode.LOAD_CONST, self.add_constant(node.value), node)
+        elif isinstance(node, NullNode):
+            self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+        elif isinstance(node, VariableNode):
+            self.emit_load(node.name, node.depth, node.slot, node)
+        elif isinstance(node, BinaryOpNode):
+            self.compile_binary_op(node)
+        elif isinstance(node, UnaryOpNode):
+            self.compile_expression(node.operand)
+            self.emit(self.UNARY_OPCODES[node.operator], 0, node)
+        elif isinstance(node, FunctionCallNode):
+            self.compile_call(node, OpCode.CALL)
+        elif isinstance(node, ArrayNode):
+            for element in node.elements:
+                self.compile_expression(element)
+            self.emit(OpCode.BUILD_ARRAY, len(node.elements), node)
+        elif isinstance(node, IndexNode):
+            self.compile_expression(node.target)
+            self.compile_expression(node.index)
+            self.emit(OpCode.INDEX, 0, node)
+        elif isinstance(node, SliceNode):
+            self.compile_expression(node.target)
+            for bound in (node.start, node.stop):
+                if bound is None:
+                    self.emit(OpCode.LOAD_CONST, self.add_constant(None), node)
+                else:
+                    self.compile_expression(bound)
+            self.emit(OpCode.SLICE, 0, node)
+        else:
+            self.compile_statement(node, want_value=True)
+
+    def compile_call(self, node: FunctionCallNode, opcode: OpCode):
+        """
+        Push the arguments, then CALL (or TAIL_CALL) the named function.
+
+        Like the other backends, an undefined callee is reported before any
+        argument runs, so CHECK_CALLEE comes first unless every argument is
+        a literal (which can neither fail nor have side effects).
+        """
+        depth = GLOBAL_DEPTH if node.depth == self.depth and node.depth else node.depth
+        operands = self.add_operands(node.name, depth, node.slot, len(node.arguments))
+        if not all(isinstance(arg, (*self.LITERAL_NODES, NullNode)) for arg in node.arguments):
+            self.emit(OpCode.CHECK_CALLEE, operands, node)
+        for arg in node.arguments:
+            self.compile_expression(arg)
+        self.emit(opcode, operands, node)
+
+    def compile_binary_op(self, node: BinaryOpNode):
+        """
+        Arithmetic/comparison become BINARY_OP; and/or short-circuit with jumps.
+
+        The very common `local <op> literal` shape (i < 10, n - 1, ...) is
+        fused into one BINARY_FAST_CONST instruction instead of three.
+        """
+        if node.operator in ('and', 'or'):
+            self.compile_expression(node.left)
+            opcode = OpCode.JUMP_IF_FALSE_OR_POP if node.operator == 'and' \
+                else OpCode.JUMP_IF_TRUE_OR_POP
+            jump = self.emit(opcode, 0, node)
+            self.compile_expression(node.right)
+            self.patch_jump(jump)
+            return
+        if node.operator not in BINARY_OPERATORS:
+            raise TinyLangRuntimeError(f"Unknown operator '{node.operator}'",
+                                       node.line, node.column)
+        op_index = BINARY_OPERATORS.index(node.operator)
+        if self._is_fast_const(node):
+            operands = self.add_operands(node.left.slot, op_index, node.right.value)
+            self.emit_fused(OpCode.BINARY_FAST_CONST, operands, node, node.left)
+            return
+        self.compile_expression(node.left)
+        self.compile_expression(node.right)
+        self.emit(OpCode.BINARY_OP, op_index, node)
+
+    def _is_fast_const(self, node: ASTNode) -> bool:
+        """True for `local variable <arithmetic/comparison op> literal`."""
+        return (isinstance(node, BinaryOpNode) and node.operator in BINARY_OPERATORS
+                and isinstance(node.left, VariableNode) and node.left.depth == 0
+                and isinstance(node.right, self.LITERAL_NODES))
+
+
+# =============================================================================
+# Part 7: Virtual Machine
+# =============================================================================
+
+class VirtualMachine:
+    """
+    Stack-based VM that executes CodeObjects.
+
+    All frames share one value stack. Calls to compiled functions push a saved
+    frame onto a Python list instead of recursing, so TinyLang recursion depth
+    is not limited by Python's recursion limit.
+
+    Budget steps are burned by the instructions every loop iteration or
+    call runs once: a taken backward jump (the repeat test of a while),
+    FOR_ITER, and a CALL of a compiled function.
+
+    A CALL of a @memo function whose result is cached pushes it without
+    entering the function; otherwise the frame remembers where to store its
+    result (memo_entry) until it returns. A memoized frame is never replaced
+    by a TAIL_CALL, which would lose that store.
+    """
+
+    def __init__(self, global_env: GlobalEnvironment, budget: Optional[Budget] = None):
+        self.global_env = global_env
+        self.budget = budget if budget is not None else Budget()
+
+    def _undefined(self, code: CodeObject, slot: int, is_global: bool,
+                   position: Tuple[int, int] = (0, 0)) -> TinyLangRuntimeError:
+        """
+        Build the error for reading a slot that was never assigned, at
+        position if given (else at the current instruction).
+        """
+        if is_global or code.local_names is None:
+            name = self.global_env.names[slot]
+        else:
+            name = code.local_names[slot]
+        return TinyLangRuntimeError(f"Undefined variable '{name}'", *position)
+
+    def run(self, code: CodeObject, env: Optional[Environment] = None) -> Any:
+        """Execute code (the program) and return the value it produces."""
+        if env is None:
+            env = self.global_env
+
+        # Opcodes as locals, tested roughly in order of how often they run:
+        # comparing against a local int is the cheapest dispatch available.
+        LOAD_CONST, LOAD_FAST, STORE_FAST = OpCode.LOAD_CONST, OpCode.LOAD_FAST, OpCode.STORE_FAST
+        LOAD_GLOBAL, STORE_GLOBAL = OpCode.LOAD_GLOBAL, OpCode.STORE_GLOBAL
+        LOAD_DEREF, STORE_DEREF = OpCode.LOAD_DEREF, OpCode.STORE_DEREF
+        BINARY_OP, BINARY_FAST_CONST = OpCode.BINARY_OP, OpCode.BINARY_FAST_CONST
+        STORE_FAST_CONST = OpCode.STORE_FAST_CONST
+        POP_TOP, DUP_TOP = OpCode.POP_TOP, OpCode.DUP_TOP
+        JUMP, POP_JUMP_IF_FALSE = OpCode.JUMP, OpCode.POP_JUMP_IF_FALSE
+        POP_JUMP_IF_TRUE, JUMP_ON_FAST_CONST = OpCode.POP_JUMP_IF_TRUE, OpCode.JUMP_ON_FAST_CONST
+        JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP = \
+            OpCode.JUMP_IF_FALSE_OR_POP, OpCode.JUMP_IF_TRUE_OR_POP
+        CALL, TAIL_CALL, RETURN = OpCode.CALL, OpCode.TAIL_CALL, OpCode.RETURN
+        CHECK_CALLEE = OpCode.CHECK_CALLEE
+        FOR_ITER, GET_ITER, MAKE_FUNCTION = OpCode.FOR_ITER, OpCode.GET_ITER, OpCode.MAKE_FUNCTION
+        NEGATE, NOT, SQUARE = OpCode.NEGATE, OpCode.NOT, OpCode.SQUARE
+        BUILD_ARRAY, INDEX, SLICE, STORE_INDEX = \
+            OpCode.BUILD_ARRAY, OpCode.INDEX, OpCode.SLICE, OpCode.STORE_INDEX
+        budget = self.budget
+        charge = budget.charge if budget.max_memory is not None else None
+        binary_functions = BINARY_FUNCTIONS if charge is None \
+            else budgeted_binary_functions(budget)
+
+        stack: List[Any] = []
+        push, pop = stack.append, stack.pop
+        frames: List[tuple] = []
+        instructions, constants, operands = code.instructions, code.constants, code.operands
+        values = env.values
+        global_values = self.global_env.values
+        stack_base = 0
+        pc = 0
+        memo_entry = None  # (MemoCache, key) for the current frame's result
+        fuel = budget.start()
+
+        try:
+            while True:
+                op, arg = instructions[pc]
+                pc += 1
+
+                if op == LOAD_FAST:
+                    value = values[arg]
+                    if value is UNDEFINED:
+                        raise self._undefined(code, arg, False)
+                    push(value)
+                elif op == BINARY_FAST_CONST:
+                    slot, op_index, constant = operands[arg]
+                    left = values[slot]
+                    if left is UNDEFINED:
+                        raise self._undefined(code, slot, False,
+                                              code.variable_positions[pc - 1])
+                    try:
+                        push(binary_functions[op_index](left, constant))
+                    except TypeError:
+                        push(apply_binary_op(BINARY_OPERATORS[op_index], left, constant))
+                elif op == STORE_FAST:
+                    values[arg] = pop()
+                elif op == STORE_FAST_CONST:
+                    target, slot, op_index, constant = operands[arg]
+                    left = values[slot]
+                    if left is UNDEFINED:
+                        raise self._undefined(code, slot, False,
+                                              code.variable_positions[pc - 1])
+                    try:
+                        values[target] = binary_functions[op_index](left, constant)
+                    except TypeError:
+                        values[target] = apply_binary_op(BINARY_OPERATORS[op_index], left, constant)
+                elif op == JUMP_ON_FAST_CONST:
+                    slot, op_index, constant, when, target = operands[arg]
+                    left = values[slot]
+                    if left is UNDEFINED:
+                        raise self._undefined(code, slot, False,
+                                              code.variable_positions[pc - 1])
+                    try:
+                        result = binary_functions[op_index](left, constant)
+                    except TypeError:
+                        result = apply_binary_op(BINARY_OPERATORS[op_index], left, constant)
+                    if result:
+                        if when:  # only a while loop's repeat test jumps when true
+                            fuel -= 1
+                            if not fuel:
+                                fuel = budget.refuel()
+                            pc = target
+                    elif not when:
+                        pc = target
+                elif op == BINARY_OP:
+                    right = pop()
+                    try:
+                        stack[-1] = binary_functions[arg](stack[-1], right)
+                    except TypeError:
+                        stack[-1] = apply_binary_op(BINARY_OPERATORS[arg], stack[-1], right)
+                elif op == LOAD_CONST:
+                    push(constants[arg])
+                elif op == LOAD_GLOBAL:
+                    value = global_values[arg]
+                    if value is UNDEFINED:
+                        raise self._undefined(code, arg, True)
+                    push(value)
+                elif op == JUMP:
+                    pc = arg
+                elif op == POP_JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == POP_JUMP_IF_TRUE:
+                    if pop():  # a while loop's repeat test: jumps backward
+                        fuel -= 1
+                        if not fuel:
+                            fuel = budget.refuel()
+                        pc = arg
+                elif op == INDEX:
+                    index = pop()
+                    target = stack[-1]
+                    if (type(target) is list and type(index) is int
+                            and -len(target) <= index < len(target)):
+                        stack[-1] = target[index]
+                    else:
+                        stack[-1] = get_index(target, index)
+                elif op == CALL or op == TAIL_CALL:
+                    name, depth, slot, argc = operands[arg]
+                    if depth == 0:
+                        function = values[slot]
+                    elif depth == GLOBAL_DEPTH:
+                        function = global_values[slot]
+                    else:
+                        function = env.get_at(depth, slot)
+                    if type(function) is CompiledFunction:
+                        fuel -= 1
+                        if not fuel:
+                            fuel = budget.refuel()
+                        function_code = function.code
+                        if argc != len(function_code.params):
+                            raise TinyLangRuntimeError(
+                                f"{function.name}() takes {len(function_code.params)} "
+                                f"arguments but {argc} were given")
+                        memo = function.memo
+                        if memo is not None:
+                            key = memo_key(stack[len(stack) - argc:])
+                            value = memo.get(key)
+                            if value is not UNDEFINED:
+                                del stack[len(stack) - argc:]
+                                push(value)
+                                continue
+                        # Arguments become the first slots of the new frame.
+                        values = stack[len(stack) - argc:]
+                        if op == CALL or memo_entry is not None:
+                            frames.append((code, pc, env, stack_base, memo_entry))
+                            del stack[len(stack) - argc:]
+                            stack_base = len(stack)
+                        else:
+                            # The callee takes over this frame and its stack
+                            # space, so tail recursion runs in constant space.
+                            del stack[stack_base:]
+                        if function_code.frame_size > argc:
+                            values.extend([UNDEFINED] * (function_code.frame_size - argc))
+                        env = Environment(function.closure, values)
+                        code = function_code
+                        instructions, constants, operands = \
+                            code.instructions, code.constants, code.operands
+                        pc = 0
+                        memo_entry = None if memo is None else (memo, key)
+                    elif callable(function):
+                        args = stack[len(stack) - argc:]
+                        del stack[len(stack) - argc:]
+                        push(function(*args))
+                    elif function is UNDEFINED:
+                        raise TinyLangRuntimeError(f"Undefined variable '{name}'")
+                    else:
+                        raise TinyLangRuntimeError(f"'{name}' is not a function")
+                elif op == RETURN:
+                    value = pop()
+                    if memo_entry is not None:
+                        memo_entry[0].put(memo_entry[1], value)
+                    if not frames:
+                        return value
+                    del stack[stack_base:]
+                    code, pc, env, stack_base, memo_entry = frames.pop()
+                    instructions, constants, operands = \
+                        code.instructions, code.constants, code.operands
+                    values = env.values
+                    push(value)
+                elif op == CHECK_CALLEE:
+                    name, depth, slot, argc = operands[arg]
+                    if depth == 0:
+                        function = values[slot]
+                    elif depth == GLOBAL_DEPTH:
+                        function = global_values[slot]
+                    else:
+                        function = env.get_at(depth, slot)
+                    if function is UNDEFINED:
+                        raise TinyLangRuntimeError(f"Undefined variable '{name}'")
+                elif op == STORE_GLOBAL:
+                    global_values[arg] = pop()
+                elif op == LOAD_DEREF:
+                    depth, slot, name = operands[arg]
+                    value = env.get_at(depth, slot)
+                    if value is UNDEFINED:
+                        raise TinyLangRuntimeError(f"Undefined variable '{name}'")
+                    push(value)
+                elif op == STORE_DEREF:
+                    depth, slot, name = operands[arg]
+                    env.set_at(depth, slot, pop())
+                elif op == POP_TOP:
+                    pop()
+                elif op == DUP_TOP:
+                    push(stack[-1])
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    if not stack[-1]:
+                        pc = arg
+                    else:
+                        pop()
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    if stack[-1]:
+                        pc = arg
+                    else:
+                        pop()
+                elif op == FOR_ITER:
+                    try:
+                        push(next(stack[-1]))
+                    except StopIteration:
+                        pop()
+                        pc = arg
+                    else:
+                        fuel -= 1
+                        if not fuel:
+                            fuel = budget.refuel()
+                elif op == GET_ITER:
+                    stack[-1] = iter(stack[-1])
+                elif op == MAKE_FUNCTION:
+                    function_code = constants[arg]
+                    memo = MemoCache(function_code.memo_size) if function_code.memo_size else None
+                    push(CompiledFunction(function_code.name, function_code.params,
+                                          function_code, env, memo))
+                elif op == NEGATE:
+                    stack[-1] = -stack[-1]
+                elif op == NOT:
+                    stack[-1] = not stack[-1]
+                elif op == SQUARE:
+                    value = stack[-1]
+                    stack[-1] = value * value if type(value) is int else value ** 2
+                elif op == BUILD_ARRAY:
+                    if charge is not None:
+                        charge(array_bytes(arg))
+                    if arg:
+                        array = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        push(array)
+                    else:
+                        push([])
+                elif op == STORE_INDEX:
+                    value = pop()
+                    index = pop()
+                    set_index(stack[-1], index, value)
+                    stack[-1] = value
+                elif op == SLICE:
+                    stop = pop()
+                    start = pop()
+                    stack[-1] = get_slice(stack[-1], start, stop)
+                else:
+                    raise TinyLangRuntimeError(f"Bad opcode {op}")
+        except TinyLangError as e:
+            if e.line:
+                raise
+            line, column = code.positions[pc - 1]
+            raise type(e)(e.message, line, column) from None
+        except (ArithmeticError, TypeError, ValueError) as e:
+            line, column = code.positions[pc - 1]
+            raise TinyLangRuntimeError(str(e), line, column) from None
+
+
+# =============================================================================
+# Part 8: Closure Compiler
+# =============================================================================
+
+class Returned:
+    """Wraps the value of an executed `return` in the closure backend."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+@dataclass
+class ClosureFunction:
+    """A function value created by closure-compiled code."""
+    name: str
+    params: List[str]
+    body: Callable[[Environment], Any]
+    closure: Environment
+    padding: List[Any]  # UNDEFINED for each non-parameter local
+    memo: Optional[MemoCache] = None
+
+    def __repr__(self):
+        return f"<func {self.name}>"
+
+
+class ClosureCompiler:
+    """
+    Compiles a resolved AST into nested Python closures.
+
+    Every node becomes one Python function of the current Environment,
+    specialized once at compile time for its shape: `a + 1` becomes a
+    closure that reads a's slot and adds the constant, with no type
+    dispatch or instruction decoding left at run time.
+
+    Statements return their value; an executed `return` produces a Returned
+    wrapper, and only statements that contain a return are checked for one.
+    TinyLang calls nest Python calls here, so recursion depth is limited by
+    CLOSURE_RECURSION_LIMIT; use the vm backend for very deep recursion.
+
+    Given a Budget, loops and calls of user functions are compiled in
+    variants that burn a step per iteration or call; without one, no
+    metering code is generated.
+    """
+
+    def __init__(self, global_env: GlobalEnvironment, budget: Optional[Budget] = None):
+        self.global_values = global_env.values
+        self.global_names = global_env.names
+        self.budget = budget
+        self.depth = 0  # number of functions enclosing the code being compiled
+        # budget.charge when there is a memory limit, else None
+        self.charge = budget.charge if budget is not None and budget.max_memory is not None \
+            else None
+
+    def compile(self, program: ProgramNode) -> Callable[[Environment], Any]:
+        """Compile a program; call the result with the global environment."""
+        block, _ = self.compile_block(program.statements)
+        budget = self.budget
+
+        def run_program(env):
+            if budget is not None:
+                budget.start()
+            result = block(env)
+            return result.value if type(result) is Returned else result
+        return run_program
+
+    # -- statements ----------------------------------------------------------
+
+    def compile_block(self, statements: List[ASTNode]) -> Tuple[Callable, bool]:
+        """Compile statements; also return whether any of them can `return`."""
+        compiled = [self.compile_statement(statement) for statement in statements]
+        if not compiled:
+            return (lambda env: None), False
+        if not any(may_return for _, may_return in compiled):
+            functions = [function for function, _ in compiled]
+            if len(functions) == 1:
+                return functions[0], False
+            *init, last = functions
+
+            def block(env):
+                for function in init:
+                    function(env)
+                return last(env)
+            return block, False
+
+        def returning_block(env):
+            result = None
+            for function, may_return in compiled:
+                result = function(env)
+                if may_return and type(result) is Returned:
+                    return result
+            return result
+        return returning_block, True
+
+    def compile_statement(self, node: ASTNode) -> Tuple[Callable, bool]:
+        """Compile one statement; also return whether it can `return`."""
+        if isinstance(node, ReturnNode):
+            if node.value is None:
+                returned_none = Returned(None)
+                return (lambda env: returned_none), True
+            value = self.compile_expression(node.value)
+            return (lambda env: Returned(value(env))), True
+        if isinstance(node, BlockNode):
+            return self.compile_block(node.statements)
+        if isinstance(node, IfNode):
+            return self.compile_if(node)
+        if isinstance(node, WhileNode):
+            return self.compile_while(node)
+        if isinstance(node, ForNode):
+            return self.compile_for(node)
+        if isinstance(node, FunctionDefNode):
+            return self.compile_function_def(node), False
+        return self.compile_expression(node), False
+
+    def compile_if(self, node: IfNode) -> Tuple[Callable, bool]:
+        condition = self.compile_expression(node.condition)
+        then_branch, then_returns = self.compile_statement(node.then_branch)
+        if node.else_branch is None:
+            def if_then(env):
+                if condition(env):
+                    return then_branch(env)
+                return None
+            return if_then, then_returns
+        else_branch, else_returns = self.compile_statement(node.else_branch)
+
+        def if_else(env):
+            if condition(env):
+                return then_branch(env)
+            return else_branch(env)
+        return if_else, then_returns or else_returns
+
+    def compile_while(self, node: WhileNode) -> Tuple[Callable, bool]:
+        condition = self.compile_expression(node.condition)
+        body, may_return = self.compile_statement(node.body)
+        budget, line, column = self.budget, node.line, node.column
+        if budget is not None:
+            def metered_loop(env):
+                while condition(env):
+                    budget.fuel -= 1
+                    if not budget.fuel:
+                        budget.refuel(line, column)
+                    result = body(env)
+                    if may_return and type(result) is Returned:
+                        return result
+                return None
+            return metered_loop, may_return
+        if not may_return:
+            def loop(env):
+                while condition(env):
+                    body(env)
+                return None
+            return loop, False
+
+        def returning_loop(env):
+            while condition(env):
+                result = body(env)
+                if type(result) is Returned:
+                    return result
+            return None
+        return returning_loop, True
+
+    def compile_for(self, node: ForNode) -> Tuple[Callable, bool]:
+        iterable = self.compile_expression(node.iterable)
+        body, may_return = self.compile_statement(node.body)
+        depth, slot, line, column = node.depth, node.slot, node.line, node.column
+        budget = self.budget
+
+        def for_loop(env):
+            value = iterable(env)
+            try:
+                iterator = iter(value)
+            except TypeError:
+                raise TinyLangRuntimeError(f"Cannot iterate over {to_string(value)}",
+                                           line, column) from None
+            target = env.ancestor(depth).values
+            for item in iterator:
+                if budget is not None:
+                    budget.fuel -= 1
+                    if not budget.fuel:
+                        budget.refuel(line, column)
+                target[slot] = item
+                result = body(env)
+                if may_return and type(result) is Returned:
+                    return result
+            return None
+        return for_loop, may_return
+
+    def compile_function_def(self, node: FunctionDefNode) -> Callable:
+        self.depth += 1
+        try:
+            body, _ = self.compile_block(
+                node.body.statements if isinstance(node.body, BlockNode) else [node.body])
+        finally:
+            self.depth -= 1
+        name, params = node.name, list(node.params)
+        padding = [UNDEFINED] * (node.local_count - len(params))
+        store = self.compile_store(node.depth, node.slot)
+        memo_size = node.memo_size
+
+        def define(env):
+            memo = MemoCache(memo_size) if memo_size else None
+            store(env, ClosureFunction(name, params, body, env, padding, memo))
+            return None
+        return define
+
+    # -- variables -----------------------------------------------------------
+
+    def compile_store(self, depth: int, slot: int) -> Callable[[Environment, Any], None]:
+        """A function that stores a value into the resolved (depth, slot)."""
+        if depth == 0:
+            def store_fast(env, value):
+                env.values[slot] = value
+            return store_fast
+        if depth == self.depth:
+            global_values = self.global_values
+
+            def store_global(env, value):
+                global_values[slot] = value
+            return store_global
+
+        def store_deref(env, value):
+            env.set_at(depth, slot, value)
+        return store_deref
+
+    def compile_load(self, depth: int, slot: int) -> Callable[[Environment], Any]:
+        """A function that reads (depth, slot), possibly returning UNDEFINED."""
+        if depth == 0:
+            return lambda env: env.values[slot]
+        if depth == self.depth:
+            global_values = self.global_values
+            return lambda env: global_values[slot]
+        return lambda env: env.get_at(depth, slot)
+
+    def compile_variable(self, node: VariableNode) -> Callable:
+        depth, slot, name = node.depth, node.slot, node.name
+        line, column = node.line, node.column
+
+        def undefined():
+            return TinyLangRuntimeError(f"Undefined variable '{name}'", line, column)
+
+        if depth == 0:
+            def load_fast(env):
+                value = env.values[slot]
+                if value is UNDEFINED:
+                    raise undefined()
+                return value
+            return load_fast
+        if depth == self.depth:
+            global_values = self.global_values
+
+            def load_global(env):
+                value = global_values[slot]
+                if value is UNDEFINED:
+                    raise undefined()
+                return value
+            return load_global
+
+        def load_deref(env):
+            value = env.get_at(depth, slot)
+            if value is UNDEFINED:
+                raise undefined()
+            return value
+        return load_deref
+
+    # -- expressions ---------------------------------------------------------
+
+    def compile_expression(self, node: ASTNode) -> Callable:
+        """Compile an expression to a closure returning its value."""
+        if isinstance(node, (NumberNode, StringNode, BooleanNode)):
+            value = node.value
+            return lambda env: value
+        if isinstance(node, NullNode):
+            return lambda env: None
+        if isinstance(node, VariableNode):
+            return self.compile_variable(node)
+        if isinstance(node, AssignmentNode):
+            value = self.compile_expression(node.value)
+            if node.depth == 0:
+                slot = node.slot
+
+                def assign_fast(env):
+                    result = env.values[slot] = value(env)
+                    return result
+                return assign_fast
+            store = self.compile_store(node.depth, node.slot)
+
+            def assign(env):
+                result = value(env)
+                store(env, result)
+                return result
+            return assign
+        if isinstance(node, BinaryOpNode):
+            return self.compile_binary_op(node)
+        if isinstance(node, UnaryOpNode):
+            return self.compile_unary_op(node)
+        if isinstance(node, FunctionCallNode):
+            return self.compile_call(node)
+        if isinstance(node, (ArrayNode, IndexNode, SliceNode, IndexAssignmentNode)):
+            return self.compile_array_op(node)
+        # Statements used as expressions (e.g. the value of an if)
+        function, _ = self.compile_statement(node)
+        return function
+
+    def compile_binary_op(self, node: BinaryOpNode) -> Callable:
+        left = self.compile_expression(node.left)
+        right = self.compile_expression(node.right)
+        operator_name = node.operator
+        if operator_name == 'and':
+            return lambda env: left(env) and right(env)
+        if operator_name == 'or':
+            return lambda env: left(env) or right(env)
+        if operator_name not in BINARY_OPERATORS:
+            raise TinyLangRuntimeError(f"Unknown operator '{operator_name}'",
+                                       node.line, node.column)
+        function = BINARY_FUNCTIONS[BINARY_OPERATORS.index(operator_name)]
+        line, column = node.line, node.column
+        # Adding a number to anything builds nothing much larger than it
+        adds_number = operator_name == '+' and isinstance(node.right, NumberNode)
+        if self.charge is not None and operator_name in ('+', '*', '**') and not adds_number:
+            return self.compile_charged_binary_op(operator_name, function, left, right,
+                                                  line, column)
+
+        def fallback(left_value, right_value, error):
+            # TypeError: try TinyLang semantics (string +); else (including
+            # ValueError from NumPy shape mismatches) report it.
+            if isinstance(error, TypeError):
+                try:
+                    return apply_binary_op(operator_name, left_value, right_value)
+                except (ArithmeticError, TypeError, ValueError) as e:
+                    error = e
+            raise TinyLangRuntimeError(str(error), line, column) from None
+
+        if isinstance(node.right, (NumberNode, StringNode, BooleanNode)):
+            constant = node.right.value
+
+            def binary_const(env):
+                left_value = left(env)
+                try:
+                    return function(left_value, constant)
+                except (ArithmeticError, TypeError, ValueError) as e:
+                    return fallback(left_value, constant, e)
+            return binary_const
+
+        def binary(env):
+            left_value = left(env)
+            right_value = right(env)
+            try:
+                return function(left_value, right_value)
+            except (ArithmeticError, TypeError, ValueError) as e:
+                return fallback(left_value, right_value, e)
+        return binary
+
+    def compile_charged_binary_op(self, operator_name: str, function: Callable,
+                                  left: Callable, right: Callable,
+                                  line: int, column: int) -> Callable:
+        """
+        `+`, `*` or `**` under a memory limit: charge the Budget for a value
+        that is not a plain number before building it (allocation_size).
+        """
+        charge = self.charge
+        small = SMALL_POWER_OPERANDS if operator_name == '**' else SMALL_OPERANDS
+
+        def binary_charged(env):
+            left_value = left(env)
+            right_value = right(env)
+            if type(left_value) not in small or type(right_value) not in small:
+                size = allocation_size(operator_name, left_value, right_value)
+                if size:
+                    charge(size, line, column)
+            try:
+                return function(left_value, right_value)
+            except (ArithmeticError, TypeError, ValueError) as e:
+                if isinstance(e, TypeError):
+                    try:
+                        return apply_binary_op(operator_name, left_value, right_value)
+                    except (ArithmeticError, TypeError, ValueError) as error:
+                        e = error
+                raise TinyLangRuntimeError(str(e), line, column) from None
+        return binary_charged
+
+    def compile_unary_op(self, node: UnaryOpNode) -> Callable:
+        operand = self.compile_expression(node.operand)
+        if node.operator == 'not':
+            return lambda env: not operand(env)
+        line, column = node.line, node.column
+        if node.operator == 'square':
+            def square_op(env):
+                value = operand(env)
+                if type(value) is int:
+                    return value * value
+                try:
+                    return value ** 2
+                except (ArithmeticError, TypeError, ValueError) as e:
+                    raise TinyLangRuntimeError(str(e), line, column) from None
+            return square_op
+
+        def negate(env):
+            try:
+                return -operand(env)
+            except TypeError as e:
+                raise TinyLangRuntimeError(str(e), line, column) from None
+        return negate
+
+    def compile_array_op(self, node: ASTNode) -> Callable:
+        """Compile an array literal, index, slice or element assignment."""
+        line, column = node.line, node.column
+        if isinstance(node, ArrayNode):
+            elements = [self.compile_expression(element) for element in node.elements]
+            charge, size = self.charge, array_bytes(len(elements))
+            if charge is not None:
+                def array_charged(env):
+                    charge(size, line, column)
+                    return [element(env) for element in elements]
+                return array_charged
+            return lambda env: [element(env) for element in elements]
+        target = self.compile_expression(node.target)
+        if isinstance(node, SliceNode):
+            start = None if node.start is None else self.compile_expression(node.start)
+            stop = None if node.stop is None else self.compile_expression(node.stop)
+
+            def slice_(env):
+                return get_slice(target(env), None if start is None else start(env),
+                                 None if stop is None else stop(env), line, column)
+            return slice_
+        index = self.compile_expression(node.index)
+        if isinstance(node, IndexAssignmentNode):
+            value = self.compile_expression(node.value)
+
+            def assign_index(env):
+                array, position, result = target(env), index(env), value(env)
+                set_index(array, position, result, line, column)
+                return result
+            return assign_index
+
+        def index_(env):
+            array, position = target(env), index(env)
+            if (type(array) is list and type(position) is int
+                    and -len(array) <= position < len(array)):
+                return array[position]
+            return get_index(array, position, line, column)
+        return index_
+
+    def compile_call(self, node: FunctionCallNode) -> Callable:
+        """
+        Compile a call, with argument building specialized for 0-2 arguments.
+        """
+        load = self.compile_load(node.depth, node.slot)
+        arguments = [self.compile_expression(arg) for arg in node.arguments]
+        argc = len(arguments)
+        name, line, column = node.name, node.line, node.column
+        budget = self.budget
+
+        if argc == 0:
+            build_args = lambda env: []
+        elif argc == 1:
+            first, = arguments
+            build_args = lambda env: [first(env)]
+        elif argc == 2:
+            first, second = arguments
+            build_args = lambda env: [first(env), second(env)]
+        else:
+            build_args = lambda env: [argument(env) for argument in arguments]
+
+        def call(env):
+            function = load(env)
+            if function is UNDEFINED:
+                raise TinyLangRuntimeError(f"Undefined variable '{name}'", line, column)
+            args = build_args(env)
+            if type(function) is ClosureFunction:
+                if budget is not None:
+                    budget.fuel -= 1
+                    if not budget.fuel:
+                        budget.refuel(line, column)
+                if argc != len(function.params):
+                    raise TinyLangRuntimeError(
+                        f"{function.name}() takes {len(function.params)} arguments "
+                        f"but {argc} were given", line, column)
+                memo = function.memo
+                if memo is not None:
+                    key = memo_key(args)
+                    value = memo.get(key)
+                    if value is not UNDEFINED:
+                        return value
+                if function.padding:
+                    args.extend(function.padding)
+                result = function.body(Environment(function.closure, args))
+                value = result.value if type(result) is Returned else None
+                if memo is not None:
+                    memo.put(key, value)
+                return value
+            if callable(function):
+                try:
+                    return function(*args)
+                except (ArithmeticError, TypeError, ValueError) as e:
+                    raise TinyLangRuntimeError(str(e), line, column) from None
+                except BudgetExceeded as e:  # a builtin's Budget.charge knows no position
+                    raise BudgetExceeded(e.message, line, column) from None
+            raise TinyLangRuntimeError(f"'{name}' is not a function", line, column)
+        return call
+
+
+# Python frames per TinyLang call are several in the closure backend; while
+# it runs, the recursion limit is raised to at least this.
+CLOSURE_RECURSION_LIMIT = 20000
+
+
+# =============================================================================
+# Part 9: REPL and File Execution
+# =============================================================================
+
+VERSION = "1.0"
+
+
+@dataclass
+class CachedProgram:
+    """
+    A parsed, resolved and compiled script as stored by ProgramCache.
+
+    Global variables are addressed by slot, so the cached code is only valid
+    for an interpreter whose globals were laid out as `names_before` when the
+    script was resolved, with `declared_before` assigned at top level (which
+    decides whether a function's assignment is local). `global_names` and
+    `declared_after` are the same afterwards. `optimized` records whether the
+    AST went through the Optimizer.
+    """
+    source_hash: str
+    optimized: bool
+    names_before: List[str]
+    declared_before: List[str]
+    global_names: List[str]
+    declared_after: List[str]
+    ast: ProgramNode
+    code: CodeObject
+
+
+class ProgramCache:
+    """
+    On-disk cache of compiled scripts, in the spirit of Python's .pyc files.
+
+    `dir/script.tl` is cached as `dir/__tlcache__/script.tl.<tag>.tlc`, where
+    the tag is the interpreter version plus a fingerprint of this module, so
+    editing the interpreter invalidates every cache file. Unoptimized programs
+    go to `script.tl.<tag>.noopt.tlc`, like CPython's `.opt-N.pyc` variants.
+    Each entry also records the SHA-256 of the source and whether it was
+    optimized; any mismatch means a cache miss.
+    Writes go to a temporary file that is renamed into place, so a crashed or
+    concurrent writer never leaves a truncated entry behind.
+    """
+
+    DIRECTORY = '__tlcache__'
+    _tag: Optional[str] = None
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: where to keep cache files; by default a __tlcache__
+                       directory next to each script
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def tag(cls) -> str:
+        """Interpreter version plus a hash of this module's own source."""
+        if cls._tag is None:
+            with open(__file__, 'rb') as f:
+                fingerprint = hashlib.sha256(f.read()).hexdigest()[:12]
+            cls._tag = f"{VERSION}-{fingerprint}"
+        return cls._tag
+
+    @staticmethod
+    def source_hash(source: str) -> str:
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def path_for(self, filename: str, optimized: bool = True) -> str:
+        """Cache file path for a script, optimized or not."""
+        directory = self.directory or os.path.join(
+            os.path.dirname(os.path.abspath(filename)), self.DIRECTORY)
+        variant = '' if optimized else '.noopt'
+        return os.path.join(directory,
+                            f"{os.path.basename(filename)}.{self.tag()}{variant}.tlc")
+
+    def load(self, filename: str, source_hash: str,
+             optimized: bool = True) -> Optional[CachedProgram]:
+        """Return the cached program, or None if missing, stale or unreadable."""
+        try:
+            with open(self.path_for(filename, optimized), 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            cached = None
+        if (not isinstance(cached, CachedProgram) or cached.source_hash != source_hash
+                or cached.optimized != optimized):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached
+
+    def store(self, filename: str, cached: CachedProgram):
+        """Atomically write a cache entry; failures only cost a future miss."""
+        path = self.path_for(filename, cached.optimized)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+
 class TinyLang:
     """Main interpreter interface."""
 
-    def __init__(self):
-        self.evaluator = Evaluator()
+    BACKENDS = ('vm', 'tree', 'closure')
+    LEXERS = {'regex': RegexLexer, 'char': Lexer}
 
-    def run(self, source: str) -> Any:
+    def __init__(self, backend: str = 'vm', lexer: str = 'regex',
+                 cache: Optional[ProgramCache] = None, optimize: bool = True,
+                 dump_node_counts: bool = False, numeric: bool = False,
+                 max_steps: Optional[int] = None, max_memory: Optional[int] = None,
+                 asynchronous: bool = False):
+        """
+        Args:
+            backend: 'vm' compiles to bytecode (fast); 'tree' walks the AST
+                     with the Evaluator (simple reference implementation);
+                     'closure' compiles the AST to nested Python closures
+            lexer: 'regex' tokenizes with one master regex (fast); 'char'
+                   uses the character-at-a-time Lexer
+            cache: ProgramCache used by run_file; defaults to a cache in
+                   __tlcache__ next to each script
+            optimize: run the Optimizer (constant folding, dead branches)
+            dump_node_counts: print AST node counts before/after optimizing
+            numeric: add the NumPy-backed builtins array, sum, dot, map_add
+                     and a range that returns a numeric array (needs NumPy)
+            max_steps: stop each run after this many loop iterations plus
+                       calls, raising BudgetExceeded
+            max_memory: stop each run once resident memory has grown by
+                        this many bytes, raising BudgetExceeded
+            asynchronous: evaluate with an AsyncEvaluator, whose builtins
+                          (such as sleep) may be coroutines; use run_async to
+                          run on the caller's event loop ('tree' backend only)
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; choose from {self.BACKENDS}")
+        if asynchronous and backend != 'tree':
+            raise ValueError("asynchronous=True needs the 'tree' backend")
+        if lexer not in self.LEXERS:
+            raise ValueError(f"Unknown lexer {lexer!r}; choose from {tuple(self.LEXERS)}")
+        self.backend = backend
+        self.lexer_class = self.LEXERS[lexer]
+        self.cache = cache if cache is not None else ProgramCache()
+        self.optimize = optimize
+        self.dump_node_counts = dump_node_counts
+        self.budget = Budget(max_steps, max_memory)
+        self.asynchronous = asynchronous
+        evaluator_class = AsyncEvaluator if asynchronous else Evaluator
+        self.evaluator = evaluator_class(budget=self.budget)
+        if numeric:
+            self.evaluator.setup_numeric_builtins()
+        self.vm = VirtualMachine(self.evaluator.global_env, self.budget)
+        self.profile: Optional[Profile] = None  # set by run(..., profile=True)
+
+    def run(self, source: str, filename: Optional[str] = None, profile: bool = False,
+            profile_output: Optional[str] = None, raise_errors: bool = False) -> Any:
         """
         Execute source code.
 
-        Challenge: Handle errors gracefully with good messages
+        If filename is given, the compiled program is read from and written
+        to the ProgramCache. Errors are reported with their line and column
+        and yield None, or propagate if raise_errors is set.
+
+        With profile=True the program runs on a ProfilingEvaluator (whatever
+        the backend), a hot-spot report is printed, and the Profile is kept
+        in self.profile; profile_output names a file for collapsed stacks.
         """
         try:
-            # Tokenize
-            lexer = Lexer(source)
-            tokens = lexer.tokenize()
-
-            # Parse
-            parser = Parser(tokens)
-            ast = parser.parse()
+            ast, code = self.load(source, filename)
 
             # Evaluate
-            result = self.evaluator.evaluate(ast, self.evaluator.global_env)
-            return result
+            if profile:
+                return self.run_profiled(ast, source, profile_output)
+            if self.backend == 'closure':
+                code = self.compile(ast)
+            return self.execute(ast, code)
 
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error: {e}")
             return None
 
+    async def run_async(self, source: str, filename: Optional[str] = None,
+                        raise_errors: bool = False) -> Any:
+        """
+        Execute source as a coroutine on the running event loop.
+
+        Like run (without profiling), but a script awaiting an async builtin
+        lets other coroutines, such as other scripts, run meanwhile.
+        Needs asynchronous=True.
+        """
+        if not self.asynchronous:
+            raise ValueError("run_async needs TinyLang(..., asynchronous=True)")
+        try:
+            ast, _ = self.load(source, filename)
+            return await self.evaluator.evaluate_async(ast, self.evaluator.global_env)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error: {e}")
+            return None
+
+    def compile(self, ast: ProgramNode) -> Any:
+        """The backend's executable form of a resolved AST (None for 'tree')."""
+        if self.backend == 'vm':
+            return Compiler().compile(ast)
+        if self.backend == 'closure':
+            budget = self.budget if self.budget.limited else None
+            return ClosureCompiler(self.evaluator.global_env, budget).compile(ast)
+        return None
+
+    def execute(self, ast: ProgramNode, code: Any) -> Any:
+        """Run a resolved AST, or the form compile() made of it."""
+        if self.backend == 'tree':
+            if self.asynchronous:
+                return asyncio.run(self.evaluator.evaluate_async(ast, self.evaluator.global_env))
+            return self.evaluator.evaluate(ast, self.evaluator.global_env)
+        if self.backend == 'closure':
+            return self.run_closures(code)
+        return self.vm.run(code)
+
+    def run_closures(self, program: Callable[[Environment], Any]) -> Any:
+        """Run a program compiled by the ClosureCompiler."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, CLOSURE_RECURSION_LIMIT))
+        try:
+            return program(self.evaluator.global_env)
+        except RecursionError:
+            raise TinyLangRuntimeError(
+                "Maximum recursion depth exceeded (the vm backend has no limit)") from None
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def memo_stats(self, name: str) -> Optional[Dict[str, int]]:
+        """
+        Cache statistics (hits, misses, evictions, uncacheable, size,
+        maxsize) of the @memo function in global `name`, or None if that is
+        not a memoized function.
+        """
+        global_env = self.evaluator.global_env
+        slot = global_env.slots.get(name)  # Never reserve a slot just for asking
+        if slot is None:
+            return None
+        memo = getattr(global_env.values[slot], 'memo', None)
+        return memo.stats() if isinstance(memo, MemoCache) else None
+
+    def run_profiled(self, ast: ProgramNode, source: str, profile_output: Optional[str]) -> Any:
+        """Evaluate ast under the profiler, then report."""
+        self.profile = Profile(source)
+        try:
+            return ProfilingEvaluator(self.evaluator.global_env, self.profile,
+                                      self.budget).profile_program(ast)
+        finally:
+            print(self.profile.report())
+            if profile_output is not None:
+                self.profile.write_collapsed(profile_output)
+
+    def load(self, source: str, filename: Optional[str] = None
+             ) -> Tuple[ProgramNode, Optional[CodeObject]]:
+        """
+        Turn source into a resolved AST and (for the VM) bytecode.
+
+        A cached program is reused as-is when this interpreter's globals are
+        laid out as they were when it was compiled (always true for a fresh
+        interpreter); otherwise its AST is re-resolved and recompiled, which
+        still skips lexing and parsing. With dump_node_counts the cache is
+        never read, so the optimizer always runs and reports.
+        """
+        global_env = self.evaluator.global_env
+        source_hash = names_before = declared_before = None
+        if filename is not None:
+            source_hash = ProgramCache.source_hash(source)
+            names_before = list(global_env.names)
+            declared_before = sorted(global_env.declared)
+            cached = None
+            if not self.dump_node_counts:
+                cached = self.cache.load(filename, source_hash, self.optimize)
+            if cached is not None:
+                if (cached.names_before == names_before
+                        and cached.declared_before == declared_before):
+                    for name in cached.global_names[len(names_before):]:
+                        global_env.slot(name)
+                    global_env.declared.update(cached.declared_after)
+                    return cached.ast, cached.code
+                Resolver(global_env).resolve(cached.ast)
+                return cached.ast, Compiler().compile(cached.ast)
+
+        # Tokenize lazily: the parser pulls tokens as it needs them
+        ast = self.parse(self.lexer_class(source).stream())
+
+        # Compile (the tree backend only needs it when caching)
+        code = None
+        if self.backend == 'vm' or filename is not None:
+            code = Compiler().compile(ast)
+        if filename is not None:
+            self.cache.store(filename, CachedProgram(
+                source_hash, self.optimize, names_before, declared_before, list(global_env.names),
+                sorted(global_env.declared), ast, code))
+        return ast, code
+
+    def parse(self, tokens: Iterable[Token]) -> ProgramNode:
+        """Parse, optimize and resolve a token stream."""
+        ast = Parser(tokens).parse()
+
+        # Optimize
+        if self.optimize:
+            optimizer = Optimizer()
+            before = Optimizer.count_nodes(ast) if self.dump_node_counts else 0
+            optimizer.optimize(ast)
+            if self.dump_node_counts:
+                print(f"optimizer: {before} -> {Optimizer.count_nodes(ast)} AST nodes "
+                      f"({optimizer.folded} folded, {optimizer.reduced} strength-reduced, "
+                      f"{optimizer.pruned} branches pruned)")
+
+        # Resolve variables to frame slots
+        Resolver(self.evaluator.global_env).resolve(ast)
+        return ast
+
     def repl(self):
         """
         Read-Eval-Print Loop for interactive use.
 
-        Challenge: Handle multi-line input, show results nicely
+        Blocks may span several lines: input continues with a `...` prompt
+        until its brackets balance. See ReplSession.
         """
-        print("TinyLang REPL v1.0")
+        print(f"TinyLang REPL v{VERSION}")
         print("Type 'exit()' to quit")
         print()
 
+        session = ReplSession(self)
         while True:
             try:
-                source = input(">>> ")
-                if source.strip() == "exit()":
+                source = input("... " if session.pending else ">>> ")
+                if source.strip() == "exit()" and not session.pending:
                     break
 
-                result = self.run(source)
+                result = session.feed(source)
                 if result is not None:
-                    print(result)
+                    print(to_string(result))
 
             except KeyboardInterrupt:
+                session.reset()
                 print("\nKeyboardInterrupt")
             except EOFError:
                 break
 
     def run_file(self, filename: str):
-        """Execute a file."""
+        """Execute a file, using the compiled-program cache."""
         with open(filename, 'r') as f:
             source = f.read()
-        return self.run(source)
+        return self.run(source, filename)
+
+
+@dataclass
+class ReplChunk:
+    """A complete REPL input, parsed, resolved and compiled."""
+    ast: ProgramNode
+    code: Any  # TinyLang.compile(ast)
+    # Non-parameter locals of the chunk's functions. Each was resolved as a
+    # local because no global had that name; if one appears, re-resolve.
+    function_locals: List[str]
+
+
+class ReplSession:
+    """
+    Incremental state for an interactive session, fed one line at a time.
+
+    Each line is tokenized once, when it arrives. Lines are buffered until
+    their brackets balance, and the buffered tokens go straight to the
+    Parser, so earlier input is never re-tokenized. Complete chunks are
+    cached by source text: entering a chunk again (typically redefining an
+    unchanged function) reuses its AST and compiled function bodies instead
+    of parsing and compiling it again.
+    """
+
+    OPENERS = {TokenType.LPAREN, TokenType.LBRACE, TokenType.LBRACKET}
+    CLOSERS = {TokenType.RPAREN, TokenType.RBRACE, TokenType.RBRACKET}
+
+    def __init__(self, interpreter: Optional['TinyLang'] = None, max_chunks: int = 1024):
+        """
+        Args:
+            interpreter: TinyLang whose globals and backend the session uses
+            max_chunks: most complete chunks to keep (oldest evicted first)
+        """
+        self.interpreter = interpreter if interpreter is not None else TinyLang()
+        self.max_chunks = max_chunks
+        self.chunks: Dict[str, ReplChunk] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        """Discard any partially entered chunk."""
+        self.lines: List[str] = []
+        self.tokens: List[Token] = []
+        self.depth = 0  # brackets opened and not yet closed
+
+    @property
+    def pending(self) -> bool:
+        """True while a multi-line chunk is waiting for more lines."""
+        return bool(self.lines)
+
+    def feed(self, line: str) -> Any:
+        """
+        Add one line of input. Returns the chunk's value once it is complete
+        (None while more lines are needed, or after reporting an error).
+        """
+        if not self.lines and not line.strip():
+            return None
+        try:
+            self.add_line(line)
+            if self.depth > 0:
+                return None
+            return self.run_chunk()
+        except Exception as e:
+            self.reset()
+            print(f"Error: {e}")
+            return None
+
+    def add_line(self, line: str):
+        """Tokenize line and append it to the pending chunk."""
+        offset = len(self.lines)  # tokens are numbered from the chunk's first line
+        depth = self.depth
+        tokens = self.tokens
+        for token in self.interpreter.lexer_class(line).stream():
+            token_type = token.type
+            if token_type is TokenType.EOF:
+                break
+            if token_type in self.OPENERS:
+                depth += 1
+            elif token_type in self.CLOSERS:
+                depth -= 1
+            tokens.append(token._replace(line=token.line + offset) if offset else token)
+        self.lines.extend(line.split('\n'))
+        tokens.append(Token(TokenType.NEWLINE, '\n', len(self.lines), len(self.lines[-1]) + 1))
+        self.depth = depth
+
+    def run_chunk(self) -> Any:
+        """Parse (or reuse) and run the pending chunk."""
+        source = '\n'.join(self.lines)
+        tokens = self.tokens
+        tokens.append(Token(TokenType.EOF, None, len(self.lines) + 1, 1))
+        self.reset()
+
+        interpreter = self.interpreter
+        global_env = interpreter.evaluator.global_env
+        chunk = self.chunks.get(source)
+        if chunk is None:
+            self.misses += 1
+            chunk = self.compile_chunk(interpreter.parse(tokens))
+            if len(self.chunks) >= self.max_chunks:
+                del self.chunks[next(iter(self.chunks))]
+            self.chunks[source] = chunk
+        else:
+            self.hits += 1
+            if any(name in global_env.declared for name in chunk.function_locals):
+                Resolver(global_env).resolve(chunk.ast)
+                chunk = self.chunks[source] = self.compile_chunk(chunk.ast)
+        return interpreter.execute(chunk.ast, chunk.code)
+
+    def compile_chunk(self, ast: ProgramNode) -> ReplChunk:
+        return ReplChunk(ast, self.interpreter.compile(ast), self.function_locals(ast))
+
+    @staticmethod
+    def function_locals(node: Any) -> List[str]:
+        """Non-parameter locals of every function defined in a tree."""
+        if isinstance(node, list):
+            return [name for item in node for name in ReplSession.function_locals(item)]
+        if not isinstance(node, ASTNode):
+            return []
+        names = []
+        if isinstance(node, FunctionDefNode):
+            names.extend(node.local_names[len(node.params):])
+        for f in fields(node):
+            if f.compare:
+                names.extend(ReplSession.function_locals(getattr(node, f.name)))
+        return names
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one script in a run_batch job."""
+    path: str
+    value: Optional[str] = None  # the script's value, formatted; None on error
+    output: str = ""             # everything the script printed
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TimeLimitExceeded(TinyLangRuntimeError):
+    """A batch script ran past its per-script time limit."""
+
+
+# Per-process state of a run_batch worker: one warm interpreter, and its
+# global frame as it was with only the builtins defined.
+_batch_interpreter: Optional['TinyLang'] = None
+_batch_builtins: List[Any] = []
+
+
+def _batch_init(backend: str, numeric: bool, max_steps: Optional[int],
+                max_memory: Optional[int]):
+    global _batch_interpreter, _batch_builtins
+    _batch_interpreter = TinyLang(backend, numeric=numeric, max_steps=max_steps,
+                                  max_memory=max_memory)
+    _batch_builtins = list(_batch_interpreter.evaluator.global_env.values)
+
+
+def _raise_time_limit(signum, frame):
+    raise TimeLimitExceeded("Time limit exceeded")
+
+
+def _batch_run(path: str, time_limit: Optional[float]) -> BatchResult:
+    """Run one script in a worker, starting from fresh globals."""
+    interpreter = _batch_interpreter
+    interpreter.evaluator.global_env.restore(_batch_builtins)
+    interpreter.evaluator.returning = False
+    result = BatchResult(path)
+    output = io.StringIO()
+    timed = time_limit is not None and hasattr(signal, 'setitimer')
+    if timed:
+        previous = signal.signal(signal.SIGALRM, _raise_time_limit)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    start = time.perf_counter()
+    try:
+        try:
+            with redirect_stdout(output):
+                with open(path) as f:
+                    source = f.read()
+                result.value = to_string(interpreter.run(source, path, raise_errors=True))
+        finally:
+            # Disarm first: an alarm that fires before this line is still
+            # caught below as this script's error
+            if timed:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except TimeLimitExceeded:
+        result.error = f"Time limit of {time_limit:g}s exceeded"
+    except TinyLangError as e:
+        result.error = str(e)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        if timed:
+            try:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous)
+            except TimeLimitExceeded:
+                # A late alarm must not escape and lose the whole batch
+                signal.signal(signal.SIGALRM, previous)
+                result.value, result.error = None, f"Time limit of {time_limit:g}s exceeded"
+    result.seconds = time.perf_counter() - start
+    result.output = output.getvalue()
+    return result
+
+
+def run_batch(paths: List[str], backend: str = 'vm', workers: Optional[int] = None,
+              time_limit: Optional[float] = None, numeric: bool = False,
+              max_steps: Optional[int] = None,
+              max_memory: Optional[int] = None) -> List[BatchResult]:
+    """
+    Run many independent scripts across a pool of worker processes.
+
+    Each worker keeps one warm TinyLang (with its compiled-program cache)
+    and resets the globals to just the builtins before every script, so
+    scripts cannot see each other's variables. Results come back in the
+    order of paths, with each script's value, printed output or error.
+    time_limit is in seconds per script, enforced with SIGALRM on platforms
+    that have it; max_steps and max_memory set each script's Budget, which
+    works everywhere and stops a runaway loop deterministically.
+    """
+    if not paths:
+        return []
+    workers = workers or os.cpu_count() or 1
+    # Several scripts per task amortize the inter-process round trip; many
+    # tasks per worker keep the load balanced when scripts differ in cost.
+    chunksize = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(workers, initializer=_batch_init,
+                             initargs=(backend, numeric, max_steps, max_memory)) as pool:
+        return list(pool.map(_batch_run, paths, [time_limit] * len(paths),
+                             chunksize=chunksize))
+
+
+async def run_concurrently(sources: List[str], max_steps: Optional[int] = None,
+                           max_memory: Optional[int] = None) -> List[Any]:
+    """
+    Run many scripts as coroutines on the running event loop.
+
+    Each script gets its own asynchronous TinyLang, so scripts share no
+    globals; while one awaits an async builtin such as sleep, the others
+    run. Returns each script's value, or the TinyLangError it raised, in
+    the order of sources.
+
+    max_memory is rejected with a ValueError: a Budget measures the resident
+    memory of the whole process, so every script would be charged for the
+    allocations of all the others. Use run_batch for per-script memory limits.
+    """
+    if max_memory is not None:
+        raise ValueError("run_concurrently cannot enforce max_memory per script; "
+                         "use run_batch, which runs each script in its own process")
+
+    async def run_one(source: str) -> Any:
+        interpreter = TinyLang('tree', max_steps=max_steps, asynchronous=True)
+        try:
+            return await interpreter.run_async(source, raise_errors=True)
+        except TinyLangError as e:
+            return e
+
+    return await asyncio.gather(*(run_one(source) for source in sources))
 
 
 # =============================================================================
@@ -673,6 +4935,20 @@ def test_lexer():
     for token in tokens:
         print(f"  {token}")
 
+    regex_tokens = RegexLexer(code).tokenize()
+    status = "✓" if regex_tokens == tokens else "✗"
+    print(f"  {status} RegexLexer matches Lexer ({len(regex_tokens)} tokens)")
+
+    # Only ASCII digits are numbers; both lexers reject other Unicode digits
+    errors = []
+    for lexer_class in (Lexer, RegexLexer):
+        try:
+            errors.append(lexer_class("x = \u0661\u0662").tokenize())
+        except LexerError as e:
+            errors.append(e.message)
+    status = "✓" if errors[0] == errors[1] and isinstance(errors[0], str) else "✗"
+    print(f"  {status} non-ASCII digits: {errors[1]}")
+
 
 def test_parser():
     """Test the parser."""
@@ -687,6 +4963,97 @@ def test_parser():
     print("AST:")
     print(ast)
 
+    streamed = Parser(RegexLexer(code).stream()).parse()
+    status = "✓" if streamed == ast else "✗"
+    print(f"  {status} parsing from a token stream matches parsing from a list")
+
+    unslotted = sorted(name for name, cls in globals().items()
+                       if isinstance(cls, type) and issubclass(cls, ASTNode)
+                       and '__dict__' in dir(cls))
+    status = "✓" if not unslotted else "✗"
+    print(f"  {status} AST nodes are slotted (no per-node __dict__){unslotted or ''}")
+
+    # The Pratt loop must build the same trees as the method-per-level parser
+    operators = ['or', 'and', '==', '!=', '<', '>', '<=', '>=', '+', '-', '*', '/', '%', '**']
+    cases = [
+        "-x ** 2", "2 ** -x ** 2", "-x * 2", "not a == b", "a ** b * c ** d",
+        "a - b - c", "a < b < c", "- - x[1][2:]", "f(a + b, [c or d])[0] ** 2",
+        "(a or b) and not (c > d) or e", "x = -a % b", "a[i] = b ** c",
+    ]
+    for first in operators:
+        for second in operators:
+            cases.append(f"a {first} -b {second} c")
+            cases.append(f"not a[0] {first} (b {second} c) {second} d")
+    mismatches = [case for case in cases
+                  if Parser(RegexLexer(case).tokenize()).parse()
+                  != PrecedenceClimbingParser(RegexLexer(case).tokenize()).parse()]
+    status = "✓" if not mismatches else "✗"
+    print(f"  {status} Pratt parser matches precedence climbing on {len(cases)} expressions"
+          + (f": {mismatches[:3]}" if mismatches else ""))
+
+
+def test_optimizer():
+    """Test constant folding, strength reduction and dead-branch pruning."""
+    cases = [
+        ("2 + 3 * 4", NumberNode(14)),
+        ("not (1 < 2) or \"x\"", StringNode("x")),
+        ("x ** 2", UnaryOpNode('square', VariableNode("x"))),
+        ("1 / 0", BinaryOpNode(NumberNode(1), '/', NumberNode(0))),
+        ("if 1 > 2 { a } else { b }", VariableNode("b")),
+    ]
+    for code, expected in cases:
+        program = Optimizer().optimize(Parser(RegexLexer(code).stream()).parse())
+        status = "✓" if program.statements == [expected] else "✗"
+        print(f"  {status} {code}")
+
+    code = """
+    total = 0
+    i = 0
+    while i < 100 {
+        if 10 > 20 { total = -1 } else { total = total + 60 * 60 * 24 }
+        while false { total = 0 }
+        i = i + 1
+    }
+    total
+    """
+    results = [TinyLang(optimize=optimize).run(code) for optimize in (False, True)]
+    status = "✓" if results == [8640000, 8640000] else "✗"
+    print(f"  {status} optimized and unoptimized programs agree: {results}")
+
+    # Names assigned only in a pruned branch still decide what is global
+    for source in ("if false { y = 1 }\nfunc f() { y = 2 }\nf()\ny\n",
+                   "while false { y = 1 }\nfunc f() { y = 2 }\nf()\ny\n",
+                   "if true { } else { y = 1 }\nfunc f() { y = 2 }\nf()\ny\n",
+                   "func f() {\n    if false { for y in [] { } }\n"
+                   "    func g() { y = 3 }\n    g()\n    return y\n}\nf()\n"):
+        for backend in TinyLang.BACKENDS:
+            results = []
+            for optimize in (False, True):
+                try:
+                    results.append(TinyLang(backend, optimize=optimize).run(
+                        source, raise_errors=True))
+                except TinyLangError as e:
+                    results.append(str(e))
+            status = "✓" if results[0] == results[1] else "✗"
+            print(f"  {status} {backend} pruned declaration {source.splitlines()[0]!r}: "
+                  f"{results[1]}")
+
+    # Strength reduction must not change results or errors
+    for source in ("x = 7\nx ** 2\n", "x = 1.5\nx ** 2\n", "x = true\nx ** 2\n",
+                   "x = 1.0 * 10 ** 200\nx ** 2\n", "x = 'a'\nx ** 2\n",
+                   "x = [1]\nx ** 2\n"):
+        for backend in TinyLang.BACKENDS:
+            results = []
+            for optimize in (False, True):
+                try:
+                    results.append(TinyLang(backend, optimize=optimize).run(
+                        source, raise_errors=True))
+                except TinyLangError as e:
+                    results.append(str(e))
+            status = "✓" if results[0] == results[1] else "✗"
+            print(f"  {status} {backend} x ** 2 after {source.splitlines()[0]!r}: "
+                  f"{results[1]}")
+
 
 def test_evaluator():
     """Test the evaluator."""
@@ -703,13 +5070,14 @@ def test_evaluator():
         ("not true", False),
     ]
 
-    interpreter = TinyLang()
+    for backend in TinyLang.BACKENDS:
+        interpreter = TinyLang(backend)
 
-    print("Testing expressions:")
-    for code, expected in test_cases:
-        result = interpreter.run(code)
-        status = "✓" if result == expected else "✗"
-        print(f"  {status} {code} => {result} (expected {expected})")
+        print(f"Testing expressions ({backend}):")
+        for code, expected in test_cases:
+            result = interpreter.run(code)
+            status = "✓" if result == expected else "✗"
+            print(f"  {status} {code} => {result} (expected {expected})")
 
 
 def test_variables():
@@ -742,6 +5110,28 @@ def test_functions():
     result = interpreter.run(code)
     print(f"Function test: {result} (expected 8)")
 
+    # Every backend reports an undefined callee before running its
+    # arguments, and an undefined operand at the operand itself
+    cases = [
+        ('nope(print("argument ran"))\n',
+         "Undefined variable 'nope' (line 1, column 1)", ""),
+        ('func g() { return h(print("argument ran")) }\ng()\n',
+         "Undefined variable 'h' (line 1, column 19)", ""),
+        ('y + 1\n', "Undefined variable 'y' (line 1, column 1)", ""),
+        ('func f(a) { return c < a }\nf(1)\n',
+         "Undefined variable 'c' (line 1, column 20)", ""),
+    ]
+    for backend in TinyLang.BACKENDS:
+        for source, expected, expected_output in cases:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                try:
+                    result = TinyLang(backend).run(source, raise_errors=True)
+                except TinyLangError as e:
+                    result = str(e)
+            ok = result == expected and output.getvalue() == expected_output
+            print(f"  {'✓' if ok else '✗'} {backend} {source.splitlines()[-1]!r}: {result}")
+
 
 def test_recursion():
     """Test recursive functions."""
@@ -763,19 +5153,1113 @@ def test_recursion():
     print(f"Recursion test: {result} (expected 120)")
 
 
+def test_deep_recursion():
+    """Test deep recursion and tail calls stay within constant Python stack."""
+    code = """
+    func sum_to(n) {
+        if n == 0 { return 0 }
+        return n + sum_to(n - 1)
+    }
+    func count_down(n, total) {
+        if n == 0 { return total }
+        return count_down(n - 1, total + n)
+    }
+    sum_to(50000) + count_down(200000, 0)
+    """
+
+    expected = 50000 * 50001 // 2 + 200000 * 200001 // 2
+    for backend in ('vm', 'tree'):  # the closure backend nests Python calls
+        result = TinyLang(backend).run(code)
+        status = "✓" if result == expected else "✗"
+        print(f"  {status} deep recursion ({backend}): {result}")
+
+    # The closure backend nests Python calls, up to CLOSURE_RECURSION_LIMIT
+    result = TinyLang('closure').run(code.replace('50000', '2000').replace('200000', '2000'))
+    status = "✓" if result == 2 * (2000 * 2001 // 2) else "✗"
+    print(f"  {status} recursion (closure): {result}")
+
+
+def test_inline_caches():
+    """Test that call-site caches follow rebinding of the called name."""
+    code = """
+    func one(x) { return 1 }
+    func two(x) { return 2 }
+    total = 0
+    for i in range(6) {
+        total = total + one("abc")
+        if i == 1 { one = two }
+        if i == 3 { one = len }
+    }
+    total
+    """
+
+    for backend in TinyLang.BACKENDS:
+        result = TinyLang(backend).run(code)
+        status = "✓" if result == 12 else "✗"
+        print(f"  {status} rebinding a called name ({backend}): {result} (expected 12)")
+
+
+def test_closures():
+    """Test closures capture and update their defining environment."""
+    code = """
+    func makeCounter() {
+        count = 0
+        func increment() {
+            count = count + 1
+            return count
+        }
+        return increment
+    }
+
+    counter = makeCounter()
+    counter()
+    counter()
+    """
+
+    for backend in TinyLang.BACKENDS:
+        result = TinyLang(backend).run(code)
+        print(f"Closure test ({backend}): {result} (expected 2)")
+
+    # Only names assigned outside a function are shared with it; a name that
+    # is merely read elsewhere, or a builtin, stays local when assigned
+    cases = [
+        ("read-only global", 'func g() { return x }\nfunc f() { x = 5\n return x }\n'
+         'f()\nx = 1\nx\n', 1),
+        ("loop counter", 'i = 100\nfunc f() { for i in range(3) { }\n return i }\n'
+         'f()\ni\n', 100),
+        ("builtin name", 'func f() { len = 3\n return len }\nf()\nlen([1, 2])\n', 2),
+        ("assigned global", 'n = 0\nfunc bump() { n = n + 1 }\nbump()\nbump()\nn\n', 2),
+    ]
+    for backend in TinyLang.BACKENDS:
+        for description, source, expected in cases:
+            try:
+                result = TinyLang(backend).run(source, raise_errors=True)
+            except TinyLangError as e:
+                result = e.message
+            print(f"  {'✓' if result == expected else '✗'} {backend} {description}: {result}")
+
+
+def test_profiler():
+    """Test per-function counts and the collapsed-stack output of the profiler."""
+    code = """
+    func fib(n) {
+        if n < 2 { return n }
+        return fib(n - 1) + fib(n - 2)
+    }
+    fib(10)
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fib.collapsed')
+        interpreter = TinyLang()
+        result = interpreter.run(code, profile=True, profile_output=path)
+        with open(path) as f:
+            stacks = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+
+    calls = interpreter.profile.calls['fib']
+    status = "✓" if (result, calls) == (55, 177) else "✗"
+    print(f"  {status} profiled fib(10) = {result} with {calls} calls (expected 177)")
+    well_formed = all(stack.startswith('<program>') and count.isdigit() for stack, count in stacks)
+    status = "✓" if stacks and well_formed else "✗"
+    print(f"  {status} {len(stacks)} collapsed stacks, deepest "
+          f"{max(stack.count(';') for stack, _ in stacks)} calls")
+
+
+def test_program_cache():
+    """Test that run_file reuses, and invalidates, cached compiled programs."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'square.tl')
+        with open(path, 'w') as f:
+            f.write("func square(x) {\n    return x * x\n}\nsquare(7)\n")
+
+        results = []
+        for backend in ('vm', 'vm', 'tree'):
+            cache = ProgramCache()
+            results.append((TinyLang(backend, cache=cache).run_file(path), cache.hits))
+        status = "✓" if results == [(49, 0), (49, 1), (49, 1)] else "✗"
+        print(f"  {status} cache miss then hits: {results}")
+
+        with open(path, 'w') as f:
+            f.write("func square(x) {\n    return x * x\n}\nsquare(8)\n")
+        cache = ProgramCache()
+        result = TinyLang(cache=cache).run_file(path)
+        status = "✓" if (result, cache.hits, cache.misses) == (64, 0, 1) else "✗"
+        print(f"  {status} edited source invalidates the cache: {result}")
+
+        # An unoptimized interpreter never sees the folded AST an optimizing run stored
+        path = os.path.join(directory, 'fold.tl')
+        source = "x = 2 + 3\nif false { x = 0 }\nx\n"
+        with open(path, 'w') as f:
+            f.write(source)
+        TinyLang(cache=ProgramCache()).run_file(path)
+        cache = ProgramCache()
+        ast, _ = TinyLang(optimize=False, cache=cache).load(source, path)
+        kept = [type(statement).__name__ for statement in ast.statements]
+        ok = cache.hits == 0 and isinstance(ast.statements[0].value, BinaryOpNode) \
+            and 'IfNode' in kept
+        print(f"  {'✓' if ok else '✗'} optimize=False misses the optimized entry: {kept}")
+        cache = ProgramCache()
+        TinyLang(optimize=False, cache=cache).run_file(path)
+        print(f"  {'✓' if cache.hits == 1 else '✗'} unoptimized entry is cached separately")
+
+
+def test_arrays():
+    """Test array literals, indexing, slicing, element assignment and builtins."""
+    test_cases = [
+        ("a = [1, 2, 3]\na[0] + a[-1]", 4),
+        ("a = [1, 2, 3, 4]\na[1:3]", [2, 3]),
+        ("'hello'[1:]", "ello"),
+        ("a = [[1, 2], [3, 4]]\na[1][0] = 9\na", [[1, 2], [9, 4]]),
+        ("a = []\nfor i in range(4) { push(a, i * i) }\na", [0, 1, 4, 9]),
+        ("a = [1, 2, 3]\npop(a) + len(a)", 5),
+        ("parts = []\nfor i in range(3) { push(parts, i) }\njoin(parts, '-')", "0-1-2"),
+        ("str([1, 'a', [true]])", '[1, "a", [true]]'),
+        ("func first(xs) { return xs[0] }\nfirst([first([7])])", 7),
+    ]
+    for backend in TinyLang.BACKENDS:
+        interpreter = TinyLang(backend)
+        print(f"Testing arrays ({backend}):")
+        for code, expected in test_cases:
+            result = interpreter.run(code)
+            status = "✓" if result == expected else "✗"
+            print(f"  {status} {code.splitlines()[-1]!r} = {result!r} (expected {expected!r})")
+
+
+def test_numeric():
+    """Test the NumPy-backed builtins and element-wise array arithmetic."""
+    if np is None:
+        print("  - numeric builtins skipped: NumPy is not installed")
+        return
+    test_cases = [
+        ("xs = range(4)\nstr(xs * 2 + 1)", "[1, 3, 5, 7]"),
+        ("str(array([1, 2, 3]) + array([10, 20, 30]))", "[11, 22, 33]"),
+        ("dot(array([1, 2, 3]), array([4, 5, 6]))", 32),
+        ("sum(range(1001))", 500500),
+        ("str(map_add(range(3), 10))", "[10, 11, 12]"),
+        ("xs = range(5)\nys = xs[1:3]\nys[0] = 9\nsum(xs)", 10),
+    ]
+    for backend in TinyLang.BACKENDS:
+        interpreter = TinyLang(backend, numeric=True)
+        print(f"Testing numeric arrays ({backend}):")
+        for code, expected in test_cases:
+            result = interpreter.run(code)
+            status = "✓" if result == expected else "✗"
+            print(f"  {status} {code.splitlines()[-1]!r} = {result!r} (expected {expected!r})")
+
+
+def test_batch():
+    """Test run_batch: values, output, errors, isolation and time limits."""
+    scripts = {
+        'greet.tl': 'print("hi")\n1 + 2\n',
+        'define.tl': 'x = 5\nlen = 0\nx\n',
+        'isolated.tl': 'len("abc") + x\n',  # x and len come from define.tl only
+        'spin.tl': 'while true { }\n',
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, source in scripts.items():
+            paths.append(os.path.join(directory, name))
+            with open(paths[-1], 'w') as f:
+                f.write(source)
+        # One worker, so isolated.tl runs in the process define.tl used
+        results = run_batch(paths, workers=1, time_limit=0.5)
+
+        # Alarms that land around the end of a script, in this process, must
+        # always come back as a result rather than escaping _batch_run
+        escaped = None
+        if hasattr(signal, 'setitimer'):
+            _batch_init('vm', False, None, None)
+            try:
+                for attempt in range(300):
+                    _batch_run(paths[0], 0.00002 * (attempt % 30 + 1))
+            except TimeLimitExceeded as e:
+                escaped = e
+
+    greet, define, isolated, spin = results
+    checks = [
+        ("value and printed output", (greet.value, greet.output) == ('3', 'hi\n')),
+        ("script defines globals", define.ok and define.value == '5'),
+        ("globals reset between scripts",
+         isolated.error == "Undefined variable 'x' (line 1, column 14)"),
+        ("time limit stops a runaway loop", spin.error == "Time limit of 0.5s exceeded"),
+        ("late alarms never escape a script", escaped is None),
+    ]
+    for description, ok in checks:
+        print(f"  {'✓' if ok else '✗'} batch: {description}")
+
+
+def test_budgets():
+    """Test step and memory budgets on every backend."""
+    fill = 'a = []\nwhile true { push(a, "cell " + str(len(a))) }\n'
+    cases = [
+        ("runaway while", 'while true { }\n', dict(max_steps=10000),
+         "Step limit of 10000 exceeded"),
+        ("runaway recursion", 'func f(n) { return f(n + 1) }\nf(0)\n', dict(max_steps=500),
+         "Step limit of 500 exceeded"),
+        ("long for", 'for i in range(100000) { }\n', dict(max_steps=5000),
+         "Step limit of 5000 exceeded"),
+        ("unbounded allocation", fill, dict(max_memory=20_000_000),
+         "Memory limit of 20000000 bytes exceeded"),
+        # One allocation larger than the limit is refused before it is made
+        ("one huge string", 'x = "ab" * 200000000\nlen(x)\n', dict(max_memory=50_000_000),
+         "Memory limit of 50000000 bytes exceeded"),
+        ("one huge array", 'x = [0] * 300000000\nlen(x)\n', dict(max_memory=50_000_000),
+         "Memory limit of 50000000 bytes exceeded"),
+        ("one huge power", 'x = 3\ny = x ** 2000000000\n1\n', dict(max_memory=50_000_000),
+         "Memory limit of 50000000 bytes exceeded"),
+        ("one huge join", 'a = ["x" * 1000000] * 40\nlen(join(a))\n',
+         dict(max_memory=20_000_000), "Memory limit of 20000000 bytes exceeded"),
+        ("doubling a string", 's = "x"\nwhile true { s = s + s }\n',
+         dict(max_memory=50_000_000), "Memory limit of 50000000 bytes exceeded"),
+        ("exactly at the limit", 's = 0\nfor i in range(100) { s = s + i }\ns\n',
+         dict(max_steps=100), 4950),
+        ("within the limits", 'func fib(n) { if n < 2 { return n }\n'
+         '    return fib(n - 1) + fib(n - 2) }\nfib(15)\n',
+         dict(max_steps=10**6, max_memory=10**9), 610),
+    ]
+    for backend in TinyLang.BACKENDS:
+        for description, source, limits, expected in cases:
+            try:
+                result = TinyLang(backend, **limits).run(source, raise_errors=True)
+            except BudgetExceeded as e:
+                result = e.message
+            ok = result == expected or isinstance(result, str) and result.startswith(expected)
+            print(f"  {'✓' if ok else '✗'} {backend} {description}: {result}")
+        # The budget restarts with every run
+        interpreter = TinyLang(backend, max_steps=1000)
+        results = [interpreter.run('for i in range(800) { }\n1\n', raise_errors=True)
+                   for _ in range(3)]
+        print(f"  {'✓' if results == [1, 1, 1] else '✗'} {backend} budget resets per run")
+    # Profiled runs go through ProfilingEvaluator, which must honour the budget too
+    with redirect_stdout(io.StringIO()):
+        try:
+            result = TinyLang(max_steps=1000).run('i = 0\nwhile i < 100000 { i = i + 1 }\ni\n',
+                                                  profile=True, raise_errors=True)
+        except BudgetExceeded as e:
+            result = e.message
+    ok = isinstance(result, str) and result.startswith("Step limit of 1000 exceeded")
+    print(f"  {'✓' if ok else '✗'} profiled run: {result}")
+
+
+def test_memo():
+    """Test @memo functions: caching, LRU eviction, keys and annotation errors."""
+    fib = ("@memo\nfunc fib(n) {\n    if n < 2 { return n }\n"
+           "    return fib(n - 1) + fib(n - 2)\n}\nfib(90)\n")
+    # Tail calls: every count(...) in the chain returns the same value
+    chain = ("@memo(3)\nfunc count(n, acc) {\n    if n == 0 { return acc }\n"
+             "    return count(n - 1, acc + 1)\n}\n"
+             "func wrap(n) { return count(n, 0) }\n[wrap(50), wrap(50), count(2, 0)]\n")
+    keys = ("@memo func show(x) { return str(x) }\n@memo func first(a) { return a[0] }\n"
+            "[show(1), show(true), show(1), first([1, 2]), first([1, 2])]\n")
+    for backend in TinyLang.BACKENDS:
+        cases = []
+        interpreter = TinyLang(backend)
+        value = interpreter.run(fib, raise_errors=True)
+        stats = interpreter.memo_stats('fib')
+        cases.append(("fib(90) runs in linear time", value == 2880067194370816120
+                      and (stats['misses'], stats['hits']) == (91, 88)))
+        interpreter = TinyLang(backend)
+        value = interpreter.run(chain, raise_errors=True)
+        stats = interpreter.memo_stats('count')
+        cases.append(("LRU eviction through tail calls", value == [50, 50, 2]
+                      and (stats['size'], stats['evictions'], stats['hits']) == (3, 51, 1)))
+        interpreter = TinyLang(backend)
+        value = interpreter.run(keys, raise_errors=True)
+        cases.append(("1 and true are different keys", value == ["1", "true", "1", 1, 1]
+                      and interpreter.memo_stats('show')['hits'] == 1))
+        cases.append(("array arguments are not cached",
+                      interpreter.memo_stats('first')['uncacheable'] == 2))
+        # Asking about an unknown name must not make it a global
+        cases.append(("memo_stats of an unknown name", interpreter.memo_stats('i') is None
+                      and 'i' not in interpreter.evaluator.global_env.slots))
+        for description, ok in cases:
+            print(f"  {'✓' if ok else '✗'} {backend} @memo: {description}")
+
+    errors = {
+        "@memo x = 1": "Expected a function definition after @memo",
+        "@cache func f() { }": "Unknown annotation '@cache'",
+        "@memo(0) func f() { }": "@memo size must be a positive integer",
+    }
+    for source, expected in errors.items():
+        try:
+            Parser(RegexLexer(source).tokenize()).parse()
+            message = "no error"
+        except ParseError as e:
+            message = e.message
+        status = "✓" if message.startswith(expected) else "✗"
+        print(f"  {status} {source!r}: {message}")
+
+
+def test_async():
+    """Test asynchronous scripts: awaited builtins, concurrency, errors and budgets."""
+    fetch = ("func fetch(n) { return sleep(0.05, n * 10) }\n"
+             "total = 0\nfor i in range(3) { total = total + fetch(i) }\ntotal\n")
+    interpreter = TinyLang('tree', asynchronous=True)
+    print(f"  {'✓' if interpreter.run(fetch) == 30 else '✗'} async: run() awaits sleep")
+
+    scripts = [f"x = sleep(0.2, {n})\nsleep(0.2, x * 2)\n" for n in range(200)]
+    start = time.perf_counter()
+    results = asyncio.run(run_concurrently(scripts))
+    elapsed = time.perf_counter() - start
+    checks = [
+        ("values of 200 concurrent scripts", results == [n * 2 for n in range(200)]),
+        # Serially the sleeps alone would take 200 * 0.4 = 80 s
+        (f"scripts wait concurrently ({elapsed:.2f} s)", elapsed < 10),
+    ]
+    results = asyncio.run(run_concurrently([
+        "sleep(0.01)\nx = 1\nx + y\n",
+        'x = 1\nsleep("soon")\n',
+        "while true { sleep(0) }\n",
+        "func f(n) { return sleep(0, n) }\n[f(1), f(2) + 1]\n",
+    ], max_steps=1000))
+    messages = [str(result) for result in results[:3]]
+    checks += [
+        ("undefined variable after an await", messages[0] ==
+         "Undefined variable 'y' (line 3, column 5)"),
+        ("async builtin error at its call", messages[1].endswith("(line 2, column 1)")),
+        ("step limit stops an awaiting loop", messages[2].startswith("Step limit of 1000")),
+        ("async builtins through tail calls", results[3] == [1, 3]),
+    ]
+    try:
+        TinyLang('vm', asynchronous=True)
+        checks.append(("only the tree backend is asynchronous", False))
+    except ValueError:
+        checks.append(("only the tree backend is asynchronous", True))
+    try:
+        asyncio.run(run_concurrently(["1\n"], max_memory=10**9))
+        checks.append(("a shared-process memory limit is refused", False))
+    except ValueError:
+        checks.append(("a shared-process memory limit is refused", True))
+    for description, ok in checks:
+        print(f"  {'✓' if ok else '✗'} async: {description}")
+
+
+def test_repl_session():
+    """Test multi-line REPL input and reuse of re-entered chunks."""
+    lines = [
+        "func square(x) {",
+        "    return x * x",
+        "}",
+        "square(7)",
+        "func square(x) {",     # unchanged redefinition: reused
+        "    return x * x",
+        "}",
+        "func reset() { total = 1",
+        "    return total }",
+        "total = 5",
+        "func reset() { total = 1",  # `total` is global now: re-resolved
+        "    return total }",
+        "reset() + total",
+    ]
+    for backend in TinyLang.BACKENDS:
+        session = ReplSession(TinyLang(backend))
+        results = [session.feed(line) for line in lines]
+        expected = [None, None, None, 49, None, None, None, None, None, 5, None, None, 2]
+        ok = results == expected and (session.hits, session.misses) == (2, 5)
+        status = "✓" if ok else "✗"
+        print(f"  {status} repl session ({backend}): {results[3]}, {results[-1]}, "
+              f"{session.hits} chunks reused")
+
+    session = ReplSession()
+    session.feed("func broken(x) {")
+    session.feed("    return x +")
+    session.feed("}")  # parse error: reported, and the session recovers
+    status = "✓" if not session.pending and session.feed("1 + 1") == 2 else "✗"
+    print(f"  {status} repl recovers after an error")
+
+
+def benchmark_backends(repeat: int = 3):
+    """
+    Compare the tree-walking Evaluator against the bytecode VM.
+
+    Workloads mirror test_recursion (factorial), call-heavy Fibonacci and a
+    while-loop counter.
+    Each timing is the best of `repeat` runs.
+    """
+
+    workloads = {
+        'factorial': """
+        func factorial(n) {
+            if n <= 1 {
+                return 1
+            } else {
+                return n * factorial(n - 1)
+            }
+        }
+        i = 0
+        while i < 2000 {
+            factorial(20)
+            i = i + 1
+        }
+        """,
+        'fibonacci': """
+        func fib(n) {
+            if n < 2 { return n }
+            return fib(n - 1) + fib(n - 2)
+        }
+        fib(20)
+        """,
+        'while loop': """
+        i = 0
+        total = 0
+        while i < 200000 {
+            total = total + i % 7
+            i = i + 1
+        }
+        total
+        """,
+    }
+
+    print(f"{'workload':<12}" + "".join(f" {backend + ' (s)':>11}" for backend in TinyLang.BACKENDS)
+          + "".join(f" {backend + ' x':>10}" for backend in TinyLang.BACKENDS if backend != 'tree'))
+    for name, code in workloads.items():
+        timings = {}
+        for backend in TinyLang.BACKENDS:
+            best = float('inf')
+            for _ in range(repeat):
+                interpreter = TinyLang(backend)
+                start = time.perf_counter()
+                interpreter.run(code)
+                best = min(best, time.perf_counter() - start)
+            timings[backend] = best
+        # Speedups are relative to the tree-walking Evaluator
+        print(f"{name:<12}"
+              + "".join(f" {timings[backend]:>11.3f}" for backend in TinyLang.BACKENDS)
+              + "".join(f" {timings['tree'] / timings[backend]:>9.1f}x"
+                        for backend in TinyLang.BACKENDS if backend != 'tree'))
+
+
+def benchmark_cache(scripts: int = 200, repeat: int = 3):
+    """
+    Time a batch of fresh interpreters each running one small script,
+    with no cache, with a cold cache (compiling and writing), and warm.
+    """
+
+    script = "".join(
+        f"func helper_{i}(a, b) {{\n"
+        f"    if a > b {{ return a - b * {i} }} else {{ return b + a % {i + 1} }}\n"
+        f"}}\n"
+        f"value_{i} = helper_{i}({i}, 3) + helper_{i}(2, {i})\n"
+        for i in range(15))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for n in range(scripts):
+            paths.append(os.path.join(directory, f"job_{n}.tl"))
+            with open(paths[-1], 'w') as f:
+                f.write(f"# job {n}\n{script}")
+
+        def batch(cache_directory: Optional[str]) -> float:
+            start = time.perf_counter()
+            for path in paths:
+                interpreter = TinyLang()
+                if cache_directory is None:
+                    with open(path) as f:
+                        interpreter.run(f.read())
+                else:
+                    interpreter.cache = ProgramCache(cache_directory)
+                    interpreter.run_file(path)
+            return time.perf_counter() - start
+
+        uncached = min(batch(None) for _ in range(repeat))
+        cold = batch(os.path.join(directory, 'cache'))
+        warm = min(batch(os.path.join(directory, 'cache')) for _ in range(repeat))
+
+    print(f"{scripts} scripts   no cache {uncached:.3f}s   cold cache {cold:.3f}s   "
+          f"warm cache {warm:.3f}s ({uncached / warm:.1f}x)")
+
+
+def benchmark_builders(sizes: Tuple[int, ...] = (5000, 50000), repeat: int = 3):
+    """
+    Build an n-piece string by `s = s + piece` and by push() + join().
+
+    Time per piece should stay flat as n grows for push/join (amortized O(1)
+    append, one final copy); repeated concatenation copies the string each
+    time, so its time per piece grows with n.
+    """
+    programs = {
+        'concat': "s = ''\nfor i in range({n}) {{ s = s + 'piece ' }}\nlen(s)",
+        'push+join': "parts = []\nfor i in range({n}) {{ push(parts, 'piece ') }}\n"
+                     "len(join(parts))",
+    }
+    print(f"{'builder':<10}" + "".join(f" {f'n={n} us/op':>15}" for n in sizes))
+    for name, template in programs.items():
+        row = f"{name:<10}"
+        for n in sizes:
+            source = template.format(n=n)
+            best = float('inf')
+            for _ in range(repeat):
+                interpreter = TinyLang()
+                start = time.perf_counter()
+                interpreter.run(source)
+                best = min(best, time.perf_counter() - start)
+            row += f" {best / n * 1e6:>15.3f}"
+        print(row)
+
+
+def benchmark_numeric(n: int = 200000, repeat: int = 3):
+    """Sum of squares with a TinyLang while loop vs. vectorized builtins."""
+    if np is None:
+        print("numeric: skipped (NumPy is not installed)")
+        return
+    programs = {
+        'while loop': f"total = 0\ni = 0\n"
+                      f"while i < {n} {{ total = total + i * i\ni = i + 1 }}\ntotal",
+        'vectorized': f"xs = range({n})\nsum(xs * xs)",
+    }
+    timings = {}
+    for name, source in programs.items():
+        best = float('inf')
+        for _ in range(repeat):
+            interpreter = TinyLang(numeric=True)
+            start = time.perf_counter()
+            interpreter.run(source)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    print(f"numeric: sum of {n} squares, while loop {timings['while loop'] * 1e3:.1f} ms, "
+          f"vectorized {timings['vectorized'] * 1e3:.2f} ms "
+          f"({timings['while loop'] / timings['vectorized']:.0f}x)")
+
+
+def benchmark_batch(scripts: int = 48):
+    """Run a batch of CPU-bound scripts on one worker and on every core."""
+    source = ("func fib(n) {\n    if n < 2 { return n }\n"
+              "    return fib(n - 1) + fib(n - 2)\n}\nfib(17)\n")
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for n in range(scripts):
+            paths.append(os.path.join(directory, f"job_{n}.tl"))
+            with open(paths[-1], 'w') as f:
+                f.write(source)
+        timings = {}
+        for workers in sorted({1, cores}):
+            start = time.perf_counter()
+            run_batch(paths, workers=workers)
+            timings[workers] = time.perf_counter() - start
+    print(f"batch: {scripts} scripts, 1 worker {timings[1]:.2f} s, {cores} workers "
+          f"{timings[cores]:.2f} s ({timings[1] / timings[cores]:.1f}x on {cores} cores)")
+
+
+def benchmark_budget(repeat: int = 5):
+    """
+    Cost of enforcing budgets: each workload runs with no limits, with a
+    (never reached) step limit, and with a memory limit, which samples
+    resident memory every Budget.CHECK_INTERVAL steps and checks the operand
+    types of every `+`, `*` and `**` (see Budget.charge). Timings are the best
+    of `repeat` runs, interleaved so machine noise hits all three alike.
+    """
+    workloads = {
+        'fibonacci': "func fib(n) {\n    if n < 2 { return n }\n"
+                     "    return fib(n - 1) + fib(n - 2)\n}\nfib(22)\n",
+        'while loop': "i = 0\ntotal = 0\nwhile i < 200000 {\n"
+                      "    total = total + i % 7\n    i = i + 1\n}\ntotal\n",
+    }
+    configurations = {'none': {}, 'steps': dict(max_steps=10**9),
+                      'memory': dict(max_memory=2**40)}
+    print(f"{'workload':<12} {'backend':<8}" + "".join(f" {name + ' (s)':>11}"
+                                                      for name in configurations)
+          + f" {'steps %':>8} {'memory %':>9}")
+    for name, source in workloads.items():
+        for backend in TinyLang.BACKENDS:
+            best = dict.fromkeys(configurations, float('inf'))
+            for _ in range(repeat):
+                for configuration, limits in configurations.items():
+                    interpreter = TinyLang(backend, **limits)
+                    ast, _ = interpreter.load(source)
+                    code = interpreter.compile(ast)
+                    start = time.perf_counter()
+                    interpreter.execute(ast, code)
+                    best[configuration] = min(best[configuration],
+                                              time.perf_counter() - start)
+            overhead = {configuration: (best[configuration] / best['none'] - 1) * 100
+                        for configuration in ('steps', 'memory')}
+            print(f"{name:<12} {backend:<8}"
+                  + "".join(f" {best[configuration]:>11.3f}" for configuration in configurations)
+                  + f" {overhead['steps']:>7.1f}% {overhead['memory']:>8.1f}%")
+
+
+def benchmark_async(scripts: int = 200, delay: float = 0.05):
+    """
+    Many I/O-bound scripts: one event loop with an awaiting sleep builtin
+    against one thread per script with a blocking time.sleep builtin.
+    """
+    source = f"total = 0\nfor i in range(4) {{ total = total + sleep({delay}, i) }}\ntotal\n"
+
+    def threaded(_) -> Any:
+        interpreter = TinyLang('tree')
+        interpreter.evaluator.global_env.define(
+            'sleep', lambda seconds, result=None: time.sleep(seconds) or result)
+        return interpreter.run(source, raise_errors=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_concurrently([source] * scripts))
+    asynchronous = time.perf_counter() - start
+    assert results == [6] * scripts, results
+    start = time.perf_counter()
+    with ThreadPoolExecutor(scripts) as pool:
+        results = list(pool.map(threaded, range(scripts)))
+    threads = time.perf_counter() - start
+    assert results == [6] * scripts, results
+    serial = scripts * 4 * delay
+    print(f"async: {scripts} scripts x 4 waits of {delay * 1000:.0f} ms "
+          f"(serially {serial:.0f} s): event loop {asynchronous:.2f} s, "
+          f"{scripts} threads {threads:.2f} s")
+
+
+def benchmark_ast_memory(statements: int = 100000):
+    """
+    Memory of the parsed AST of a large program, as slotted nodes and as
+    the same tree with a __dict__ per node (what plain dataclasses give).
+    Both are measured as copies of the parsed tree, so they share the same
+    names and constants and differ only in the nodes themselves.
+    """
+    templates = [
+        "x{i} = {i} * y + 1",
+        "if x{i} > 3 {{ z = x{i} - 1 }} else {{ z = 0 }}",
+        "f(x{i}, [z, {i}])",
+        "while z < {i} {{ z = z + 2 }}",
+    ]
+    source = ("y = 2\nz = 0\nfunc f(a, b) { return a + b[0] }\n"
+              + "\n".join(templates[i % len(templates)].format(i=i) for i in range(statements)))
+    ast = TinyLang().parse(RegexLexer(source).stream())
+    nodes = Optimizer.count_nodes(ast)
+    node_classes = {cls for cls in globals().values()
+                    if isinstance(cls, type) and issubclass(cls, ASTNode)}
+    names = {cls: tuple(f.name for f in fields(cls)) for cls in node_classes}
+    dict_classes = {cls: type(cls.__name__, (), {}) for cls in node_classes}
+
+    def rebuild(node: Any, with_dict: bool) -> Any:
+        if type(node) is list:
+            return [rebuild(item, with_dict) for item in node]
+        cls = type(node)
+        if cls not in names:
+            return node
+        copy = object.__new__(dict_classes[cls] if with_dict else cls)
+        for name in names[cls]:
+            setattr(copy, name, rebuild(getattr(node, name), with_dict))
+        return copy
+
+    def traced_size(with_dict: bool) -> int:
+        # No collections: they would only rescan the growing tree
+        gc.disable()
+        tracemalloc.start()
+        try:
+            tree = rebuild(ast, with_dict)  # kept alive while it is measured
+            size = tracemalloc.get_traced_memory()[0]
+            del tree
+            return size
+        finally:
+            tracemalloc.stop()
+            gc.enable()
+
+    slotted, with_dict = traced_size(False), traced_size(True)
+    print(f"AST memory: {statements} statements, {nodes} nodes: __dict__ nodes "
+          f"{with_dict / 2**20:.1f} MiB ({with_dict / nodes:.0f} B/node), slotted "
+          f"{slotted / 2**20:.1f} MiB ({slotted / nodes:.0f} B/node), "
+          f"{1 - slotted / with_dict:.0%} smaller")
+
+
+def benchmark_memo(n: int = 24, repeat: int = 3):
+    """
+    Time naive recursive Fibonacci with and without @memo on each backend;
+    the memoized version makes n + 1 calls instead of about 1.6 ** n.
+    """
+    body = ("func fib(n) {\n    if n < 2 { return n }\n"
+            f"    return fib(n - 1) + fib(n - 2)\n}}\nfib({n})\n")
+    print(f"{'backend':<8} {'plain (s)':>10} {'@memo (s)':>10} {'speedup':>9}")
+    for backend in TinyLang.BACKENDS:
+        timings = {}
+        for name, source in (('plain', body), ('memo', "@memo\n" + body)):
+            best = float('inf')
+            for _ in range(repeat):
+                interpreter = TinyLang(backend)
+                start = time.perf_counter()
+                interpreter.run(source)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        print(f"{backend:<8} {timings['plain']:>10.3f} {timings['memo']:>10.4f} "
+              f"{timings['plain'] / timings['memo']:>8.0f}x")
+
+
+def benchmark_repl(chunks: int = 2000):
+    """
+    Feed a long interactive session to a ReplSession and time each chunk:
+    latency must not grow with history. Every fifth chunk re-enters an
+    unchanged function definition, which is served from the chunk cache.
+    """
+    definition = ["func area(w, h) {", "    if w < 0 { return 0 }", "    return w * h", "}"]
+    session = ReplSession()
+    timings = []
+    for i in range(chunks):
+        lines = definition if i % 5 == 0 else [f"v{i} = area({i}, 3) + {i}"]
+        start = time.perf_counter()
+        for line in lines:
+            session.feed(line)
+        timings.append(time.perf_counter() - start)
+
+    window = min(200, chunks // 2)
+    first = sum(timings[:window]) / window
+    last = sum(timings[-window:]) / window
+    print(f"repl: {chunks} chunks, first {window} {first * 1e6:.0f} us/chunk, "
+          f"last {window} {last * 1e6:.0f} us/chunk, {session.hits} reused")
+
+
+def benchmark_lexers(lines: int = 20000, repeat: int = 3):
+    """
+    Compare tokens/sec of the char-loop Lexer and the master-regex RegexLexer.
+
+    The source is a generated script of `lines` lines mixing identifiers,
+    numbers, strings, operators and comments. Best of `repeat` runs.
+    """
+
+    chunk = (
+        'func f{i}(a, b) {{ return a * {i} + b ** 2 >= 3.25 }}  # helper\n'
+        'value_{i} = f{i}(counter, "label {i}\\n") != null and total <= {i}\n'
+    )
+    source = ''.join(chunk.format(i=i) for i in range(lines // 2))
+
+    print(f"{'lexer':<8} {'tokens':>9} {'time (s)':>10} {'tokens/sec':>12}")
+    for name, lexer_class in TinyLang.LEXERS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tokens = lexer_class(source).tokenize()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<8} {len(tokens):>9} {best:>10.3f} {len(tokens) / best:>12,.0f}")
+
+
+def benchmark_parsers(lines: int = 20000, repeat: int = 3):
+    """
+    Compare the Pratt Parser with the method-per-level
+    PrecedenceClimbingParser: tokens parsed per second (from a pre-built
+    token list, best of `repeat`) and Python calls made per token.
+    """
+    chunk = (
+        'value_{i} = (alpha + {i}) * beta - gamma / 2 >= delta and not epsilon\n'
+        'if x{i} ** 2 % 7 == 1 or f(a[{i}], -b) < 3 {{ total = total + {i} }}\n'
+    )
+    tokens = RegexLexer(''.join(chunk.format(i=i) for i in range(lines // 2))).tokenize()
+    sample = RegexLexer(''.join(chunk.format(i=i) for i in range(100))).tokenize()
+
+    def count_calls(parser_class: type) -> int:
+        calls = 0
+
+        def on_event(frame, event, arg):
+            nonlocal calls
+            if event == 'call':
+                calls += 1
+        sys.setprofile(on_event)
+        try:
+            parser_class(sample).parse()
+        finally:
+            sys.setprofile(None)
+        return calls
+
+    print(f"{'parser':<24} {'tokens':>9} {'time (s)':>10} {'tokens/sec':>12} {'calls/token':>12}")
+    for parser_class in (PrecedenceClimbingParser, Parser):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser_class(tokens).parse()
+            best = min(best, time.perf_counter() - start)
+        calls_per_token = count_calls(parser_class) / len(sample)
+        print(f"{parser_class.__name__:<24} {len(tokens):>9} {best:>10.3f} "
+              f"{len(tokens) / best:>12,.0f} {calls_per_token:>12.1f}")
+
+
+def benchmark_streaming(lines: int = 5000):
+    """
+    Compare peak memory of parsing from a token list vs. a token stream.
+
+    With a list, every token is alive until parsing finishes; with
+    Lexer.stream() only the parser's lookahead buffer is. The AST itself is
+    the same size either way.
+    """
+
+    chunk = 'total_{i} = (alpha + {i}) * beta - gamma / 2 >= delta and not epsilon\n'
+    source = ''.join(chunk.format(i=i) for i in range(lines))
+
+    print(f"{'tokens from':<12} {'peak (MB)':>10} {'time (s)':>10}")
+    for name in ('list', 'stream'):
+        tracemalloc.start()
+        start = time.perf_counter()
+        lexer = RegexLexer(source)
+        tokens = lexer.tokenize() if name == 'list' else lexer.stream()
+        Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del tokens, lexer
+        print(f"{name:<12} {peak / 2**20:>10.1f} {elapsed:>10.3f}")
+
+
+# Representative programs for benchmark_suite(). Each is a complete script;
+# sizes are chosen so every one runs in well under a second on the VM.
+BENCHMARK_PROGRAMS = {
+    'fib': """
+    func fib(n) {
+        if n < 2 { return n }
+        return fib(n - 1) + fib(n - 2)
+    }
+    fib(20)
+    """,
+    'loops': """
+    total = 0
+    for i in range(200) {
+        j = 0
+        while j < 200 {
+            if (i + j) % 3 == 0 { total = total + i * j } else { total = total - 1 }
+            j = j + 1
+        }
+    }
+    total
+    """,
+    'string building': """
+    text = ""
+    i = 0
+    while i < 5000 {
+        text = text + str(i % 10)
+        i = i + 1
+    }
+    len(text)
+    """,
+    'closures': """
+    func make_counter(step) {
+        count = 0
+        func next() {
+            count = count + step
+            return count
+        }
+        return next
+    }
+    total = 0
+    for i in range(200) {
+        counter = make_counter(i)
+        for k in range(50) { total = total + counter() }
+    }
+    total
+    """,
+    'deep recursion': """
+    func depth(n) {
+        if n == 0 { return 0 }
+        return 1 + depth(n - 1)
+    }
+    func countdown(n) {
+        if n == 0 { return 0 }
+        return countdown(n - 1)
+    }
+    depth(20000) + countdown(50000)
+    """,
+}
+
+
+def benchmark_program(source: str, backend: str = 'vm', repeat: int = 3) -> Dict[str, float]:
+    """
+    Time each phase of running one program; return seconds per phase (best
+    of `repeat`), their total, and the peak traced memory of a full run.
+    """
+    phases = ('lex', 'parse', 'optimize', 'resolve', 'compile', 'evaluate')
+    best = dict.fromkeys(phases, float('inf'))
+
+    def run_once(timings: Dict[str, float]):
+        interpreter = TinyLang(backend)
+        global_env = interpreter.evaluator.global_env
+        start = time.perf_counter()
+        tokens = RegexLexer(source).tokenize()
+        timings['lex'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ast = Parser(tokens).parse()
+        timings['parse'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Optimizer().optimize(ast)
+        timings['optimize'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Resolver(global_env).resolve(ast)
+        timings['resolve'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if backend == 'vm':
+            code = Compiler().compile(ast)
+        elif backend == 'closure':
+            code = ClosureCompiler(global_env).compile(ast)
+        timings['compile'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if backend == 'vm':
+            interpreter.vm.run(code)
+        elif backend == 'closure':
+            interpreter.run_closures(code)
+        else:
+            interpreter.evaluator.evaluate(ast, global_env)
+        timings['evaluate'] = time.perf_counter() - start
+
+    for _ in range(repeat):
+        timings: Dict[str, float] = {}
+        run_once(timings)
+        for phase in phases:
+            best[phase] = min(best[phase], timings[phase])
+
+    tracemalloc.start()
+    try:
+        run_once({})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = {phase: best[phase] for phase in phases}
+    result['total'] = sum(best.values())
+    result['peak_memory'] = peak
+    return result
+
+
+def compare_benchmarks(current: Dict[str, Any], baseline: Dict[str, Any],
+                       threshold: float = 0.10) -> List[str]:
+    """
+    List every program whose total time or peak memory grew by more than
+    `threshold` (a fraction) relative to a baseline from benchmark_suite().
+    """
+    regressions = []
+    for name, result in current['programs'].items():
+        old = baseline.get('programs', {}).get(name)
+        if old is None:
+            continue
+        for metric in ('total', 'peak_memory'):
+            if old[metric] and result[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"{name}: {metric} {old[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{100 * (result[metric] / old[metric] - 1):.0f}%)")
+    return regressions
+
+
+def benchmark_suite(json_path: Optional[str] = None, baseline_path: Optional[str] = None,
+                    threshold: float = 0.10, backend: str = 'vm', repeat: int = 3
+                    ) -> Dict[str, Any]:
+    """
+    Run BENCHMARK_PROGRAMS and print per-phase timings and peak memory.
+
+    Results are written to json_path if given. If baseline_path names an
+    earlier results file, programs that got slower (total time) or bigger
+    (peak memory) by more than `threshold` are reported as regressions,
+    and listed under "regressions" in the results.
+    """
+    results: Dict[str, Any] = {
+        'version': VERSION,
+        'python': sys.version.split()[0],
+        'backend': backend,
+        'repeat': repeat,
+        'programs': {},
+    }
+    print(f"{'program':<16} {'lex ms':>8} {'parse ms':>9} {'compile ms':>11} "
+          f"{'run ms':>9} {'total ms':>9} {'peak KiB':>9}")
+    for name, source in BENCHMARK_PROGRAMS.items():
+        result = benchmark_program(source, backend, repeat)
+        results['programs'][name] = result
+        front_end = result['optimize'] + result['resolve'] + result['compile']
+        print(f"{name:<16} {result['lex'] * 1e3:>8.2f} {result['parse'] * 1e3:>9.2f} "
+              f"{front_end * 1e3:>11.2f} {result['evaluate'] * 1e3:>9.1f} "
+              f"{result['total'] * 1e3:>9.1f} {result['peak_memory'] / 1024:>9.0f}")
+
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            regressions = compare_benchmarks(results, json.load(f), threshold)
+        results['regressions'] = regressions
+        if regressions:
+            print(f"Regressions over {threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+        else:
+            print(f"No regressions over {threshold:.0%} against {baseline_path}")
+
+    if json_path is not None:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
 if __name__ == "__main__":
+    # python tinylang.py bench [results.json [baseline.json]]
+    if sys.argv[1:2] == ['bench']:
+        paths = sys.argv[2:4] + [None, None]
+        results = benchmark_suite(json_path=paths[0], baseline_path=paths[1])
+        sys.exit(1 if results.get('regressions') else 0)
+
+    # python tinylang.py batch [--workers N] [--time-limit SECONDS] [--max-steps N]
+    #                          [--max-memory BYTES] script.tl ...
+    if sys.argv[1:2] == ['batch']:
+        import argparse
+        parser = argparse.ArgumentParser(prog="tinylang.py batch")
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--time-limit', type=float, default=None)
+        parser.add_argument('--max-steps', type=int, default=None)
+        parser.add_argument('--max-memory', type=int, default=None)
+        parser.add_argument('--backend', choices=TinyLang.BACKENDS, default='vm')
+        parser.add_argument('scripts', nargs='+')
+        options = parser.parse_args(sys.argv[2:])
+        results = run_batch(options.scripts, options.backend, options.workers, options.time_limit,
+                            max_steps=options.max_steps, max_memory=options.max_memory)
+        for result in results:
+            sys.stdout.write(result.output)
+            print(f"{result.path}: {result.value if result.ok else 'Error: ' + result.error}")
+        failed = sum(not result.ok for result in results)
+        print(f"{len(results) - failed} ok, {failed} failed")
+        sys.exit(1 if failed else 0)
+
     print("TinyLang Interpreter: First Principles Implementation")
     print("=" * 80)
     print("\nWork through GUIDE.md to implement each component.")
     print("Run this file to test your implementations.\n")
 
-    # TODO: Uncomment as you implement
-    # test_lexer()
-    # test_parser()
-    # test_evaluator()
-    # test_variables()
-    # test_functions()
-    # test_recursion()
+    test_lexer()
+    test_parser()
+    test_optimizer()
+    test_evaluator()
+    test_variables()
+    test_functions()
+    test_recursion()
+    test_deep_recursion()
+    test_inline_caches()
+    test_closures()
+    test_arrays()
+    test_numeric()
+    test_profiler()
+    test_program_cache()
+    test_repl_session()
+    test_batch()
+    test_budgets()
+    test_memo()
+    test_async()
+
+    print()
+    benchmark_backends()
+    print()
+    benchmark_lexers()
+    print()
+    benchmark_parsers()
+    print()
+    benchmark_streaming()
+    print()
+    benchmark_cache()
+    print()
+    benchmark_repl()
+    print()
+    benchmark_builders()
+    print()
+    benchmark_numeric()
+    print()
+    benchmark_batch()
+    print()
+    benchmark_budget()
+    print()
+    benchmark_ast_memory()
+    print()
+    benchmark_memo()
+    print()
+    benchmark_async()
+    print()
+    benchmark_suite(repeat=1)
 
     # Start REPL
     # TinyLang().repl()